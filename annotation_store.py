@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Vector annotation storage.
+
+Drawings used to be kept as one full-resolution ARGB32 QImage per
+annotated frame (about 33 MB for a 4K frame), copied again into the
+per-file media cache, so a review session with a few hundred annotated
+frames ran out of memory. A FrameAnnotation instead keeps the strokes
+drawn on a frame as point lists in frame coordinates; its memory grows
+with the amount drawn, not with the frame resolution.
+
+Strokes are rasterised on demand into an overlay that only covers their
+bounding rectangle. Rendered overlays are kept for the most recently used
+frames only (MAX_RENDERED_OVERLAYS), and an edit simply invalidates the
+overlay of its frame.
+
+The stroke being drawn is kept apart (active_stroke) until end_stroke(), so
+the overlay of the finished strokes stays valid while the pen moves: the
+viewer paints the live stroke on its own layer and the overlay is
+rendered again once, when the stroke is committed. Eraser segments are
+applied to the cached overlays directly so their effect shows at once.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QPoint, QRect, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPolygon
+
+# Frames whose rasterised overlay is kept in memory
+MAX_RENDERED_OVERLAYS = 16
+
+Point = Tuple[int, int]
+
+# FrameAnnotation -> None, most recently rendered last
+_rendered: 'OrderedDict[FrameAnnotation, None]' = OrderedDict()
+
+
+class Stroke:
+    """One pen or eraser stroke: a polyline in frame coordinates."""
+
+    __slots__ = ('points', 'rgba', 'width')
+
+    def __init__(self, rgba: int, width: int, points: Optional[List[Point]] = None) -> None:
+        self.rgba = rgba
+        self.width = width
+        self.points = points if points is not None else []
+
+    @property
+    def erase(self) -> bool:
+        return QColor.fromRgba(self.rgba).alpha() == 0
+
+    def bounds(self) -> Optional[QRect]:
+        """Area touched by the stroke, pen width included."""
+        if not self.points:
+            return None
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        return _padded_rect(min(xs), min(ys), max(xs), max(ys), self.width)
+
+    def pen(self) -> QPen:
+        return QPen(QColor.fromRgba(self.rgba), self.width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+
+    def paint(self, painter: QPainter) -> None:
+        self.paint_points(painter, self.points)
+
+    def paint_points(self, painter: QPainter, points: List[Point]) -> None:
+        """Paint points (all of the stroke or its latest segment) with this stroke's pen."""
+        painter.setPen(self.pen())
+        painter.setCompositionMode(QPainter.CompositionMode_Clear if self.erase
+                                   else QPainter.CompositionMode_SourceOver)
+        if len(points) == 1:
+            point = QPoint(*points[0])
+            painter.drawLine(point, point)
+        else:
+            painter.drawPolyline(QPolygon([QPoint(x, y) for x, y in points]))
+
+
+def _padded_rect(x0: int, y0: int, x1: int, y1: int, pen_width: int) -> QRect:
+    pad = pen_width // 2 + 2  # round caps plus antialiasing
+    return QRect(x0 - pad, y0 - pad, x1 - x0 + 2 * pad + 1, y1 - y0 + 2 * pad + 1)
+
+
+class AnnotationOverlay:
+    """Rasterised strokes: an ARGB32 premultiplied image covering rect of the frame."""
+
+    __slots__ = ('image', 'rect')
+
+    def __init__(self, image: QImage, rect: QRect) -> None:
+        self.image = image
+        self.rect = rect
+
+
+class FrameAnnotation:
+    """
+    Strokes drawn on one frame of width x height pixels (the frame size at
+    the time of drawing; overlays can be rendered for other sizes).
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.strokes: List[Stroke] = []
+        self.active_stroke: Optional[Stroke] = None
+        self.version = 0
+        self._overlays = {}  # (width, height) -> (version, AnnotationOverlay or None)
+
+    def begin_stroke(self, color: QColor, pen_width: int, point: Point) -> QRect:
+        """
+        Start a stroke at point (a previous unfinished stroke is committed).
+        Returns the area it changed (frame coordinates).
+        """
+        self.end_stroke()
+        self.active_stroke = Stroke(color.rgba(), pen_width, [point])
+        if self.active_stroke.erase:
+            self._erase_in_overlays([point])
+        return self.active_stroke.bounds()
+
+    def extend_stroke(self, point: Point) -> Optional[QRect]:
+        """
+        Continue the active stroke to point. Returns the area of the new
+        segment, or None if nothing changed.
+        """
+        stroke = self.active_stroke
+        if stroke is None:
+            return None
+        last = stroke.points[-1]
+        if point == last:
+            return None
+        stroke.points.append(point)
+        if stroke.erase:
+            self._erase_in_overlays([last, point])
+        return _padded_rect(min(last[0], point[0]), min(last[1], point[1]),
+                            max(last[0], point[0]), max(last[1], point[1]), stroke.width)
+
+    def end_stroke(self) -> None:
+        """Commit the active stroke; the overlay is rendered again on next use."""
+        if self.active_stroke is None:
+            return
+        self.strokes.append(self.active_stroke)
+        self.active_stroke = None
+        self._changed()
+
+    def _erase_in_overlays(self, points: List[Point]) -> None:
+        # Eraser segments clear the cached overlays in place, so the result
+        # shows while erasing without rendering every stroke again
+        for size, (version, overlay) in self._overlays.items():
+            if version != self.version or overlay is None:
+                continue
+            painter = QPainter(overlay.image)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.translate(-overlay.rect.x(), -overlay.rect.y())
+            painter.scale(size[0] / self.width, size[1] / self.height)
+            self.active_stroke.paint_points(painter, points)
+            painter.end()
+
+    def bounding_rect(self) -> QRect:
+        """Area covered by pen strokes, clipped to the frame (empty if nothing is drawn)."""
+        rect = QRect()
+        for stroke in self.strokes:
+            if not stroke.erase:
+                rect = rect.united(stroke.bounds())
+        return rect.intersected(QRect(0, 0, self.width, self.height))
+
+    def is_empty(self) -> bool:
+        return self.bounding_rect().isEmpty()
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the stroke data (rendered overlays not included)."""
+        strokes = self.strokes + ([self.active_stroke] if self.active_stroke is not None else [])
+        return sum(64 + 16 * len(stroke.points) for stroke in strokes)
+
+    def overlay(self, width: Optional[int] = None, height: Optional[int] = None) -> Optional[AnnotationOverlay]:
+        """
+        Return the strokes rasterised for a frame of width x height (default:
+        the drawing size), or None if nothing visible is drawn.
+        """
+        size = (width or self.width, height or self.height)
+        cached = self._overlays.get(size)
+        if cached is not None and cached[0] == self.version:
+            _touch(self)
+            return cached[1]
+        overlay = self._render(*size)
+        self._overlays[size] = (self.version, overlay)
+        _touch(self)
+        return overlay
+
+    def _render(self, width: int, height: int) -> Optional[AnnotationOverlay]:
+        scale_x = width / self.width if self.width else 1.0
+        scale_y = height / self.height if self.height else 1.0
+        source_rect = self.bounding_rect()
+        if source_rect.isEmpty():
+            return None
+        # Drawing-size rect -> target-size rect (rounded outwards)
+        x0 = int(source_rect.left() * scale_x)
+        y0 = int(source_rect.top() * scale_y)
+        x1 = min(width, int(np.ceil((source_rect.right() + 1) * scale_x)))
+        y1 = min(height, int(np.ceil((source_rect.bottom() + 1) * scale_y)))
+        rect = QRect(x0, y0, x1 - x0, y1 - y0)
+        if rect.isEmpty():
+            return None
+        image = QImage(rect.width(), rect.height(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(-x0, -y0)
+        painter.scale(scale_x, scale_y)
+        for stroke in self.strokes:
+            stroke.paint(painter)
+        if self.active_stroke is not None and self.active_stroke.erase:
+            self.active_stroke.paint(painter)
+        painter.end()
+        return AnnotationOverlay(image, rect)
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def _drop_overlays(self) -> None:
+        self._overlays.clear()
+
+
+def _touch(annotation: FrameAnnotation) -> None:
+    _rendered[annotation] = None
+    _rendered.move_to_end(annotation)
+    while len(_rendered) > MAX_RENDERED_OVERLAYS:
+        evicted, _ = _rendered.popitem(last=False)
+        evicted._drop_overlays()
+
+
+def overlay_to_bgra(overlay: AnnotationOverlay) -> np.ndarray:
+    """View the (premultiplied) overlay pixels as an H x W x 4 BGRA array."""
+    image = overlay.image
+    ptr = image.constBits()
+    ptr.setsize(image.byteCount())
+    rows = np.frombuffer(ptr, np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
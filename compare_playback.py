@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Synchronised A/B playback for compare mode.
+
+Each player decodes in its own FrameDecodeWorker thread, so the two
+sources are decoded concurrently instead of one after the other on the
+GUI thread. SyncedComparePlayback drives both from a single clock. At
+every tick it computes the playback step that is due and looks at the
+newest decoded frame each side has ready for it. Compare keeps both
+players on the same frame, so the frames of one clock step form a matched
+pair, and a pair is only shown once every side has its frame.
+
+Lag policy, so a slow side never stalls the other:
+
+- wait: while the sides are at most PAIR_WAIT_FRAMES apart, the newest
+  step every side has decoded is shown; the faster side waits for the
+  slower one, and frames whose time has passed are skipped, never shown
+  late one by one;
+- hold: beyond that, the sides that are ahead advance alone and the late
+  side keeps showing its last frame until it catches up;
+- resync: a side more than RESYNC_LAG_FRAMES behind the clock is not
+  made to decode every late frame; its worker is restarted
+  RESYNC_LEAD_FRAMES ahead of the clock instead.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from decode_worker import END_OF_STREAM
+
+# How far a matched pair may trail the clock before the on-time side goes on alone
+PAIR_WAIT_FRAMES = 2
+# A side this many frames behind the clock jumps ahead instead of catching up
+RESYNC_LAG_FRAMES = 12
+# How far ahead of the clock a resynced side restarts (decode head start)
+RESYNC_LEAD_FRAMES = 4
+
+
+class _Side:
+    """One player in the pair. Clock step n shows frame start_index + n."""
+
+    __slots__ = ('player', 'start_index', 'seq_offset', 'last_step', 'finished')
+
+    def __init__(self, player, start_index: int, seq_offset: int) -> None:
+        self.player = player
+        self.start_index = start_index
+        # seq of the frame due at clock step n is seq_offset + n
+        self.seq_offset = seq_offset
+        # Clock step of the last frame shown (0 = the frame on screen at start)
+        self.last_step = 0
+        self.finished = False
+
+
+class SyncedComparePlayback:
+    """
+    Plays several MediaPlayers in lockstep from one clock (GUI thread only).
+    dropped_frames, unmatched_frames and resync_count record how often the
+    lag policy applied.
+    """
+
+    def __init__(self) -> None:
+        self._sides: List[_Side] = []
+        self._fps = 24.0
+        self._start_time = None
+        self._priming = False
+        self.dropped_frames = 0
+        self.unmatched_frames = 0
+        self.resync_count = 0
+
+    def is_active(self) -> bool:
+        return self._start_time is not None
+
+    def start(self, players, fps: float) -> bool:
+        """
+        Start decoding every player that has video from its next frame.
+        Returns False if none of them can play.
+        """
+        self._sides = []
+        self._fps = fps if fps > 0 else 24.0
+        self.dropped_frames = 0
+        self.unmatched_frames = 0
+        self.resync_count = 0
+        for player in players:
+            if not player.has_media() or player.current_frame_index < 0:
+                continue
+            base_seq = player.restart_synced_decode(player.current_frame_index + 1)
+            if base_seq is None:
+                continue
+            self._sides.append(_Side(player, player.current_frame_index, base_seq - 1))
+        if not self._sides:
+            self._start_time = None
+            return False
+        self._start_time = time.monotonic()
+        self._priming = True
+        return True
+
+    def restart(self) -> bool:
+        """Start again from the players' current frames (after a seek)."""
+        if self._start_time is None:
+            return False
+        return self.start([side.player for side in self._sides], self._fps)
+
+    def stop(self) -> None:
+        self._start_time = None
+        self._sides = []
+
+    def advance(self):
+        """
+        Present whatever is due. Returns (changed, finished): changed if any
+        side has a new current frame, finished once every side reached its end.
+        """
+        if self._start_time is None:
+            return False, True
+        step = int((time.monotonic() - self._start_time) * self._fps)
+
+        # Newest ready step per side, None while a side has nothing due yet
+        ready: Dict[_Side, Optional[int]] = {}
+        for side in self._sides:
+            if side.finished:
+                continue
+            seq = side.player.synced_ready_seq(side.seq_offset + step)
+            if seq is END_OF_STREAM:
+                side.finished = True
+            else:
+                ready[side] = None if seq is None else seq - side.seq_offset
+        if not ready:
+            return False, True
+
+        all_ready = None not in ready.values()
+        if not all_ready and self._priming:
+            # Until every side has its first frame, hold the clock so nothing is dropped
+            self._start_time = time.monotonic() - 1.0 / self._fps
+            return False, False
+
+        # How far the fastest side is ahead of the slowest (a side with nothing due counts as its last frame)
+        reached = [side.last_step if target is None else target for side, target in ready.items()]
+        spread = max(reached) - min(reached)
+        matched = spread <= PAIR_WAIT_FRAMES
+        if matched:
+            # Show the newest step every side has, or wait briefly for the slower side
+            pair_step = min(reached)
+            targets = {side: pair_step for side in ready} if all_ready else {}
+        else:
+            # A side is too far behind to wait for: the others go on alone
+            targets = {side: target for side, target in ready.items() if target is not None}
+
+        changed = False
+        for side, target in targets.items():
+            if target > side.last_step and self._take(side, target):
+                changed = True
+        for side in ready:
+            if step - side.last_step > RESYNC_LAG_FRAMES:
+                # Decoding slower than the clock: stop trailing further behind
+                self._resync(side, step)
+        if changed:
+            self._priming = False
+            if not matched:
+                self.unmatched_frames += 1
+        return changed, all(side.finished for side in self._sides)
+
+    def _take(self, side: _Side, target_step: int) -> bool:
+        item = side.player.take_synced_frame(side.seq_offset + target_step)
+        if item is None or item is END_OF_STREAM:
+            return False
+        taken_step = item[0] - side.seq_offset
+        self.dropped_frames += max(0, taken_step - side.last_step - 1)
+        side.last_step = taken_step
+        return True
+
+    def _resync(self, side: _Side, step: int) -> None:
+        player = side.player
+        target_step = step + RESYNC_LEAD_FRAMES
+        target_index = self._index_for(side, target_step)
+        if target_index is None:
+            return
+        base_seq = player.restart_synced_decode(target_index)
+        if base_seq is None:
+            return
+        side.seq_offset = base_seq - target_step
+        self.dropped_frames += target_step - side.last_step - 1
+        side.last_step = target_step - 1
+        self.resync_count += 1
+
+    @staticmethod
+    def _index_for(side: _Side, step: int) -> Optional[int]:
+        """Frame index a side shows at a clock step (loop range applied)."""
+        player = side.player
+        index = side.start_index + step
+        loop_in, loop_out = player.loop_in_point, player.loop_out_point
+        if loop_out is not None and side.start_index <= loop_out < index:
+            loop_in = loop_in or 0
+            index = loop_in + (index - loop_in) % (loop_out - loop_in + 1)
+        if player.total_frames > 0 and index >= player.total_frames:
+            return None
+        return index
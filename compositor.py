@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Side-by-side compositing for compare mode.
+
+update_composite_view runs on every compare tick. Blending the annotation
+QImages in float64 and hconcat-ing freshly resized frames allocated
+several full-frame buffers per tick. CompareCompositor instead:
+
+- keeps each annotation overlay as premultiplied uint8 arrays (colour and
+  inverse alpha) for its bounding rectangle only, cached per annotation
+  version and size, so an edit invalidates it;
+- resizes or copies both frames straight into a preallocated output
+  buffer and blends the overlays into it in place with saturating cv2
+  integer ops;
+- reuses the last composite when neither the frames nor the annotations
+  changed (paused, or a repaint without a new frame).
+
+Two output buffers are used in turn: the viewer keeps a reference to the
+composite it is showing (it paints from the array without copying), so
+the next composite is never written into the one on screen.
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QRect
+
+from annotation_store import FrameAnnotation, overlay_to_bgra
+
+# Annotation overlays (per frame and size) kept as blend-ready arrays
+MAX_CACHED_OVERLAYS = 32
+
+
+class CompareCompositor:
+    """Builds the A|B composite of two BGR frames with their annotations."""
+
+    def __init__(self, max_cached_overlays: int = MAX_CACHED_OVERLAYS) -> None:
+        self.max_cached_overlays = max_cached_overlays
+        self._buffers = [None, None]
+        self._next_buffer = 0
+        self._overlays: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._last_inputs = None
+        self._last_versions = None
+        self._last_result = None
+
+    def compose(self, frame_a: np.ndarray, annotation_a: Optional[FrameAnnotation],
+                frame_b: np.ndarray, annotation_b: Optional[FrameAnnotation]) -> Tuple[np.ndarray, int, int]:
+        """
+        Return (composite, width_a, width_b): both frames scaled to the
+        smaller of their heights, side by side, with annotations blended.
+        """
+        inputs = (frame_a, annotation_a, frame_b, annotation_b)
+        versions = (_version_of(annotation_a), _version_of(annotation_b))
+        if (self._last_inputs is not None and versions == self._last_versions
+                and all(new is old for new, old in zip(inputs, self._last_inputs))):
+            return self._last_result
+
+        target_h = min(frame_a.shape[0], frame_b.shape[0])
+        width_a = max(1, int(frame_a.shape[1] * target_h / frame_a.shape[0]))
+        width_b = max(1, int(frame_b.shape[1] * target_h / frame_b.shape[0]))
+        output = self._output_buffer(target_h, width_a + width_b)
+
+        for frame, annotation, x_offset, width in ((frame_a, annotation_a, 0, width_a),
+                                                   (frame_b, annotation_b, width_a, width_b)):
+            region = output[:, x_offset:x_offset + width]
+            if frame.shape[:2] == (target_h, width):
+                region[:] = frame
+            else:
+                cv2.resize(frame, (width, target_h), dst=region, interpolation=cv2.INTER_AREA)
+            if annotation is not None:
+                self._blend_annotation(region, annotation)
+
+        self._last_inputs = inputs
+        self._last_versions = versions
+        self._last_result = (output, width_a, width_b)
+        return self._last_result
+
+    def clear(self) -> None:
+        """Drop buffers and cached overlays (e.g. when compare mode ends)."""
+        self._buffers = [None, None]
+        self._overlays.clear()
+        self._last_inputs = None
+        self._last_versions = None
+        self._last_result = None
+
+    def _output_buffer(self, height: int, width: int) -> np.ndarray:
+        index = self._next_buffer
+        self._next_buffer = 1 - index
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape != (height, width, 3):
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self._buffers[index] = buffer
+        return buffer
+
+    def _blend_annotation(self, region: np.ndarray, annotation: FrameAnnotation) -> None:
+        height, width = region.shape[:2]
+        cached = self._overlay_arrays(annotation, width, height)
+        if cached is None:
+            return
+        (x0, y0, x1, y1), color, inverse_alpha = cached
+        target = region[y0:y1, x0:x1]
+        # Premultiplied over: out = frame * (255 - a) / 255 + colour
+        cv2.multiply(target, inverse_alpha, dst=target, scale=1.0 / 255.0)
+        cv2.add(target, color, dst=target)
+
+    def _overlay_arrays(self, annotation: FrameAnnotation, width: int, height: int):
+        key = (id(annotation), annotation.version, width, height)
+        cached = self._overlays.get(key)
+        if cached is not None and cached[0] is annotation:
+            self._overlays.move_to_end(key)
+            return cached[1]
+        overlay = annotation.overlay(width, height)
+        arrays = None
+        if overlay is not None:
+            rect = overlay.rect.intersected(QRect(0, 0, width, height))
+            if not rect.isEmpty():
+                bgra = overlay_to_bgra(overlay)
+                dx, dy = rect.x() - overlay.rect.x(), rect.y() - overlay.rect.y()
+                bgra = bgra[dy:dy + rect.height(), dx:dx + rect.width()]
+                color = np.ascontiguousarray(bgra[:, :, :3])
+                inverse_alpha = cv2.cvtColor(255 - bgra[:, :, 3], cv2.COLOR_GRAY2BGR)
+                arrays = ((rect.x(), rect.y(), rect.x() + rect.width(), rect.y() + rect.height()),
+                          color, inverse_alpha)
+        # The annotation is held so its id cannot be reused while cached
+        self._overlays[key] = (annotation, arrays)
+        while len(self._overlays) > self.max_cached_overlays:
+            self._overlays.popitem(last=False)
+        return arrays
+
+
+def _version_of(annotation: Optional[FrameAnnotation]) -> Optional[int]:
+    return annotation.version if annotation is not None else None
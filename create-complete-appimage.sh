@@ -126,6 +126,19 @@ LAUNCHER
     cp timeline_widget.py AppDir-Complete/opt/kenae-player/
     cp drawing_toolbar.py AppDir-Complete/opt/kenae-player/
     cp sequence_capture.py AppDir-Complete/opt/kenae-player/
+    cp decode_worker.py AppDir-Complete/opt/kenae-player/
+    cp keyframe_index.py AppDir-Complete/opt/kenae-player/
+    cp proxy_manager.py AppDir-Complete/opt/kenae-player/
+    cp media_info_store.py AppDir-Complete/opt/kenae-player/
+    cp media_probe.py AppDir-Complete/opt/kenae-player/
+    cp sequence_index.py AppDir-Complete/opt/kenae-player/
+    cp annotation_store.py AppDir-Complete/opt/kenae-player/
+    cp compositor.py AppDir-Complete/opt/kenae-player/
+    cp compare_playback.py AppDir-Complete/opt/kenae-player/
+    cp media_preloader.py AppDir-Complete/opt/kenae-player/
+    cp segment_map.py AppDir-Complete/opt/kenae-player/
+    cp mark_index.py AppDir-Complete/opt/kenae-player/
+    cp loop_cache.py AppDir-Complete/opt/kenae-player/
     
     # Copy src directory
     cp -r src/* AppDir-Complete/opt/kenae-player/src/ 2>/dev/null || true
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Background frame decoding for playback.
+
+FrameDecodeWorker owns a private capture for the active media and keeps a
+bounded ring buffer of decoded frames ahead of the playhead. The GUI timer
+only presents frames that are already sitting in the buffer, so a slow
+decode never blocks painting, input or the timer itself.
+
+Reverse playback decodes whole GOP chunks forward (keyframe to target) and
+queues them in reverse order, so every frame costs one forward decode
+instead of a seek from the previous keyframe.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+import cv2
+from PyQt5.QtCore import QThread
+
+from sequence_capture import ImageSequenceCapture
+
+# Marker returned by FrameDecodeWorker.take_up_to() once the stream is done.
+END_OF_STREAM = object()
+
+# Chunk length when the capture has no keyframe index (plain cv2 fallback).
+DEFAULT_REVERSE_CHUNK_FRAMES = 24
+# Upper bound on frames held per reverse chunk (very long GOPs are re-decoded
+# from their keyframe in slices instead of being held in memory at once).
+MAX_REVERSE_CHUNK_FRAMES = 64
+
+
+def chunk_decode_start(capture, frame_index: int) -> int:
+    """
+    Return the frame a forward decode has to start from to reach frame_index
+    cheaply: the preceding keyframe when the capture knows its GOP layout,
+    frame_index itself for image sequences (every frame is independent).
+    """
+    keyframe_for = getattr(capture, 'keyframe_for', None)
+    if keyframe_for is not None:
+        return keyframe_for(frame_index)
+    if isinstance(capture, ImageSequenceCapture):
+        return frame_index
+    return max(0, frame_index - DEFAULT_REVERSE_CHUNK_FRAMES + 1)
+
+
+def decode_chunk(capture, capture_pos: int, decode_start: int, keep_start: int, end_index: int,
+                 frame_cache=None, cache_media=None, should_abort: Optional[Callable] = None):
+    """
+    Decode decode_start..end_index forward and return the frames from
+    keep_start on as a list of (frame_index, frame), plus the new capture
+    position. Frames already in frame_cache are reused; decoded frames are
+    added to it. Returns (None, -1) if the capture fails before end_index.
+    """
+    if frame_cache is not None:
+        cached = [(i, frame_cache.getFrame((cache_media, i))) for i in range(keep_start, end_index + 1)]
+        if all(frame is not None for _, frame in cached):
+            return cached, capture_pos
+
+    if capture_pos != decode_start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, decode_start)
+    frames = []
+    for index in range(decode_start, end_index + 1):
+        if should_abort is not None and should_abort():
+            return None, -1
+        ret, frame = capture.read()
+        if not ret:
+            return None, -1
+        if index >= keep_start:
+            frames.append((index, frame))
+            if frame_cache is not None:
+                frame_cache.addFrame((cache_media, index), frame)
+    return frames, end_index + 1
+
+
+class FrameDecodeWorker(QThread):
+    """
+    Decoder thread with a read-ahead ring buffer.
+
+    Every buffered entry is tagged with a monotonically increasing sequence
+    number in playback order, so loop wraps (out point -> in point) are just
+    the next entries in the buffer. The consumer maps its playback clock to a
+    sequence number and takes the newest entry that is due.
+    """
+
+    def __init__(self, file_path: str, capture_factory: Callable, buffer_size: int = 8,
+                 frame_cache=None, parent=None) -> None:
+        super().__init__(parent)
+        self.file_path = file_path
+        self.capture_factory = capture_factory
+        self.buffer_size = max(2, int(buffer_size))
+        # Cache RAM bersama (FrameManager); frame yang sudah ada tidak didecode ulang
+        self.frame_cache = frame_cache
+        self._cond = threading.Condition()
+        self._buffer = deque()  # (seq, frame_index | None, frame | None)
+        self._generation = 0
+        self._start_index = 0
+        self._loop_range: Optional[Tuple[int, int]] = None
+        self._direction = 1
+        self._total_frames = 0
+        self._next_seq = 0
+        self._eos_queued = False
+        self._stop_requested = False
+
+    # --- API untuk thread GUI ---
+
+    def restart(self, start_index: int, loop_range=None, total_frames: Optional[int] = None,
+                direction: int = 1) -> int:
+        """
+        Point the decoder at start_index and return the sequence number that
+        frame will carry. direction is 1 for forward and -1 for reverse play.
+        Frames already buffered are kept when they continue exactly from
+        start_index with the same loop range and direction (resume after pause).
+        """
+        loop_range = self._normalize_loop(loop_range)
+        direction = -1 if direction < 0 else 1
+        with self._cond:
+            if total_frames is not None:
+                self._total_frames = int(total_frames)
+            if (self._buffer and self._buffer[0][1] == start_index
+                    and loop_range == self._loop_range and direction == self._direction):
+                return self._buffer[0][0]
+            self._generation += 1
+            self._buffer.clear()
+            self._eos_queued = False
+            self._start_index = int(start_index) if direction < 0 else max(0, int(start_index))
+            self._loop_range = loop_range
+            self._direction = direction
+            self._cond.notify_all()
+            return self._next_seq
+
+    def take_up_to(self, seq_limit: int):
+        """
+        Pop every buffered frame with seq <= seq_limit and return the newest
+        one as (frame_index, frame). Older frames are dropped (the clock has
+        already passed them). Returns None on underrun, or END_OF_STREAM when
+        the end marker is due and no frame precedes it.
+        """
+        taken = self.take_entry_up_to(seq_limit)
+        if taken is None or taken is END_OF_STREAM:
+            return taken
+        return taken[1], taken[2]
+
+    def take_entry_up_to(self, seq_limit: int):
+        """Like take_up_to(), but returns the entry as (seq, frame_index, frame)."""
+        taken = None
+        with self._cond:
+            while self._buffer and self._buffer[0][0] <= seq_limit:
+                if self._buffer[0][1] is None:
+                    if taken is None:
+                        return END_OF_STREAM
+                    break
+                taken = self._buffer.popleft()
+            if taken is not None:
+                self._cond.notify_all()
+        return taken
+
+    def ready_seq_up_to(self, seq_limit: int):
+        """
+        Sequence number of the newest buffered frame with seq <= seq_limit,
+        without taking it. Returns None if none is ready, or END_OF_STREAM
+        when the end marker is due and no frame precedes it.
+        """
+        ready = None
+        with self._cond:
+            for seq, frame_index, _ in self._buffer:
+                if seq > seq_limit:
+                    break
+                if frame_index is None:
+                    return END_OF_STREAM if ready is None else ready
+                ready = seq
+        return ready
+
+    def shutdown(self) -> None:
+        """Hentikan thread dan tunggu sampai capture dilepas."""
+        with self._cond:
+            self._stop_requested = True
+            self._buffer.clear()
+            self._cond.notify_all()
+        self.wait()
+
+    # --- Thread decoder ---
+
+    def run(self) -> None:
+        capture = self.capture_factory(self.file_path)
+        if capture is None:
+            with self._cond:
+                generation = self._generation
+            self._push(generation, None, None)
+            return
+
+        generation = None
+        next_index = 0
+        capture_pos = 0
+        loop_range = None
+        direction = 1
+        total = 0
+        # Reverse play: decoded chunk frames waiting for buffer space, newest first
+        reverse_ready = deque()
+        try:
+            while True:
+                with self._cond:
+                    # In reverse the next chunk is decoded while the buffer is full
+                    while (not self._stop_requested and generation == self._generation
+                           and (self._eos_queued or (len(self._buffer) >= self.buffer_size
+                                                     and (direction > 0 or reverse_ready)))):
+                        self._cond.wait()
+                    if self._stop_requested:
+                        break
+                    if generation != self._generation:
+                        generation = self._generation
+                        next_index = self._start_index
+                        loop_range = self._loop_range
+                        direction = self._direction
+                        reverse_ready.clear()
+                    total = self._total_frames
+                    buffer_full = len(self._buffer) >= self.buffer_size
+
+                if direction < 0:
+                    if reverse_ready and not buffer_full:
+                        if self._push(generation, *reverse_ready[0]):
+                            reverse_ready.popleft()
+                        continue
+                    if reverse_ready:
+                        continue
+                    next_index, capture_pos = self._decode_reverse_chunk(
+                        capture, capture_pos, generation, next_index, loop_range, total, reverse_ready)
+                    continue
+
+                if loop_range is not None and next_index > loop_range[1]:
+                    next_index = loop_range[0]
+                if total > 0 and next_index >= total:
+                    self._push(generation, None, None)
+                    continue
+
+                cache_key = (self.file_path, next_index)
+                frame = self.frame_cache.getFrame(cache_key) if self.frame_cache is not None else None
+                if frame is None:
+                    if next_index != capture_pos:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, next_index)
+                    ret, frame = capture.read()
+                    capture_pos = next_index + 1 if ret else -1
+                    if not ret:
+                        self._push(generation, None, None)
+                        continue
+                    if self.frame_cache is not None:
+                        self.frame_cache.addFrame(cache_key, frame)
+                if self._push(generation, next_index, frame):
+                    next_index += 1
+        finally:
+            capture.release()
+
+    def _decode_reverse_chunk(self, capture, capture_pos, generation, next_index, loop_range,
+                              total, reverse_ready):
+        """Decode the chunk ending at next_index into reverse_ready; return (next_index, capture_pos)."""
+        if total > 0 and next_index >= total:
+            next_index = total - 1
+        lower_bound = 0
+        if loop_range is not None:
+            if next_index < loop_range[0]:
+                next_index = loop_range[1]
+            if next_index >= loop_range[0]:
+                lower_bound = loop_range[0]
+        if next_index < 0:
+            self._push(generation, None, None)
+            return next_index, capture_pos
+
+        decode_start = chunk_decode_start(capture, next_index)
+        keep_start = max(decode_start, lower_bound, next_index - MAX_REVERSE_CHUNK_FRAMES + 1)
+        frames, capture_pos = decode_chunk(
+            capture, capture_pos, decode_start, keep_start, next_index,
+            self.frame_cache, self.file_path,
+            should_abort=lambda: self._stop_requested or generation != self._generation)
+        if frames is None:
+            if not self._stop_requested and generation == self._generation:
+                self._push(generation, None, None)
+            return next_index, capture_pos
+        reverse_ready.extend(reversed(frames))
+        return keep_start - 1, capture_pos
+
+    def _push(self, generation, frame_index, frame) -> bool:
+        with self._cond:
+            if generation != self._generation or self._stop_requested:
+                return False
+            self._buffer.append((self._next_seq, frame_index, frame))
+            self._next_seq += 1
+            if frame_index is None:
+                self._eos_queued = True
+            self._cond.notify_all()
+            return True
+
+    @staticmethod
+    def _normalize_loop(loop_range):
+        if not loop_range:
+            return None
+        in_point, out_point = loop_range
+        if in_point is None and out_point is None:
+            return None
+        in_point = 0 if in_point is None else int(in_point)
+        if out_point is None or int(out_point) < in_point:
+            return None
+        return in_point, int(out_point)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Persistent keyframe/GOP index for video files.
+
+The index is built once per file by demuxing the video stream with PyAV
+(packets only, nothing is decoded) and records every packet PTS in
+presentation order, which of those frames are keyframes and therefore the
+exact frame count. It is stored as JSON in the application cache directory,
+keyed by path + size + mtime, so reopening a file costs a single small read.
+Building it reads the whole file, so callers on the GUI thread only look up
+an existing index (build=False) and leave building to a background thread.
+
+IndexedVideoCapture uses the index to provide the subset of the
+cv2.VideoCapture API the player needs with frame-accurate seeking: a seek
+jumps to the nearest preceding keyframe and decodes forward only to the
+exact PTS of the target frame.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from bisect import bisect_right
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+try:
+    import av
+except ImportError:  # PyAV is optional; callers fall back to cv2.VideoCapture
+    av = None
+
+from src.utils.helpers import getCacheDir, ensureDirectoryExists
+
+INDEX_VERSION = 1
+INDEX_DIR_NAME = 'keyframe_index'
+
+_memory_cache: Dict[str, 'KeyframeIndex'] = {}
+_memory_cache_lock = threading.Lock()
+
+
+class KeyframeIndex:
+    """
+    Packet PTS and keyframe positions of one video stream.
+
+    Frame indices are in presentation order: frame i has PTS pts[i] and the
+    keyframes list holds the frame indices of the keyframes, sorted.
+    """
+
+    def __init__(self, pts: List[int], keyframes: List[int], time_base: Fraction,
+                 fps: float, stream_index: int = 0) -> None:
+        self.pts = pts
+        self.keyframes = keyframes
+        self.time_base = time_base
+        self.fps = fps
+        self.stream_index = stream_index
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    def keyframe_for(self, frame_index: int) -> int:
+        """Return the index of the last keyframe at or before frame_index."""
+        pos = bisect_right(self.keyframes, frame_index) - 1
+        return self.keyframes[pos] if pos >= 0 else 0
+
+    def to_dict(self) -> dict:
+        return {
+            'version': INDEX_VERSION,
+            'stream_index': self.stream_index,
+            'time_base': [self.time_base.numerator, self.time_base.denominator],
+            'fps': self.fps,
+            'pts': self.pts,
+            'keyframes': self.keyframes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional['KeyframeIndex']:
+        if data.get('version') != INDEX_VERSION or not data.get('pts'):
+            return None
+        num, den = data['time_base']
+        return cls(list(data['pts']), list(data['keyframes']), Fraction(num, den),
+                   float(data['fps']), int(data.get('stream_index', 0)))
+
+    @classmethod
+    def build(cls, file_path: str,
+              is_cancelled: Optional[Callable[[], bool]] = None) -> Optional['KeyframeIndex']:
+        """
+        Demux the first video stream of file_path without decoding it.
+        Returns None as soon as is_cancelled() is true.
+        """
+        if av is None:
+            return None
+        try:
+            with av.open(file_path) as container:
+                if not container.streams.video:
+                    return None
+                stream = container.streams.video[0]
+                packets = []
+                for packet in container.demux(stream):
+                    if is_cancelled is not None and is_cancelled():
+                        return None
+                    # Flush packets carry no data and no timestamp
+                    if packet.size == 0:
+                        continue
+                    pts = packet.pts if packet.pts is not None else packet.dts
+                    if pts is None:
+                        continue
+                    packets.append((pts, bool(packet.is_keyframe)))
+                rate = stream.average_rate or stream.guessed_rate
+                fps = float(rate) if rate else 0.0
+                time_base = Fraction(stream.time_base.numerator, stream.time_base.denominator)
+                stream_index = stream.index
+        except (av.FFmpegError, OSError):
+            return None
+
+        if not packets:
+            return None
+        packets.sort(key=lambda item: item[0])
+        pts = [p for p, _ in packets]
+        keyframes = [i for i, (_, key) in enumerate(packets) if key]
+        if not keyframes:
+            keyframes = [0]
+        return cls(pts, keyframes, time_base, fps, stream_index)
+
+
+def _index_signature(file_path: str) -> Optional[str]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def load_keyframe_index(file_path: str, build: bool = True,
+                        is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[KeyframeIndex]:
+    """
+    Return the keyframe index of file_path, building and persisting it on
+    first use. With build=False only an index already in memory or on disk
+    is returned. Returns None if the file cannot be indexed or the build
+    was cancelled.
+    """
+    signature = _index_signature(file_path)
+    if signature is None:
+        return None
+
+    with _memory_cache_lock:
+        index = _memory_cache.get(signature)
+    if index is not None:
+        return index
+
+    index_dir = os.path.join(getCacheDir(), INDEX_DIR_NAME)
+    index_path = os.path.join(index_dir, f"{signature}.json")
+    try:
+        with open(index_path, 'r', encoding='utf-8') as handle:
+            index = KeyframeIndex.from_dict(json.load(handle))
+    except (OSError, ValueError, KeyError, TypeError):
+        index = None
+
+    if index is None:
+        if not build:
+            return None
+        index = KeyframeIndex.build(file_path, is_cancelled)
+        if index is None:
+            return None
+        try:
+            ensureDirectoryExists(index_dir)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(index.to_dict(), handle, separators=(',', ':'))
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass  # Index still works for this session, it just isn't persisted
+
+    with _memory_cache_lock:
+        _memory_cache[signature] = index
+    return index
+
+
+class IndexedVideoCapture:
+    """
+    Frame-accurate video capture backed by a KeyframeIndex.
+
+    Sequential reads decode straight through. A jump backwards, or forwards
+    past the next keyframe, seeks to the keyframe preceding the target and
+    decodes forward until the frame with the target's PTS.
+    """
+
+    def __init__(self, file_path: str, index: KeyframeIndex) -> None:
+        self.file_path = file_path
+        self.index = index
+        self._container = None
+        self._stream = None
+        self._frames = None
+        self._next_decode_index = -1  # frame the decoder yields next (-1: unknown)
+        self._current_index = 0
+        try:
+            self._container = av.open(file_path)
+            self._stream = self._container.streams.video[index.stream_index]
+            self._stream.thread_type = 'AUTO'
+        except (av.FFmpegError, OSError, IndexError):
+            self.release()
+
+    @classmethod
+    def open(cls, file_path: str, build_index: bool = True) -> Optional['IndexedVideoCapture']:
+        """
+        Open file_path, or return None if PyAV or the index is unavailable
+        (with build_index=False, also if the index has not been built yet).
+        """
+        if av is None:
+            return None
+        index = load_keyframe_index(file_path, build=build_index)
+        if index is None:
+            return None
+        capture = cls(file_path, index)
+        return capture if capture.isOpened() else None
+
+    def isOpened(self) -> bool:
+        return self._container is not None
+
+    def keyframe_for(self, frame_index: int) -> int:
+        """Return the index of the keyframe a decode of frame_index starts from."""
+        return self.index.keyframe_for(frame_index)
+
+    def read(self):
+        if not self.isOpened() or self._current_index >= self.index.frame_count:
+            return False, None
+
+        target = self._current_index
+        key = self.index.keyframe_for(target)
+        if (self._next_decode_index < 0 or target < self._next_decode_index
+                or key > self._next_decode_index):
+            self._seek_to_keyframe(key)
+
+        target_pts = self.index.pts[target]
+        frame = None
+        try:
+            for decoded in self._frames:
+                pts = decoded.pts
+                if pts is not None and pts < target_pts:
+                    continue
+                frame = decoded
+                break
+        except av.FFmpegError:
+            frame = None
+
+        if frame is None:
+            self._next_decode_index = -1
+            return False, None
+
+        self._next_decode_index = target + 1
+        self._current_index = target + 1
+        return True, frame.to_ndarray(format='bgr24')
+
+    def _seek_to_keyframe(self, key_index: int) -> None:
+        self._container.seek(self.index.pts[key_index], stream=self._stream,
+                             backward=True, any_frame=False)
+        self._frames = self._container.decode(self._stream)
+        self._next_decode_index = key_index
+
+    def set(self, prop_id, value) -> bool:
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            try:
+                new_index = int(value)
+            except (TypeError, ValueError):
+                return False
+            self._current_index = max(0, min(new_index, self.index.frame_count))
+            return True
+        return False
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.index.frame_count)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._current_index)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.index.fps)
+        if self._stream is not None:
+            if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+                return float(self._stream.codec_context.width)
+            if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+                return float(self._stream.codec_context.height)
+        return 0.0
+
+    def release(self) -> None:
+        if self._container is not None:
+            self._container.close()
+        self._container = None
+        self._stream = None
+        self._frames = None
+        self._next_decode_index = -1
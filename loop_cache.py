@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+RAM-pinned loop ranges.
+
+A marked-range loop jumps back to its in-point on every pass, and the
+frames of the range are decoded again unless the frame cache happens to
+still hold them. LoopRangeCache decodes the whole range into the shared
+frame cache in a background thread and pins it, so eviction never touches
+it. From the second pass on, the decode workers (and the segment switches
+of a range that spans several clips) only take cache hits.
+
+A range is given as pieces, one per media it covers: (media_key,
+first_index, last_index) in the key space of the frame cache, indices
+inclusive. estimate_bytes() tells the caller how much memory the range
+will hold before anything is pinned.
+"""
+
+from typing import Callable, List, Sequence, Tuple
+
+import cv2
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+LoopPiece = Tuple[str, int, int]
+
+# Prefix of the pinned-range names in the frame cache
+PIN_PREFIX = 'loop-cache'
+# Frames between two progress signals
+PROGRESS_INTERVAL = 12
+
+
+def piece_frames(pieces: Sequence[LoopPiece]) -> int:
+    return sum(max(0, last - first + 1) for _, first, last in pieces)
+
+
+def estimate_bytes(pieces: Sequence[LoopPiece], frame_bytes: Callable[[str], int]) -> int:
+    """Memory the decoded range needs; frame_bytes(media_key) is the size of one frame."""
+    return sum(max(0, last - first + 1) * frame_bytes(media_key) for media_key, first, last in pieces)
+
+
+class LoopRangeLoader(QThread):
+    """Decodes every piece into the frame cache, skipping frames already cached."""
+
+    progress = pyqtSignal(int, int)  # frames done, frames total
+
+    def __init__(self, pieces: Sequence[LoopPiece], capture_factory: Callable, frame_cache,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.pieces = list(pieces)
+        self.capture_factory = capture_factory
+        self.frame_cache = frame_cache
+        self.frames_done = 0
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self) -> None:
+        total = piece_frames(self.pieces)
+        for media_key, first_index, last_index in self.pieces:
+            capture = None
+            capture_pos = -1
+            try:
+                for index in range(first_index, last_index + 1):
+                    if self._cancelled:
+                        return
+                    cache_key = (media_key, index)
+                    if not self.frame_cache.hasFrame(cache_key):
+                        if capture is None:
+                            capture = self.capture_factory(media_key)
+                            if capture is None:
+                                break
+                        if index != capture_pos:
+                            capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                        ret, frame = capture.read()
+                        capture_pos = index + 1 if ret else -1
+                        if not ret:
+                            break
+                        self.frame_cache.addFrame(cache_key, frame)
+                    self.frames_done += 1
+                    if self.frames_done % PROGRESS_INTERVAL == 0:
+                        self.progress.emit(self.frames_done, total)
+            finally:
+                if capture is not None:
+                    capture.release()
+        self.progress.emit(self.frames_done, total)
+
+
+class LoopRangeCache(QObject):
+    """
+    Keeps one loop range pinned and loaded in a frame cache (GUI thread
+    only). ready is emitted with the number of frames cached once the
+    loader has gone through the whole range.
+    """
+
+    progress = pyqtSignal(int, int)
+    ready = pyqtSignal(int)
+
+    def __init__(self, frame_cache, capture_factory: Callable, parent=None) -> None:
+        super().__init__(parent)
+        self.frame_cache = frame_cache
+        self.capture_factory = capture_factory
+        self.pieces: List[LoopPiece] = []
+        self._pin_names: List[str] = []
+        self._loader = None
+        # Cancelled loaders are kept referenced until their thread has ended
+        self._loaders = set()
+
+    def is_active(self) -> bool:
+        return bool(self.pieces)
+
+    def is_loading(self) -> bool:
+        return self._loader is not None
+
+    def start(self, pieces: Sequence[LoopPiece]) -> None:
+        """Pin pieces and start loading them (no-op if that range is already held)."""
+        pieces = [piece for piece in pieces if piece[0] and piece[2] >= piece[1]]
+        if pieces == self.pieces:
+            return
+        self.stop()
+        if not pieces:
+            return
+        self.pieces = pieces
+        for number, (media_key, first_index, last_index) in enumerate(pieces):
+            name = f"{PIN_PREFIX}-{number}"
+            self.frame_cache.setPinnedRange(name, media_key, first_index, last_index)
+            self._pin_names.append(name)
+        self._loader = LoopRangeLoader(pieces, self.capture_factory, self.frame_cache)
+        self._loader.progress.connect(self._on_progress)
+        self._loader.finished.connect(self._on_loader_finished)
+        self._loaders.add(self._loader)
+        # Below playback: the first pass must not stutter because of the loader
+        self._loader.start(QThread.LowPriority)
+
+    def stop(self) -> None:
+        """Release the range: cancel loading and unpin (the frames become evictable)."""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+        for name in self._pin_names:
+            self.frame_cache.clearPinnedRange(name)
+        self._pin_names = []
+        self.pieces = []
+
+    def shutdown(self) -> None:
+        """Stop and wait for every loader thread (application exit)."""
+        self.stop()
+        for loader in list(self._loaders):
+            loader.cancel()
+            loader.wait()
+        self._loaders.clear()
+
+    def _on_progress(self, done: int, total: int) -> None:
+        if self.sender() is self._loader:
+            self.progress.emit(done, total)
+
+    def _on_loader_finished(self) -> None:
+        loader = self.sender()
+        if loader is None:
+            return
+        self._loaders.discard(loader)
+        if loader is self._loader:
+            self._loader = None
+            if not loader.is_cancelled():
+                self.ready.emit(loader.frames_done)
+        loader.deleteLater()
@@ -6,6 +6,7 @@ A PyQt5-based media player optimized for viewing image sequences and video files
 
 import sys
 import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
@@ -39,4 +40,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Diperlukan oleh process pool proxy pada build PyInstaller
+    multiprocessing.freeze_support()
     main()
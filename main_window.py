@@ -16,20 +16,44 @@ from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QWidget, QMenuBar, QActio
                             QFileDialog, QHBoxLayout, QStatusBar, QLabel, QSplitter,
                             QTreeWidget, QTreeWidgetItem, QPushButton, QShortcut,
                             QTreeWidgetItemIterator, QAbstractItemView, QMessageBox,
-                            QColorDialog, QActionGroup) 
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QMimeData
+                            QColorDialog, QActionGroup, QStyledItemDelegate) 
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QMimeData, QRect
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QKeySequence, QPixmap, QDrag, QColor
-from media_player import MediaPlayer
+from media_player import MediaPlayer, DEFAULT_FRAME_CACHE_BYTES, open_playback_capture
 from media_controls import MediaControls
 from timeline_widget import TimelineWidget
 from drawing_toolbar import DrawingToolbar 
-from sequence_capture import create_media_capture
+from src.media.frame_manager import FrameManager, intersectRuns
+from proxy_manager import ProxyManager
+from media_info_store import MediaInfoStore
+from media_probe import MediaProbePool, load_media_info
+from sequence_index import resolve_media_paths
+from compositor import CompareCompositor
+from compare_playback import SyncedComparePlayback
+from segment_map import SegmentMap
+from mark_index import MarkIndex, SegmentMarkView, next_mark, previous_mark
+from loop_cache import LoopRangeCache, estimate_bytes, piece_frames
+
+# Scrub timeline: frame full-res menggantikan preview setelah mouse diam selama ini (ms)
+SCRUB_IDLE_MS = 150
+# Label durasi total diperbarui paling sering setiap ini (ms) selama probe berjalan
+DURATION_REFRESH_MS = 100
+# Mode segmen: segmen berikutnya mulai disiapkan sejauh ini (detik) sebelum cut
+SEGMENT_PRELOAD_SECONDS = 2.0
+
+# Total media subtree tiap item tree: (detik, frame, jumlah yang belum diprobe).
+# Diperbarui inkremental: hanya delta yang dirambatkan ke ancestor.
+MEDIA_TOTAL_ROLE = Qt.UserRole + 2
+# Path yang saat ini dihitung dalam total item media
+MEDIA_COUNTED_PATH_ROLE = Qt.UserRole + 3
+EMPTY_MEDIA_TOTAL = (0.0, 0, 0)
 
 # ... (Class ProjectTreeWidget tidak berubah, saya sembunyikan untuk keringkasan) ...
 class ProjectTreeWidget(QTreeWidget):
     filesDroppedOnTarget = pyqtSignal(list, object)
     treeChanged = pyqtSignal()
     timelineOrderChanged = pyqtSignal() # <-- SINYAL BARU
+    mediaInfoNeeded = pyqtSignal(list) # path yang infonya belum diketahui
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -37,6 +61,114 @@ class ProjectTreeWidget(QTreeWidget):
         self.timeline_item = None
         self.custom_mime_type = "application/x-kenae-playlist-items"
 
+        # --- Agregasi durasi subtree ---
+        # media_info_lookup(path) -> (detik, frame), atau None jika harus diprobe dulu
+        self.media_info_lookup = None
+        self._media_items = {}  # path -> [item, ...] yang dihitung dalam total
+        model = self.model()
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.dataChanged.connect(self._on_data_changed)
+        model.modelReset.connect(self._media_items.clear)
+
+    def media_total(self, item):
+        """(detik, frame, jumlah belum diprobe) dari item dan semua anaknya."""
+        total = item.data(0, MEDIA_TOTAL_ROLE) if item is not None else None
+        return tuple(total) if total else EMPTY_MEDIA_TOTAL
+
+    def set_media_info(self, path, seconds, frames):
+        """Catat info path (hasil probe) di semua item-nya dan rambatkan ke ancestor."""
+        for item in list(self._media_items.get(path, ())):
+            old_own = self._own_total(item)
+            new_own = (seconds, frames, 0)
+            self._add_to_ancestors(item, tuple(n - o for n, o in zip(new_own, old_own)))
+
+    def _own_total(self, item):
+        total = self.media_total(item)
+        for i in range(item.childCount()):
+            total = tuple(t - c for t, c in zip(total, self.media_total(item.child(i))))
+        return total
+
+    def _add_to_ancestors(self, item, delta):
+        if not any(delta):
+            return
+        while item is not None:
+            seconds, frames, pending = (t + d for t, d in zip(self.media_total(item), delta))
+            item.setData(0, MEDIA_TOTAL_ROLE, (seconds, frames, pending))
+            item = item.parent()
+
+    def _media_value(self, item, missing):
+        """Daftarkan item media di indeks path dan kembalikan kontribusinya sendiri."""
+        path = item.data(0, Qt.UserRole)
+        item.setData(0, MEDIA_COUNTED_PATH_ROLE, path)
+        if not path:
+            return EMPTY_MEDIA_TOTAL
+        self._media_items.setdefault(path, []).append(item)
+        info = self.media_info_lookup(path) if self.media_info_lookup else None
+        if info is None:
+            missing.append(path)
+            return (0.0, 0, 1)
+        return (info[0], info[1], 0)
+
+    def _unregister_media_item(self, item):
+        path = item.data(0, MEDIA_COUNTED_PATH_ROLE)
+        items = self._media_items.get(path)
+        if items:
+            items[:] = [other for other in items if other is not item]
+            if not items:
+                del self._media_items[path]
+
+    def _index_subtree(self, item, missing):
+        total = self._media_value(item, missing)
+        for i in range(item.childCount()):
+            total = tuple(t + c for t, c in zip(total, self._index_subtree(item.child(i), missing)))
+        item.setData(0, MEDIA_TOTAL_ROLE, total)
+        return total
+
+    def _unindex_subtree(self, item):
+        self._unregister_media_item(item)
+        for i in range(item.childCount()):
+            self._unindex_subtree(item.child(i))
+
+    def _child_items(self, parent_index, first, last):
+        parent = self.itemFromIndex(parent_index) if parent_index.isValid() else None
+        items = [parent.child(row) if parent else self.topLevelItem(row) for row in range(first, last + 1)]
+        return parent, [item for item in items if item is not None]
+
+    def _on_rows_inserted(self, parent_index, first, last):
+        parent, items = self._child_items(parent_index, first, last)
+        missing = []
+        delta = EMPTY_MEDIA_TOTAL
+        for item in items:
+            delta = tuple(d + t for d, t in zip(delta, self._index_subtree(item, missing)))
+        self._add_to_ancestors(parent, delta)
+        if missing:
+            self.mediaInfoNeeded.emit(missing)
+
+    def _on_rows_about_to_be_removed(self, parent_index, first, last):
+        parent, items = self._child_items(parent_index, first, last)
+        delta = EMPTY_MEDIA_TOTAL
+        for item in items:
+            self._unindex_subtree(item)
+            delta = tuple(d - t for d, t in zip(delta, self.media_total(item)))
+        self._add_to_ancestors(parent, delta)
+
+    def _on_data_changed(self, top_left, bottom_right, roles):
+        # Total sendiri juga disimpan sebagai data; hanya perubahan path yang relevan
+        if roles and Qt.UserRole not in roles:
+            return
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            item = self.itemFromIndex(top_left.sibling(row, 0))
+            if item is None or item.data(0, Qt.UserRole) == item.data(0, MEDIA_COUNTED_PATH_ROLE):
+                continue
+            old_own = self._own_total(item)
+            self._unregister_media_item(item)
+            missing = []
+            new_own = self._media_value(item, missing)
+            self._add_to_ancestors(item, tuple(n - o for n, o in zip(new_own, old_own)))
+            if missing:
+                self.mediaInfoNeeded.emit(missing)
+
     def startDrag(self, supportedActions):
         drag = QDrag(self)
         mime_data = QMimeData()
@@ -289,6 +421,30 @@ class ProjectTreeWidget(QTreeWidget):
         if timeline_reordered:
             self.timelineOrderChanged.emit()
 
+# Data item tree untuk proxy: float 0..1 selama dibuat, 1.0 = proxy siap/dipakai
+PROXY_STATE_ROLE = Qt.UserRole + 1
+
+class ProxyStateDelegate(QStyledItemDelegate):
+    """Menggambar progress pembuatan proxy dan tanda 'P' di item project tree."""
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        state = index.data(PROXY_STATE_ROLE)
+        if state is None:
+            return
+        rect = option.rect
+        painter.save()
+        if state < 1.0:
+            track = QRect(rect.left() + 4, rect.bottom() - 3, rect.width() - 8, 3)
+            painter.fillRect(track, QColor("#444444"))
+            painter.fillRect(QRect(track.left(), track.top(), int(track.width() * state), track.height()),
+                             QColor("#2d8cf0"))
+        else:
+            badge = QRect(rect.right() - 16, rect.top(), 14, rect.height())
+            painter.setPen(QColor("#7ec87e"))
+            painter.drawText(badge, Qt.AlignCenter, "P")
+        painter.restore()
+
 class PlaybackMode(Enum):
     LOOP = auto()
     PLAY_NEXT = auto()
@@ -323,9 +479,9 @@ class MainWindow(QMainWindow):
             QTreeWidget::branch:has-siblings:adjoins-item { border-image: url(none.png); }
             QTreeWidget::branch:!has-children:!has-siblings:adjoins-item { border-image: url(none.png); }
         """)
-        self.image_sequence_files, self.marks, self.splitter_sizes = [], [], []
+        self.image_sequence_files, self.marks, self.splitter_sizes = [], MarkIndex(), []
 
-        self.annotation_marks = set()
+        self.annotation_marks = MarkIndex()
         self.media_data_cache = {}
         self.current_sequence_index = 0
         self.compare_mode = False
@@ -336,12 +492,39 @@ class MainWindow(QMainWindow):
         self.show_timecode = False
         self.is_compare_playing = False
         self.compare_timer = QTimer(self)
+        self.compare_timer.setTimerType(Qt.PreciseTimer)
         self.compare_timer.timeout.connect(self.update_compare_frames)
+        # Kedua player didecode paralel oleh worker masing-masing, satu jam untuk keduanya
+        self.compare_playback = SyncedComparePlayback()
+        # Komposit A|B memakai buffer & overlay anotasi yang di-cache antar tick
+        self.compare_compositor = CompareCompositor()
         self.setAcceptDrops(False)
         self.splitter_sizes = []
         self.last_playlist_path = None
         self.media_info_cache = {}
+        # Metadata persisten (SQLite di cache dir); media_info_cache tetap jadi cache sesi
+        try:
+            self.media_info_store = MediaInfoStore()
+        except Exception as e:
+            print(f"Media info store unavailable: {e}")
+            self.media_info_store = None
         self.active_panel_for_duration = None
+        # --- Probe metadata di thread pool: durasi total & peta segmen terisi bertahap ---
+        self.media_probe = MediaProbePool(self.media_info_store, parent=self)
+        self.media_probe.infoReady.connect(self.handle_media_info_probed)
+        self.media_probe.requestFinished.connect(self.handle_media_probe_finished)
+        # Path baru di tree dikumpulkan lalu dicek ke store sekaligus sebelum diprobe
+        self.tree_probe_queue = set()
+        # Path yang gagal diprobe: dihitung 0 di tree tanpa diprobe ulang setiap kali dipindah
+        self.tree_probe_failures = set()
+        self.tree_probe_timer = QTimer(self)
+        self.tree_probe_timer.setSingleShot(True)
+        self.tree_probe_timer.timeout.connect(self._flush_tree_media_probe)
+        self.panel_duration_text = None
+        self.duration_refresh_timer = QTimer(self)
+        self.duration_refresh_timer.setSingleShot(True)
+        self.duration_refresh_timer.setInterval(DURATION_REFRESH_MS)
+        self.duration_refresh_timer.timeout.connect(self._refresh_total_duration_label)
 
         self.is_mark_tour_active = False
         self.current_mark_tour_index = 0
@@ -356,16 +539,55 @@ class MainWindow(QMainWindow):
         self.speed_action_group.setExclusive(True)
         # --- Akhir Inisialisasi ---
 
+        # --- Cache frame RAM bersama untuk kedua player ---
+        self.frame_cache_budget = DEFAULT_FRAME_CACHE_BYTES
+        self.frame_cache = FrameManager(max_cache_size=None, max_cache_bytes=self.frame_cache_budget)
+        self.frame_cache_action_group = QActionGroup(self)
+        self.frame_cache_action_group.setExclusive(True)
+        # Bar status cache di timeline: dicek berkala, dihitung ulang hanya bila cache/media berubah
+        self.cache_status_timer = QTimer(self)
+        self.cache_status_timer.setInterval(250)
+        self.cache_status_timer.timeout.connect(self._refresh_cache_status)
+        self._cache_status_key = None
+        # path klip -> kunci cache (proxy/sumber); dikosongkan saat proxy/urutan berubah
+        self._segment_media_keys = {}
+        # Loop range (LOOP_MARKED_RANGE) didecode ke RAM & di-pin bila opsi "cache loop" aktif
+        self.cache_loop_enabled = False
+        # Jawaban pengguna untuk loop range saat ini: ((in, out), disetujui) atau None
+        self._loop_cache_decision = None
+        self.loop_cache = LoopRangeCache(self.frame_cache, open_playback_capture, parent=self)
+        self.loop_cache.progress.connect(self._on_loop_cache_progress)
+        self.loop_cache.ready.connect(self._on_loop_cache_ready)
+
+        # --- Proxy (dibuat di process pool, dipakai otomatis saat load) ---
+        self.proxy_manager = ProxyManager(parent=self)
+
+        # --- Scrub timeline: hanya posisi terakhir yang dilayani ---
+        self.scrub_target = None
+        self.scrub_position = None
+        self.scrub_resume_playback = False
+        self.scrub_timer = QTimer(self)
+        self.scrub_timer.setSingleShot(True)
+        self.scrub_timer.timeout.connect(self._service_scrub)
+        self.scrub_idle_timer = QTimer(self)
+        self.scrub_idle_timer.setSingleShot(True)
+        self.scrub_idle_timer.timeout.connect(self._settle_scrub)
+
         self.current_draw_color = QColor(255, 0, 0, 255) # Default Merah
         self.pen_size = 5
         self.eraser_size = 20
 
         # --- LOGIKA SEGMEN BARU ---
-        # Peta segmen: list of dicts
-        # [{'item': item, 'path': str, 'start_frame': int, 'duration': int}]
-        self.segment_map = []
+        # Peta segmen: dict {'item', 'path', 'start_frame', 'duration'} per klip,
+        # dengan lookup bisect frame global -> segmen dan path -> segmen
+        self.segment_map = SegmentMap()
+        # Marka global mode segmen (marka lokal tiap klip digeser ke offset segmennya)
+        self.segment_marks = SegmentMarkView(self.segment_map, self.media_data_cache.get)
         self.current_segment_total_frames = 0
         self.current_segment_folder_item = None
+        # (item, path) folder yang belum masuk peta segmen (menunggu hasil probe, berurutan)
+        self.segment_pending_items = []
+        self.segment_probe_failures = set()
         # --- AKHIR LOGIKA SEGMEN ---
 
         self.setup_ui()
@@ -395,6 +617,8 @@ class MainWindow(QMainWindow):
         playlist_layout.setSpacing(0)
         self.playlist_widget = ProjectTreeWidget(self)
         self.playlist_widget.setHeaderLabels(["Project"])
+        self.playlist_widget.setItemDelegate(ProxyStateDelegate(self.playlist_widget))
+        self.playlist_widget.media_info_lookup = self._tree_media_info
         self.playlist_widget.setSelectionMode(QTreeWidget.ExtendedSelection)
         self.playlist_widget.setDragEnabled(True)
         self.playlist_widget.setAcceptDrops(True)
@@ -425,9 +649,11 @@ class MainWindow(QMainWindow):
         self.media_container = QWidget()
         self.media_container_layout = QHBoxLayout(self.media_container)
         self.media_container_layout.setContentsMargins(0,0,0,0)
-        self.media_player = MediaPlayer()
+        self.media_player = MediaPlayer(frame_cache=self.frame_cache,
+                                        proxy_resolver=self.proxy_manager.find_proxy)
         self.media_container_layout.addWidget(self.media_player)
-        self.media_player_2 = MediaPlayer(enable_audio=True)
+        self.media_player_2 = MediaPlayer(enable_audio=True, frame_cache=self.frame_cache,
+                                          proxy_resolver=self.proxy_manager.find_proxy)
         media_layout.addWidget(self.media_container, 1)
         self.timeline = TimelineWidget()
         media_layout.addWidget(self.timeline)
@@ -460,18 +686,26 @@ class MainWindow(QMainWindow):
         self.controls.volume_changed.connect(self.handle_volume_change)
         
         # Sinyal lain
-        self.timeline.position_changed.connect(self.seek_to_position)
+        self.timeline.position_changed.connect(self.handle_timeline_position)
+        self.timeline.scrubStarted.connect(self.begin_scrub)
+        self.timeline.scrubFinished.connect(self.end_scrub)
+        self.proxy_manager.progressChanged.connect(self._set_proxy_state)
+        self.proxy_manager.proxyReady.connect(self.handle_proxy_ready)
+        self.proxy_manager.proxyFailed.connect(self.handle_proxy_failed)
+        self.proxy_manager.proxyCancelled.connect(self.handle_proxy_cancelled)
         self.timeline.display_mode_changed.connect(self.set_time_display_mode)
         self.timeline.markTourSpeedChanged.connect(self.set_mark_tour_speed)
         self.media_player.frameIndexChanged.connect(self.update_frame_counter)
         self.media_player.playStateChanged.connect(self.controls.set_play_state)
         self.media_player.playbackFinished.connect(self.handle_playback_finished)
+        self.media_player.reverseFinished.connect(self.handle_reverse_finished)
         self.media_player_2.frameIndexChanged.connect(self.update_frame_counter_B)
         self.media_player.fpsChanged.connect(lambda fps: self.update_fps_display(fps, 'A'))
         self.media_player_2.fpsChanged.connect(lambda fps: self.update_fps_display(fps, 'B'))
         self.media_player.fileDropped.connect(self.handle_file_drop_on_player)
         self.playlist_widget.filesDroppedOnTarget.connect(self.handle_files_dropped)
         self.playlist_widget.treeChanged.connect(self.update_total_duration)
+        self.playlist_widget.mediaInfoNeeded.connect(self.queue_tree_media_probe)
         self.playlist_widget.itemClicked.connect(self.on_tree_item_clicked)
         self.mark_tour_timer.timeout.connect(self.advance_mark_tour)
         self.media_player.annotationAdded.connect(self.add_annotation_mark)
@@ -489,87 +723,8 @@ class MainWindow(QMainWindow):
         pass
 
     def _resolve_sequences_and_files(self, file_paths):
-        image_extensions = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.exr', '.dpx']
-        processed_files = set()
-        resolved_paths = []
-        
-        # Urutkan file input
-        sorted_paths = sorted(file_paths)
-        
-        for path in sorted_paths:
-            if path in processed_files:
-                continue
-            
-            is_image = any(path.lower().endswith(ext) for ext in image_extensions)
-            if not is_image:
-                resolved_paths.append(path)
-                processed_files.add(path)
-                continue
-            
-            dirname = os.path.dirname(path)
-            filename = os.path.basename(path)
-            # Regex untuk "nama", "angka", "ekstensi"
-            match = re.match(r'^(.*?)(\d+)(\.[^.]+)$', filename) 
-            
-            if not match:
-                resolved_paths.append(path)
-                processed_files.add(path)
-                continue
-                
-            base_name, number_str, extension = match.groups()
-            # Gunakan padding dari file PERTAMA yang kita temui sebagai "standar"
-            padding = len(number_str) 
-            
-            sequence_files = []
-            frame_numbers = []
-
-            try:
-                # Scan seluruh direktori tempat file ini berada
-                all_files_in_dir = os.listdir(dirname)
-            except OSError:
-                resolved_paths.append(path)
-                processed_files.add(path)
-                continue
-
-            for f in all_files_in_dir:
-                seq_match = re.match(r'^(.*?)(\d+)(\.[^.]+)$', f)
-                if seq_match:
-                    s_base, s_num_str, s_ext = seq_match.groups()
-                    
-                    # Cek jika base, extension, DAN PADDING cocok
-                    if s_base == base_name and s_ext.lower() == extension.lower() and len(s_num_str) == padding:
-                        full_path = os.path.join(dirname, f)
-                        
-                        # --- PERBAIKAN DI SINI ---
-                        # Hapus pengecekan 'if full_path in sorted_paths:'
-                        # Kita ingin menemukan semua file yang cocok di direktori,
-                        # tidak peduli apakah file itu ada di daftar input awal.
-                        sequence_files.append(full_path)
-                        frame_numbers.append(int(s_num_str))
-                        # --- AKHIR PERBAIKAN ---
-
-            if len(sequence_files) > 1:
-                min_frame, max_frame = min(frame_numbers), max(frame_numbers)
-                
-                # Cek jika frame kontigu (berurutan tanpa jeda)
-                if (max_frame - min_frame + 1) == len(frame_numbers):
-                    # Ya, ini sequence kontigu
-                    display_name = f"{base_name}[{min_frame:0{padding}d}-{max_frame:0{padding}d}]{extension}"
-                    sequence_pattern_path = os.path.join(dirname, f"{base_name}%0{padding}d{extension}")
-                    resolved_paths.append((sequence_pattern_path, display_name))
-                    processed_files.update(sequence_files)
-                else:
-                    # Frame tidak kontigu, tambahkan sebagai file individual
-                    for seq_file in sequence_files:
-                        if seq_file not in processed_files:
-                            resolved_paths.append(seq_file)
-                            processed_files.add(seq_file)
-            else:
-                # Bukan sequence, tambahkan file ini saja
-                resolved_paths.append(path)
-                processed_files.add(path)
-                
-        return resolved_paths
+        # Satu scandir per direktori; frame yang bolong tetap jadi satu sequence
+        return resolve_media_paths(file_paths)
     
     def handle_timeline_reorder(self):
         """
@@ -591,8 +746,16 @@ class MainWindow(QMainWindow):
         # Simpan posisi frame global saat ini
         current_global_frame = self.timeline.current_position
         
-        # Muat ulang folder segmen. Ini akan membaca urutan item yg baru.
-        self.load_folder_segments(self.current_segment_folder_item)
+        # Urutan baru dari klip yang sama: cukup hitung ulang offset segmen
+        # (tanpa probe & tanpa memuat ulang klip pertama)
+        video_items = []
+        self._collect_videos_recursive(self.current_segment_folder_item, video_items)
+        entries = [(item, item.data(0, Qt.UserRole)) for item in video_items]
+        if not self.segment_pending_items and self.segment_map.reorder(entries):
+            self._apply_segment_map_growth(reordered=True)
+        else:
+            # Muat ulang folder segmen. Ini akan membaca urutan item yg baru.
+            self.load_folder_segments(self.current_segment_folder_item)
         
         # Kembalikan playhead ke posisi semula
         if current_global_frame < self.current_segment_total_frames:
@@ -649,6 +812,15 @@ class MainWindow(QMainWindow):
             new_folder_action = context_menu.addAction("New Folder")
             parent_for_new_folder = item if item.data(0, Qt.UserRole) is None else item.parent()
             new_folder_action.triggered.connect(lambda: self.create_new_folder(parent_for_new_folder))
+        media_paths = self._collect_media_paths_recursive(item) if item.parent() else set()
+        if media_paths and self.proxy_manager.is_available():
+            if context_menu.actions(): context_menu.addSeparator()
+            proxy_action = context_menu.addAction("Generate Proxy")
+            proxy_action.triggered.connect(lambda: self.generate_proxies(media_paths))
+            pending = [p for p in media_paths if self.proxy_manager.is_pending(p)]
+            if pending:
+                cancel_proxy_action = context_menu.addAction("Cancel Proxy")
+                cancel_proxy_action.triggered.connect(lambda: [self.proxy_manager.cancel(p) for p in pending])
         if item.parent():
             if context_menu.actions(): context_menu.addSeparator()
             rename_action = context_menu.addAction("Rename")
@@ -688,22 +860,10 @@ class MainWindow(QMainWindow):
             if '%' not in file_path and any(file_path.lower().endswith(ext) for ext in image_extensions):
                 duration, frame_count = 0.0, 1
             else:
-                capture = create_media_capture(file_path)
-                if capture and capture.isOpened():
-                    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
-                    frame_count_val = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
-                    f_count = int(frame_count_val)
-                    if fps > 0 and f_count > 0:
-                        duration = f_count / fps
-                        frame_count = f_count
-                    # Jika f_count 0 (mungkin streaming/webcam), coba baca 1 frame
-                    elif f_count <= 0:
-                         ret, _ = capture.read()
-                         if ret:
-                             frame_count = 1 # Setidaknya 1 frame
-                             duration = (1.0 / fps) if fps > 0 else 0.0
-                if capture:
-                    capture.release()
+                # Cek store persisten dulu; probe (buka capture) hanya jika tidak ada/basi
+                info = load_media_info(file_path, self.media_info_store)
+                if info:
+                    duration, frame_count = self._duration_from_info(info)
         except Exception as e:
             print(f"Could not get info for {file_path}: {e}")
             duration, frame_count = 0.0, 0
@@ -714,20 +874,65 @@ class MainWindow(QMainWindow):
             
         return (duration, frame_count)
 
-    def _sum_media_info_recursive(self, parent_item):
-        total_seconds, total_frames = 0.0, 0
-        for i in range(parent_item.childCount()):
-            child = parent_item.child(i)
-            path = child.data(0, Qt.UserRole)
-            if path:
-                duration, frames = self.get_media_info(path)
-                total_seconds += duration
-                total_frames += frames
-            if child.childCount() > 0:
-                sub_seconds, sub_frames = self._sum_media_info_recursive(child)
-                total_seconds += sub_seconds
-                total_frames += sub_frames
-        return (total_seconds, total_frames)
+    @staticmethod
+    def _duration_from_info(info):
+        fps, f_count = info['fps'] or 0.0, info['frame_count'] or 0
+        if fps > 0 and f_count > 0:
+            return f_count / fps, f_count
+        # Jika f_count 0 (mungkin streaming/webcam), probe sudah mencoba baca 1 frame
+        if f_count == 1:
+            return (1.0 / fps) if fps > 0 else 0.0, 1
+        return 0.0, 0
+
+    def _warm_media_info(self, paths):
+        """Isi media_info_cache untuk banyak path sekaligus dengan satu lookup batch ke store."""
+        if not self.media_info_store:
+            return
+        missing = [p for p in paths if p and p not in self.media_info_cache]
+        if not missing:
+            return
+        for path, info in self.media_info_store.get_many(missing).items():
+            duration, frame_count = self._duration_from_info(info)
+            if frame_count > 0:
+                self.media_info_cache[path] = (duration, frame_count)
+
+    def _is_probe_needed(self, file_path):
+        """True jika info file_path hanya bisa didapat dengan membuka capture."""
+        if not file_path or file_path in self.media_info_cache:
+            return False
+        if '%' in file_path:
+            return True
+        if not os.path.exists(file_path):
+            return False
+        image_extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff')
+        return not file_path.lower().endswith(image_extensions)
+
+    def _tree_media_info(self, file_path):
+        """Lookup untuk agregasi tree: info tanpa membuka capture, None jika perlu probe."""
+        if file_path in self.tree_probe_failures:
+            return (0.0, 0)
+        if self._is_probe_needed(file_path):
+            return None
+        return self.get_media_info(file_path)
+
+    def queue_tree_media_probe(self, paths):
+        self.tree_probe_queue.update(paths)
+        if not self.tree_probe_timer.isActive():
+            self.tree_probe_timer.start(0)
+
+    def _flush_tree_media_probe(self):
+        paths = [p for p in self.tree_probe_queue if self._is_probe_needed(p)]
+        self.tree_probe_queue.clear()
+        self._warm_media_info(paths)
+        paths_to_probe = []
+        for path in paths:
+            if path in self.media_info_cache:
+                self.playlist_widget.set_media_info(path, *self.media_info_cache[path])
+            else:
+                paths_to_probe.append(path)
+        if paths_to_probe:
+            self.media_probe.extend('tree', paths_to_probe)
+        self._schedule_duration_refresh()
 
     def on_tree_item_clicked(self, item, column):
         if item.data(0, Qt.UserRole) is None:
@@ -739,8 +944,23 @@ class MainWindow(QMainWindow):
             if not item_to_calculate:
                 return
             self.active_panel_for_duration = item_to_calculate
-            total_seconds, total_frames = self._sum_media_info_recursive(item_to_calculate)
-            duration_str = self.format_duration(total_seconds)
+            self._refresh_total_duration_label()
+
+    def _schedule_duration_refresh(self):
+        # Hanya jika label masih menampilkan total panel (bukan durasi file/compare)
+        if self.total_duration_label.text() != self.panel_duration_text:
+            return
+        if not self.duration_refresh_timer.isActive():
+            self.duration_refresh_timer.start()
+
+    def _refresh_total_duration_label(self):
+            item_to_calculate = self.active_panel_for_duration
+            if not item_to_calculate:
+                return
+            # Total subtree dijaga inkremental oleh ProjectTreeWidget, jadi ini O(1)
+            total_seconds, total_frames, pending = self.playlist_widget.media_total(item_to_calculate)
+            # Dibulatkan: total hasil tambah/kurang delta bisa meleset sedikit di bawah detik bulat
+            duration_str = self.format_duration(round(total_seconds, 3))
             label_prefix = "Total Source"
             parent = item_to_calculate
             while parent:
@@ -754,7 +974,29 @@ class MainWindow(QMainWindow):
             else:
                 folder_name = item_to_calculate.text(0)
                 final_text = f"{label_prefix} [{folder_name}]: {duration_str} ({total_frames})"
+            if pending:
+                final_text += f" - probing {pending}..."
             self.total_duration_label.setText(final_text)
+            self.panel_duration_text = final_text
+
+    def handle_media_info_probed(self, channel, request_id, path, info):
+        duration, frame_count = self._duration_from_info(info) if info else (0.0, 0)
+        # Sama seperti get_media_info: kegagalan tidak di-cache agar bisa dicoba lagi
+        if frame_count > 0:
+            self.media_info_cache[path] = (duration, frame_count)
+        else:
+            self.tree_probe_failures.add(path)
+        self.playlist_widget.set_media_info(path, duration, frame_count)
+        self._schedule_duration_refresh()
+        if channel == 'segments':
+            if frame_count <= 0:
+                self.segment_probe_failures.add(path)
+            if self._extend_segment_map():
+                self._apply_segment_map_growth()
+
+    def handle_media_probe_finished(self, channel, request_id):
+        if channel == 'segments' and self.segment_map:
+            self.status_bar.showMessage(f"Folder segments ready ({len(self.segment_map)} items)", 3000)
 
     def create_menu_bar(self):
         menubar = self.menuBar()
@@ -868,6 +1110,17 @@ class MainWindow(QMainWindow):
         prev_frame_action.triggered.connect(self.previous_frame)
         timeline_marks_menu.addAction(prev_frame_action)
 
+        # Shuttle J/K (L sudah dipakai untuk loop range)
+        play_reverse_action = QAction("Play Reverse", self)
+        play_reverse_action.setShortcut("J")
+        play_reverse_action.triggered.connect(self.play_reverse)
+        timeline_marks_menu.addAction(play_reverse_action)
+
+        pause_action = QAction("Pause", self)
+        pause_action.setShortcut("K")
+        pause_action.triggered.connect(self.pause_playback)
+        timeline_marks_menu.addAction(pause_action)
+
         first_frame_action = QAction("Go to First Frame", self)
         first_frame_action.setShortcut("Home")
         first_frame_action.triggered.connect(self.go_to_first_frame)
@@ -968,7 +1221,55 @@ class MainWindow(QMainWindow):
             self.speed_action_group.addAction(action) 
             self.speed_actions[speed_ms] = action 
         
-        view_menu.addSeparator()        
+        view_menu.addSeparator()
+
+        # Menu Frame Cache (anggaran RAM untuk frame yang sudah didecode)
+        frame_cache_menu = view_menu.addMenu("Frame Cache")
+        gib = 1024 ** 3
+        budgets = {
+            "512 MB": gib // 2, "1 GB": gib, "2 GB": 2 * gib,
+            "4 GB": 4 * gib, "8 GB": 8 * gib
+        }
+        for text, budget in budgets.items():
+            action = QAction(text, self)
+            action.setCheckable(True)
+            action.triggered.connect(lambda checked, b=budget: self.set_frame_cache_budget(b))
+            if self.frame_cache_budget == budget:
+                action.setChecked(True)
+            frame_cache_menu.addAction(action)
+            self.frame_cache_action_group.addAction(action)
+        frame_cache_menu.addSeparator()
+        clear_frame_cache_action = QAction("Clear Frame Cache", self)
+        clear_frame_cache_action.triggered.connect(self.clear_frame_cache)
+        frame_cache_menu.addAction(clear_frame_cache_action)
+        self.show_cache_status_action = QAction("Show Cache Status on Timeline", self)
+        self.show_cache_status_action.setCheckable(True)
+        self.show_cache_status_action.setChecked(True)
+        self.show_cache_status_action.toggled.connect(self.set_cache_status_visible)
+        frame_cache_menu.addAction(self.show_cache_status_action)
+        self.cache_status_timer.start()
+        self.cache_loop_action = QAction("Cache Loop Range in RAM", self)
+        self.cache_loop_action.setCheckable(True)
+        self.cache_loop_action.setChecked(self.cache_loop_enabled)
+        self.cache_loop_action.toggled.connect(self.set_loop_caching)
+        frame_cache_menu.addAction(self.cache_loop_action)
+
+        # Menu Proxies
+        proxy_menu = view_menu.addMenu("Proxies")
+        self.use_proxies_action = QAction("Use Proxies", self)
+        self.use_proxies_action.setCheckable(True)
+        self.use_proxies_action.setChecked(True)
+        self.use_proxies_action.setShortcut("Ctrl+Alt+P")
+        self.use_proxies_action.toggled.connect(self.set_use_proxies)
+        proxy_menu.addAction(self.use_proxies_action)
+        proxy_menu.addSeparator()
+        generate_proxy_action = QAction("Generate Proxies for Selection", self)
+        generate_proxy_action.triggered.connect(self.generate_proxies_for_selection)
+        generate_proxy_action.setEnabled(self.proxy_manager.is_available())
+        proxy_menu.addAction(generate_proxy_action)
+        cancel_proxies_action = QAction("Cancel All Proxy Jobs", self)
+        cancel_proxies_action.triggered.connect(self.proxy_manager.cancel_all)
+        proxy_menu.addAction(cancel_proxies_action)        
     # --- HANDLER SHORTCUT BARU ---
 
     def _shortcut_zoom_in(self):
@@ -1147,12 +1448,7 @@ class MainWindow(QMainWindow):
 
         # --- 1. Tentukan target & frame lokal ---
         if is_segment_mode:
-            target_segment = None
-            for segment in self.segment_map:
-                seg_end_frame = segment['start_frame'] + segment['duration']
-                if current_global_frame >= segment['start_frame'] and current_global_frame < seg_end_frame:
-                    target_segment = segment
-                    break
+            target_segment = self.segment_map.segment_at(current_global_frame)
             if target_segment:
                 if target_path_a == target_segment['path']:
                     target_local_frame_a = current_global_frame - target_segment['start_frame']
@@ -1192,21 +1488,19 @@ class MainWindow(QMainWindow):
         for i, path in enumerate(paths_to_modify_marks):
             local_frame = target_local_frames_marks[i]
             data = self._get_or_create_media_data(path)
-            if local_frame in data["annotation_marks"]:
-                data["annotation_marks"].remove(local_frame)
+            if data["annotation_marks"].discard(local_frame):
                 mark_removed = True # Set flag jika ada yg benar-benar dihapus
+                if is_segment_mode:
+                    # Perbarui marka global hanya untuk marka ini
+                    self._apply_segment_mark_change("annotation_marks", path, local_frame, False)
 
         # --- 4. Update state global & UI ---
-        if mark_removed: # Hanya update jika ada perubahan di cache
-            if is_segment_mode:
-                # Bangun ulang state global dari semua cache segmen
-                self._rebuild_global_marks_from_segments()
-            else:
-                 # Mode single/compare: Update state global langsung
-                if current_global_frame in self.annotation_marks:
-                    self.annotation_marks.remove(current_global_frame)
-                # Update UI timeline dari state global
-                self.timeline.set_annotation_marks(self.annotation_marks) 
+        #     (mode segmen sudah diperbarui per marka di langkah 3)
+        if mark_removed and not is_segment_mode: # Hanya update jika ada perubahan di cache
+            # Mode single/compare: Update state global langsung
+            self.annotation_marks.discard(current_global_frame)
+            # Update UI timeline dari state global
+            self.timeline.set_annotation_marks(self.annotation_marks) 
 
         # --- 5. Tampilkan pesan & refresh player jika gambar dihapus ---
         if annotation_removed:
@@ -1344,12 +1638,7 @@ class MainWindow(QMainWindow):
 
         # --- 1. Tentukan target & frame lokal ---
         if is_segment_mode:
-            target_segment = None
-            for segment in self.segment_map:
-                seg_end_frame = segment['start_frame'] + segment['duration']
-                if current_global_frame >= segment['start_frame'] and current_global_frame < seg_end_frame:
-                    target_segment = segment
-                    break
+            target_segment = self.segment_map.segment_at(current_global_frame)
             if target_segment:
                 target_path = target_segment['path']
                 target_local_frame = current_global_frame - target_segment['start_frame']
@@ -1375,14 +1664,13 @@ class MainWindow(QMainWindow):
         # --- 2. Modifikasi cache target utama ---
         data = self._get_or_create_media_data(target_path)
         # Hanya tambahkan jika belum ada di cache (mencegah duplikasi jika sinyal terkirim ganda)
-        if target_local_frame in data["annotation_marks"]:
+        if not data["annotation_marks"].add(target_local_frame):
              return 
-        data["annotation_marks"].add(target_local_frame)
         
         # --- 3. Update state global & UI ---
         if is_segment_mode:
-            # Bangun ulang state global dari semua cache segmen
-            self._rebuild_global_marks_from_segments()
+            # Perbarui marka global hanya untuk marka ini
+            self._apply_segment_mark_change("annotation_marks", target_path, target_local_frame, True)
         else:
             # Mode single/compare: Update state global langsung
             self.annotation_marks.add(current_global_frame)
@@ -1481,7 +1769,10 @@ class MainWindow(QMainWindow):
                 self.clear_all_marks(clear_segments=True)
 
             if removed_paths_normalized and self.segment_map:
-                if any(self._normalize_media_path(segment['path']) in removed_paths_normalized for segment in self.segment_map):
+                segment_paths = [segment['path'] for segment in self.segment_map]
+                segment_paths += [path for _, path in self.segment_pending_items]
+                if any(self._normalize_media_path(path) in removed_paths_normalized for path in segment_paths):
+                    self._cancel_segment_probe()
                     self.segment_map.clear()
                     self.current_segment_total_frames = 0
                     self.timeline.set_segments([], 0)
@@ -1512,7 +1803,7 @@ class MainWindow(QMainWindow):
         # --- PERBAIKAN: START ---
         # Hanya set loop range di internal player jika TIDAK dalam mode segmen.
         # Looping mode segmen ditangani oleh update_frame_counter.
-        # Looping mode compare ditangani oleh update_compare_frames.
+        # Looping mode compare ditangani worker decoder kedua player.
         if not self.segment_map:
             self.media_player.set_loop_range(self.loop_in_point, self.loop_out_point)
             if self.compare_mode:
@@ -1522,10 +1813,17 @@ class MainWindow(QMainWindow):
              self.media_player.set_loop_range(None, None)
         # --- PERBAIKAN: END ---
 
-        # Terapkan jangkauan loop ke *kedua* player
-        self.media_player.set_loop_range(self.loop_in_point, self.loop_out_point)
+        # Loop range di RAM (opsi "cache loop"): mulai/lepas sesuai mode baru
+        self._update_loop_cache(confirm=True)
+
+        # Terapkan jangkauan loop ke *kedua* player (mode segmen: frame global, lihat di atas)
+        if not self.segment_map:
+            self.media_player.set_loop_range(self.loop_in_point, self.loop_out_point)
         if self.compare_mode:
              self.media_player_2.set_loop_range(self.loop_in_point, self.loop_out_point)
+             if self.is_compare_playing:
+                 # Buffer worker mungkin sudah melewati titik loop yang baru
+                 self.compare_playback.restart()
 
     def cycle_playback_mode(self):
         if self.playback_mode == PlaybackMode.LOOP:
@@ -1548,23 +1846,13 @@ class MainWindow(QMainWindow):
         current_frame = self.timeline.current_position
         # --- AKHIR PERBAIKAN ---
         
-        start_mark = None
-        for mark in reversed(self.marks):
-            if mark <= current_frame:
-                start_mark = mark
-                break
+        start_mark = self.marks.last_at_or_before(current_frame)
         if start_mark is None:
             start_mark = self.marks[0]
-        end_mark = None
-        try:
-            start_index = self.marks.index(start_mark)
-            if start_index < len(self.marks) - 1:
-                end_mark = self.marks[start_index + 1]
-            else:
-                self.status_bar.showMessage("Cannot start loop from the last mark.", 3000)
-                return
-        except ValueError:
-            return 
+        end_mark = self.marks.next_after(start_mark)
+        if end_mark is None:
+            self.status_bar.showMessage("Cannot start loop from the last mark.", 3000)
+            return
         if start_mark is not None and end_mark is not None:
             self.loop_in_point = start_mark
             self.loop_out_point = end_mark
@@ -1604,16 +1892,11 @@ class MainWindow(QMainWindow):
             # --- LOGIKA SEGMEN (Sudah Benar) ---
             if self.segment_map:
                 current_path = self.media_player.get_current_file_path()
-                current_index = -1
-                for i, segment in enumerate(self.segment_map):
-                    if segment['path'] == current_path:
-                        current_index = i
-                        break
+                current_index = self.segment_map.index_of(current_path)
                 
                 if current_index != -1 and (current_index + 1) < len(self.segment_map):
                     next_segment = self.segment_map[current_index + 1]
-                    self.load_single_file(next_segment['path'], clear_segments=False)
-                    QTimer.singleShot(100, self.media_player.toggle_play)
+                    self._play_next_segment(next_segment['path'])
                 else:
                     self.set_playback_mode(PlaybackMode.PLAY_ONCE)
             
@@ -1625,7 +1908,86 @@ class MainWindow(QMainWindow):
                     self.play_next_timeline_item()
                 else:
                     self.set_playback_mode(PlaybackMode.PLAY_ONCE)
+
+        elif self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and self.segment_map:
+            # Loop range melewati batas klip: lanjut ke klip berikutnya, atau kembali ke in-point
+            current_path = self.media_player.get_current_file_path()
+            current_index = self.segment_map.index_of(current_path)
+            if (current_index != -1 and (current_index + 1) < len(self.segment_map) and
+                    self.loop_out_point is not None and
+                    self.loop_out_point >= self.segment_map[current_index + 1]['start_frame']):
+                self._play_next_segment(self.segment_map[current_index + 1]['path'])
+            else:
+                self._continue_segment_playback(self.loop_in_point if self.loop_in_point is not None else 0)
             
+    def _play_next_segment(self, file_path):
+        """
+        Lanjut ke segmen berikutnya tanpa jeda. Bila segmen sudah disiapkan
+        (prepare_next_media di update_frame_counter), player cukup menukar
+        capture, worker decoder & media audio; jika belum, load_single_file biasa.
+        """
+        if self.media_player.drawing_enabled:
+            self.set_drawing_off()
+        self._save_current_media_data()
+        if self.media_player.switch_to_prepared_media(file_path):
+            self._load_media_data(file_path)
+            self.status_bar.showMessage(f"Loaded: {os.path.basename(file_path)}")
+            self.media_player.toggle_play()
+            # Iterasi tree cukup sekali setelah frame pertama tampil
+            QTimer.singleShot(0, self.update_playlist_item_indicator)
+        else:
+            self.load_single_file(file_path, clear_segments=False)
+            self.media_player.toggle_play()
+
+    def _continue_segment_playback(self, target_frame, reverse=False):
+        """
+        Lanjutkan playback mode segmen dari frame global target_frame (wrap
+        loop range, atau reverse yang melewati awal klip). Bila target ada di
+        klip lain yang sudah disiapkan, klip itu dipakai langsung (seperti
+        _play_next_segment) lalu diseek ke frame lokalnya.
+        """
+        segment, local_frame = self.segment_map.to_local(target_frame)
+        if segment is None:
+            return
+        start_playback = self.media_player.play_reverse if reverse else self.media_player.toggle_play
+        if segment['path'] == self.media_player.get_current_file_path():
+            was_playing = self.media_player.is_playing
+            self.seek_to_position(target_frame)
+            if not was_playing:
+                start_playback()
+            return
+        if self.media_player.drawing_enabled:
+            self.set_drawing_off()
+        self._save_current_media_data()
+        if self.media_player.switch_to_prepared_media(segment['path']):
+            self._load_media_data(segment['path'])
+            self.media_player.seek_to_position(local_frame)
+            start_playback()
+            QTimer.singleShot(0, self.update_playlist_item_indicator)
+        else:
+            self.seek_to_position(target_frame)
+            if not self.media_player.is_playing:
+                start_playback()
+
+    def handle_reverse_finished(self):
+        """
+        Reverse sampai frame pertama klip. Di mode segmen lanjut mundur ke
+        frame terakhir segmen sebelumnya, atau ke out-point bila klip ini
+        memuat in-point loop range; di luar mode segmen player berhenti.
+        """
+        if not self.segment_map:
+            return
+        segment_index = self.segment_map.index_of(self.media_player.get_current_file_path())
+        if segment_index < 0:
+            return
+        start_frame = self.segment_map[segment_index]['start_frame']
+        if (self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and
+                self.loop_out_point is not None and
+                start_frame <= (self.loop_in_point or 0)):
+            self._continue_segment_playback(self.loop_out_point, reverse=True)
+        elif segment_index > 0:
+            self._continue_segment_playback(start_frame - 1, reverse=True)
+
     def open_file(self):
         file_paths, _ = QFileDialog.getOpenFileNames(self, "Open Media File", "", "Media Files (*.mp4 *.avi *.mov *.mkv *.jpg *.png *.jpeg *.bmp *.tiff);;All Files (*)")
         if file_paths:
@@ -1819,6 +2181,9 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Project cleared")
         self.update_playlist_item_indicator()
         self.clear_all_marks(clear_segments=True) # Pastikan segmen juga bersih
+        self.media_probe.cancel('tree')
+        self.tree_probe_queue.clear()
+        self.tree_probe_failures.clear()
         self.media_info_cache.clear()
         self.active_panel_for_duration = self.source_item
         self.update_total_duration()
@@ -1832,6 +2197,7 @@ class MainWindow(QMainWindow):
             if self.is_compare_playing:
                 # --- BERHENTI COMPARE ---
                 self.compare_timer.stop()
+                self.compare_playback.stop()
                 self.is_compare_playing = False
                 
                 # PERBAIKAN: Beri tahu KEDUA player untuk berhenti & sync (pause) audio
@@ -1856,9 +2222,13 @@ class MainWindow(QMainWindow):
                     self.media_player_2.has_finished = False 
                 elif is_in_loop_range:
                      pass
-                     
+
+                # Worker kedua player mengikuti loop range yang sama
+                self.media_player_2.set_loop_range(self.media_player.loop_in_point, self.media_player.loop_out_point)
                 fps_a = self.media_player.fps if self.media_player.fps > 0 else 30
                 fps_b = self.media_player_2.fps if self.media_player_2.fps > 0 else 30
+                if not self.compare_playback.start([self.media_player, self.media_player_2], min(fps_a, fps_b)):
+                    return
                 self.compare_timer.start(int(1000 / min(fps_a, fps_b)))
                 self.is_compare_playing = True
 
@@ -1887,44 +2257,39 @@ class MainWindow(QMainWindow):
             
             self.media_player.toggle_play()
             
-    def update_compare_frames(self):
-        # --- PERBAIKAN: Cek loop logic *sebelum* melompat ke frame berikutnya ---
-        if (self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and
-                self.loop_out_point is not None and
-                self.media_player.current_frame_index >= self.loop_out_point):
-            
-            loop_start_frame = self.loop_in_point if self.loop_in_point is not None else 0
-            
-            # Panggil seek_to_position *internal* player
-            self.media_player.seek_to_position(loop_start_frame)
-            self.media_player_2.seek_to_position(loop_start_frame)
-            self.update_composite_view() # Tampilkan frame awal loop
-            return # Selesai untuk frame "tick" ini
-        # --- AKHIR PERBAIKAN LOOP ---
+    def play_reverse(self):
+        if self.compare_mode:
+            self.status_bar.showMessage("Reverse playback is not available in compare mode.", 3000)
+            return
+        if self.is_mark_tour_active: self.toggle_mark_tour()
+        if self.media_player.drawing_enabled:
+            self.set_drawing_off()
+        self.media_player.play_reverse()
 
-        finished_a = not self.media_player.has_media() or \
-                     (self.media_player.total_frames > 0 and self.media_player.current_frame_index >= self.media_player.total_frames - 1)
-        
-        finished_b = not self.media_player_2.has_media() or \
-                     (self.media_player_2.total_frames > 0 and self.media_player_2.current_frame_index >= self.media_player_2.total_frames - 1)
+    def pause_playback(self):
+        if self.compare_mode:
+            if self.is_compare_playing:
+                self.toggle_play()
+            return
+        if self.is_mark_tour_active: self.toggle_mark_tour()
+        self.media_player.pause()
 
-        if finished_a and finished_b:
+    def update_compare_frames(self):
+        # Frame didecode paralel oleh worker tiap player; di sini hanya diambil
+        # pasangan yang sudah jatuh tempo menurut satu jam bersama. Sisi yang
+        # tertinggal menahan frame terakhirnya (lalu melompat), tanpa menahan sisi lain.
+        # Loop range diikuti langsung oleh worker (set_loop_range di kedua player).
+        changed, finished = self.compare_playback.advance()
+        if finished:
             self.compare_timer.stop()
+            self.compare_playback.stop()
             # PERBAIKAN: Kirim argumen boolean
             self.handle_playback_finished(False) 
             return 
 
-        # PERBAIKAN: Panggil next_frame mode "internal"
-        if not finished_a:
-            self.media_player.next_frame(_update_media_internals_only=True)
-        
-        if not finished_b:
-            self.media_player_2.next_frame(_update_media_internals_only=True)
-        # --- AKHIR PERBAIKAN ---
-
-        # Sekarang update_composite_view akan mengambil frame baru
-        # dan menjadi satu-satunya yang memperbarui UI/Timeline
-        self.update_composite_view()
+        # update_composite_view menjadi satu-satunya yang memperbarui UI/Timeline
+        if changed:
+            self.update_composite_view()
 
     def previous_frame(self):
         if self.is_compare_playing: return
@@ -1992,6 +2357,9 @@ class MainWindow(QMainWindow):
             
             if self.compare_mode:
                 self.media_player_2.seek_to_position(position, _sync_audio=_sync_audio)
+                if self.is_compare_playing:
+                    # Jam bersama dijangkarkan ulang ke posisi baru
+                    self.compare_playback.restart()
                 self.update_composite_view()
         else:
             # Mode Segmen (Folder Timeline)
@@ -2000,15 +2368,7 @@ class MainWindow(QMainWindow):
             
             position = max(0, min(position, self.current_segment_total_frames - 1))
             
-            target_segment = None
-            for segment in self.segment_map:
-                seg_end_frame = segment['start_frame'] + segment['duration']
-                if position >= segment['start_frame'] and position < seg_end_frame:
-                    target_segment = segment
-                    break
-            
-            if not target_segment and self.segment_map and position == self.current_segment_total_frames - 1:
-                 target_segment = self.segment_map[-1]
+            target_segment = self.segment_map.segment_at(position)
             
             if not target_segment:
                 print(f"Seek error: Tidak bisa menemukan segmen untuk frame global {position}")
@@ -2025,6 +2385,66 @@ class MainWindow(QMainWindow):
             
             self.update_frame_counter(local_frame, target_segment['duration'])
             
+    # --- SCRUB TIMELINE ---
+
+    def handle_timeline_position(self, position):
+        if not self.timeline.is_scrubbing:
+            self.seek_to_position(position)
+            return
+        # Gabungkan semua gerakan mouse yang menumpuk; timer 0 ms jalan setelah event lain habis
+        self.scrub_target = position
+        if not self.scrub_timer.isActive():
+            self.scrub_timer.start(0)
+        self.scrub_idle_timer.start(SCRUB_IDLE_MS)
+
+    def begin_scrub(self):
+        if self.is_mark_tour_active: self.toggle_mark_tour()
+        if self.media_player.drawing_enabled: self.set_drawing_off()
+        self.scrub_position = None
+        self.scrub_resume_playback = self.is_compare_playing if self.compare_mode else self.media_player.is_playing
+        if self.scrub_resume_playback:
+            self.toggle_play()
+
+    def end_scrub(self, position):
+        self.scrub_timer.stop()
+        self.scrub_idle_timer.stop()
+        self.scrub_target = None
+        if position is not None and position >= 0:
+            self.seek_to_position(position)
+        self.scrub_position = None
+        if self.scrub_resume_playback:
+            self.scrub_resume_playback = False
+            self.toggle_play()
+
+    def _service_scrub(self):
+        position = self.scrub_target
+        self.scrub_target = None
+        if position is None:
+            return
+        self.scrub_position = position
+        if self.compare_mode:
+            # Composite memakai current_frame kedua player: pakai seek biasa (tetap digabung)
+            self.seek_to_position(position, _sync_audio=False)
+            return
+
+        local_frame = position
+        if self.segment_map:
+            target_segment = self.segment_map.segment_at(position)
+            if not target_segment or target_segment['path'] != self.media_player.get_current_file_path():
+                # Pindah klip: perlu load penuh
+                self.seek_to_position(position, _sync_audio=False)
+                return
+            local_frame = position - target_segment['start_frame']
+
+        if not self.media_player.show_scrub_frame(local_frame):
+            self.seek_to_position(position, _sync_audio=False)
+
+    def _settle_scrub(self):
+        if self.scrub_target is not None:
+            self._service_scrub()
+        if self.timeline.is_scrubbing and self.scrub_position is not None:
+            self.seek_to_position(self.scrub_position, _sync_audio=False)
+
     def update_frame_counter(self, current_frame, total_frames):
         # current_frame dan total_frames di sini adalah LOKAL (dari media_player)
         
@@ -2046,12 +2466,8 @@ class MainWindow(QMainWindow):
             if not current_path: 
                 return 
                 
-            segment_start_frame = 0
-            
-            for segment in self.segment_map:
-                if segment['path'] == current_path:
-                    segment_start_frame = segment['start_frame']
-                    break
+            segment_index = self.segment_map.index_of(current_path)
+            segment_start_frame = self.segment_map[segment_index]['start_frame'] if segment_index >= 0 else 0
             
             # Hitung frame global
             global_frame = segment_start_frame + current_frame
@@ -2068,14 +2484,41 @@ class MainWindow(QMainWindow):
             # Cek logika loop range di sini menggunakan frame GLOBAL
             if (self.media_player.is_playing and # Hanya jika sedang play
                 self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and
-                self.loop_out_point is not None and
-                global_frame >= self.loop_out_point):
+                self.loop_out_point is not None):
                 
                 loop_start_frame = self.loop_in_point if self.loop_in_point is not None else 0
                 
-                # Gunakan self.seek_to_position() yang mengerti frame GLOBAL
-                self.seek_to_position(loop_start_frame)
+                if self.media_player.play_direction > 0 and global_frame >= self.loop_out_point:
+                    # Lompat ke in-point (klip lain: pakai media yang sudah disiapkan)
+                    self._continue_segment_playback(loop_start_frame)
+                    return
+                if self.media_player.play_direction < 0 and global_frame <= loop_start_frame:
+                    # Reverse: dari in-point kembali ke out-point
+                    self._continue_segment_playback(self.loop_out_point, reverse=True)
+                    return
             # --- AKHIR PERBAIKAN ---
+
+            # Menjelang cut, siapkan segmen berikutnya di background (lihat _play_next_segment).
+            # Hanya saat maju: reverse menyeberang lewat handle_reverse_finished
+            if self.media_player.is_playing and self.media_player.play_direction > 0:
+                preload_frames = SEGMENT_PRELOAD_SECONDS * max(self.media_player.fps, 1)
+                next_path = None
+                if (self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and
+                        self.loop_out_point is not None and
+                        self.loop_out_point - global_frame <= preload_frames):
+                    # Menjelang out-point: cut berikutnya adalah lompatan ke in-point
+                    in_segment = self.segment_map.segment_at(self.loop_in_point or 0)
+                    if in_segment is not None and in_segment['path'] != current_path:
+                        next_path = in_segment['path']
+                elif (0 <= segment_index < len(self.segment_map) - 1 and
+                        total_frames - current_frame <= preload_frames):
+                    next_start = self.segment_map[segment_index + 1]['start_frame']
+                    if (self.playback_mode == PlaybackMode.PLAY_NEXT or
+                            (self.playback_mode == PlaybackMode.LOOP_MARKED_RANGE and
+                             self.loop_out_point is not None and self.loop_out_point >= next_start)):
+                        next_path = self.segment_map[segment_index + 1]['path']
+                if next_path:
+                    self.media_player.prepare_next_media(next_path)
         
     def update_frame_counter_B(self, cf, tf): pass
     
@@ -2089,12 +2532,7 @@ class MainWindow(QMainWindow):
         
         # --- 1. Tentukan target & frame lokal ---
         if is_segment_mode:
-            target_segment = None
-            for segment in self.segment_map:
-                seg_end_frame = segment['start_frame'] + segment['duration']
-                if current_global_frame >= segment['start_frame'] and current_global_frame < seg_end_frame:
-                    target_segment = segment
-                    break
+            target_segment = self.segment_map.segment_at(current_global_frame)
             if target_segment:
                 target_path = target_segment['path']
                 target_local_frame = current_global_frame - target_segment['start_frame']
@@ -2109,10 +2547,7 @@ class MainWindow(QMainWindow):
             # Modifikasi cache B (jika ada)
             if path_b:
                 data_b = self._get_or_create_media_data(path_b)
-                if current_global_frame in data_b["marks"]: 
-                    data_b["marks"].remove(target_local_frame)
-                elif target_local_frame not in data_b["marks"]:
-                    data_b["marks"].append(target_local_frame); data_b["marks"].sort()
+                data_b["marks"].toggle(target_local_frame)
             
         elif self.media_player.has_media(): # Mode Single
             target_path = self.media_player.get_current_file_path()
@@ -2122,34 +2557,36 @@ class MainWindow(QMainWindow):
 
         # --- 2. Modifikasi cache target utama ---
         data = self._get_or_create_media_data(target_path)
-        is_removing = target_local_frame in data["marks"] # Cek state di cache
+        is_removing = not data["marks"].toggle(target_local_frame) # Ubah state di cache
 
         if is_removing:
-            data["marks"].remove(target_local_frame)
             self.status_bar.showMessage(f"Mark removed from frame {current_global_frame + 1}", 2000)
         else:
-            data["marks"].append(target_local_frame)
-            data["marks"].sort()
             self.status_bar.showMessage(f"Mark added at frame {current_global_frame + 1}", 2000)
 
         # --- 3. Update state global & UI ---
         if is_segment_mode:
-            # Bangun ulang state global dari semua cache segmen
-            self._rebuild_global_marks_from_segments() 
+            # Perbarui marka global hanya untuk marka ini
+            self._apply_segment_mark_change("marks", target_path, target_local_frame, not is_removing)
         else:
             # Mode single/compare: Update state global langsung
             if is_removing:
-                if current_global_frame in self.marks: self.marks.remove(current_global_frame)
+                self.marks.discard(current_global_frame)
             else:
-                if current_global_frame not in self.marks: self.marks.append(current_global_frame); self.marks.sort()
+                self.marks.add(current_global_frame)
             # Update UI timeline dari state global
             self.timeline.set_marks(self.marks)
             
     def clear_all_marks(self, clear_segments=True):
         marks_cleared = len(self.marks) > 0
         annotations_cleared = len(self.annotation_marks) > 0
-        self.marks.clear()
-        self.annotation_marks.clear()
+        if self.marks is self.segment_marks.marks:
+            # Marka global mode segmen: lepas dari view (cache klip tetap utuh),
+            # view dibangun ulang dari cache saat marka berikutnya berubah
+            self.marks, self.annotation_marks = MarkIndex(), MarkIndex()
+        else:
+            self.marks.clear()
+            self.annotation_marks.clear()
         
         # Hapus anotasi dari player A (dan B jika ada)
         self.media_player.annotations.clear()
@@ -2165,6 +2602,10 @@ class MainWindow(QMainWindow):
         
         # --- LOGIKA CLEAR SEGMEN BARU ---
         if clear_segments:
+            self._loop_cache_decision = None
+            self._segment_media_keys.clear()
+            self.loop_cache.stop()
+            self._cancel_segment_probe()
             self.segment_map.clear()
             self.current_segment_total_frames = 0
             self.timeline.set_segments([], 0)
@@ -2175,40 +2616,24 @@ class MainWindow(QMainWindow):
             self.status_bar.showMessage("All marks and drawings cleared", 2000)
         
     def jump_to_next_mark(self):
-        all_marks = sorted(list(set(self.marks) | self.annotation_marks))
-        if not all_marks: return
-        
         # --- PERBAIKAN: Gunakan frame global (posisi timeline) ---
         current_frame = self.timeline.current_position
         # --- AKHIR PERBAIKAN ---
 
-        next_mark = None
-        for mark in all_marks:
-            if mark > current_frame:
-                next_mark = mark
-                break
-        if next_mark is None:
-            next_mark = all_marks[0]
-        if next_mark is not None:
-            self.seek_to_position(next_mark)
+        # Marka putih & hijau, kembali ke awal setelah marka terakhir
+        target_mark = next_mark((self.marks, self.annotation_marks), current_frame)
+        if target_mark is not None:
+            self.seek_to_position(target_mark)
 
     def jump_to_previous_mark(self):
-        all_marks = sorted(list(set(self.marks) | self.annotation_marks))
-        if not all_marks: return
-        
         # --- PERBAIKAN: Gunakan frame global (posisi timeline) ---
         current_frame = self.timeline.current_position
         # --- AKHIR PERBAIKAN ---
         
-        prev_mark = None
-        for mark in reversed(all_marks):
-            if mark < current_frame:
-                prev_mark = mark
-                break
-        if prev_mark is None:
-            prev_mark = all_marks[-1]
-        if prev_mark is not None:
-            self.seek_to_position(prev_mark)
+        # Marka putih & hijau, kembali ke akhir sebelum marka pertama
+        target_mark = previous_mark((self.marks, self.annotation_marks), current_frame)
+        if target_mark is not None:
+            self.seek_to_position(target_mark)
 
     # --- FUNGSI NAVIGASI SEGMEN BARU ---
     def jump_to_next_segment(self):
@@ -2223,13 +2648,8 @@ class MainWindow(QMainWindow):
             
         current_global_frame = self.timeline.current_position
         
-        next_segment_start_frame = -1
-        
         # Cari frame awal segmen berikutnya
-        for segment in self.segment_map:
-            if segment['start_frame'] > current_global_frame:
-                next_segment_start_frame = segment['start_frame']
-                break
+        next_segment_start_frame = self.segment_map.next_start_after(current_global_frame)
                 
         if next_segment_start_frame != -1:
             self.seek_to_position(next_segment_start_frame)
@@ -2249,15 +2669,8 @@ class MainWindow(QMainWindow):
 
         current_global_frame = self.timeline.current_position
         
-        prev_segment_start_frame = -1
-        
-        # Cari frame awal segmen *sebelumnya*
-        # Iterasi terbalik
-        for segment in reversed(self.segment_map):
-            # Kita cari segmen pertama yang mulainya SEBELUM frame kita saat ini
-            if segment['start_frame'] < current_global_frame:
-                prev_segment_start_frame = segment['start_frame']
-                break
+        # Cari frame awal segmen *sebelumnya* (yang mulainya SEBELUM frame saat ini)
+        prev_segment_start_frame = self.segment_map.previous_start_before(current_global_frame)
                 
         if prev_segment_start_frame != -1:
             self.seek_to_position(prev_segment_start_frame)
@@ -2294,6 +2707,7 @@ class MainWindow(QMainWindow):
             if self.compare_mode:
                 if self.is_compare_playing:
                     self.compare_timer.stop()
+                    self.compare_playback.stop()
                     self.is_compare_playing = False
                     self.controls.set_play_state(False)
             else:
@@ -2316,6 +2730,7 @@ class MainWindow(QMainWindow):
         if self.compare_mode:
             if self.is_compare_playing:
                 self.compare_timer.stop()
+                self.compare_playback.stop()
                 self.is_compare_playing = False
                 self.controls.set_play_state(False)
         else:
@@ -2339,6 +2754,254 @@ class MainWindow(QMainWindow):
             self.current_mark_tour_index = 0
         self.show_current_mark_frame()
 
+    def set_frame_cache_budget(self, max_bytes):
+        self.frame_cache_budget = max_bytes
+        self.frame_cache.setMaxCacheBytes(max_bytes)
+        self.status_bar.showMessage(f"Frame cache limited to {max_bytes / 1024 ** 3:g} GB.", 3000)
+
+    def clear_frame_cache(self):
+        self.frame_cache.clearCache()
+        self.status_bar.showMessage("Frame cache cleared.", 3000)
+
+    def set_cache_status_visible(self, visible):
+        self._cache_status_key = None
+        if visible:
+            self.cache_status_timer.start()
+            self._refresh_cache_status()
+        else:
+            self.cache_status_timer.stop()
+            self.timeline.set_cache_ranges([])
+
+    def _refresh_cache_status(self):
+        """
+        Kirim frame yang tercache (sebagai run) ke timeline. Di mode segmen
+        run lokal tiap klip digeser ke offset segmennya; di compare hanya
+        frame yang tercache di kedua player.
+        """
+        player_a, player_b = self.media_player, self.media_player_2
+        visible = self.timeline.visible_range() if self.segment_map else None
+        key = (self.frame_cache.residency_version, bool(self.segment_map), self.compare_mode,
+               player_a.playback_path, player_b.playback_path, self.current_segment_total_frames,
+               visible)
+        if key == self._cache_status_key:
+            return
+        self._cache_status_key = key
+
+        if self.segment_map:
+            # Hanya segmen di jendela timeline yang terlihat: biaya per tick tidak
+            # bergantung pada jumlah shot
+            runs = []
+            first_index = self.segment_map.index_at(visible[0])
+            last_index = self.segment_map.index_at(min(visible[1], self.current_segment_total_frames - 1))
+            if first_index >= 0 and last_index >= 0:
+                for index in range(first_index, last_index + 1):
+                    segment = self.segment_map[index]
+                    offset = segment['start_frame']
+                    media_key = self._segment_media_key(segment['path'])
+                    runs.extend((offset + start, offset + end) for start, end in
+                                self.frame_cache.getCachedRanges(media_key, 0, segment['duration'] - 1))
+        elif player_a.has_media():
+            runs = self.frame_cache.getCachedRanges(player_a.playback_path, 0, player_a.total_frames - 1)
+            if self.compare_mode and player_b.has_media():
+                runs = intersectRuns(runs, self.frame_cache.getCachedRanges(
+                    player_b.playback_path, 0, player_b.total_frames - 1))
+        else:
+            runs = []
+        self.timeline.set_cache_ranges(runs)
+
+    def _segment_media_key(self, path):
+        """Kunci cache frame klip path di mode segmen (resolusi proxy diingat per path)."""
+        if path == self.media_player.get_current_file_path():
+            return self.media_player.playback_path_for(path)
+        media_key = self._segment_media_keys.get(path)
+        if media_key is None:
+            media_key = self._segment_media_keys[path] = self.media_player.playback_path_for(path)
+        return media_key
+
+    # --- LOOP RANGE DI RAM ---
+
+    def set_loop_caching(self, enabled):
+        if self.cache_loop_action.isChecked() != enabled:
+            # toggled memanggil fungsi ini lagi
+            self.cache_loop_action.setChecked(enabled)
+            return
+        self.cache_loop_enabled = enabled
+        self._loop_cache_decision = None
+        self._update_loop_cache(confirm=True)
+
+    def _loop_cache_pieces(self):
+        """Potongan (media_key, frame awal, frame akhir) yang dicakup loop range saat ini."""
+        loop_in = self.loop_in_point if self.loop_in_point is not None else 0
+        loop_out = self.loop_out_point
+        player_a = self.media_player
+        if self.segment_map:
+            pieces = []
+            first_index = self.segment_map.index_at(loop_in)
+            last_index = self.segment_map.index_at(min(loop_out, self.current_segment_total_frames - 1))
+            if first_index < 0 or last_index < 0:
+                return []
+            for index in range(first_index, last_index + 1):
+                segment = self.segment_map[index]
+                start_frame = segment['start_frame']
+                first = max(loop_in, start_frame) - start_frame
+                last = min(loop_out, start_frame + segment['duration'] - 1) - start_frame
+                pieces.append((self._segment_media_key(segment['path']), first, last))
+            return pieces
+        if not player_a.has_media() or not player_a.is_video:
+            return []
+        pieces = [(player_a.playback_path, loop_in, min(loop_out, player_a.total_frames - 1))]
+        player_b = self.media_player_2
+        if self.compare_mode and player_b.has_media() and player_b.is_video:
+            pieces.append((player_b.playback_path, loop_in, min(loop_out, player_b.total_frames - 1)))
+        return pieces
+
+    def _loop_frame_bytes(self, media_key):
+        """Perkiraan ukuran satu frame media_key di cache."""
+        reference = None
+        for player in (self.media_player, self.media_player_2):
+            if player.playback_path == media_key and player.current_frame is not None:
+                return player.current_frame.nbytes
+            if reference is None and player.current_frame is not None:
+                reference = player.current_frame.nbytes
+        info = self.media_info_store.get(media_key) if self.media_info_store else None
+        if info and info.get('width') and info.get('height'):
+            return info['width'] * info['height'] * 3
+        # Proxy/klip lain tanpa info: anggap seukuran frame yang sedang tampil
+        return reference or 0
+
+    def _update_loop_cache(self, confirm=False):
+        """
+        Pin & muat loop range ke RAM bila opsi "cache loop" aktif di mode
+        LOOP_MARKED_RANGE; selain itu lepaskan range yang sedang di-pin.
+        Pengguna hanya ditanya (perkiraan memori) bila confirm, yaitu dari aksi
+        eksplisit (opsi dinyalakan, mode/range diset). Jawabannya diingat per
+        range: pemanggilan lain (cut, proxy, reorder) hanya menghitung ulang
+        potongan yang di-pin untuk range yang sudah disetujui, tanpa dialog.
+        """
+        if (not self.cache_loop_enabled or
+                self.playback_mode != PlaybackMode.LOOP_MARKED_RANGE or
+                self.loop_out_point is None):
+            self._loop_cache_decision = None
+            self.loop_cache.stop()
+            return
+        pieces = self._loop_cache_pieces()
+        if not pieces:
+            self.loop_cache.stop()
+            return
+        loop_range = (self.loop_in_point, self.loop_out_point)
+        decision = self._loop_cache_decision
+        if decision is not None and decision[0] == loop_range:
+            if decision[1]:
+                self.loop_cache.start(pieces) # No-op bila potongannya sama
+            else:
+                self.loop_cache.stop()
+            return
+        if not confirm:
+            # Range belum pernah ditanyakan: jangan muncul dialog di tengah playback
+            self.loop_cache.stop()
+            return
+        frame_count = piece_frames(pieces)
+        needed_bytes = estimate_bytes(pieces, self._loop_frame_bytes)
+        budget = self.frame_cache.max_cache_bytes
+        message = f"Cache {frame_count} frames of the loop range in RAM?\n\nEstimated memory: {needed_bytes / 1024 ** 3:.2f} GB"
+        if budget:
+            message += f" (frame cache limit: {budget / 1024 ** 3:g} GB)"
+            if needed_bytes > budget:
+                message += "\n\nThe range is larger than the frame cache limit; other cached frames will be evicted."
+        reply = QMessageBox.question(self, "Cache Loop Range", message,
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        self._loop_cache_decision = (loop_range, reply == QMessageBox.Yes)
+        if reply != QMessageBox.Yes:
+            self.loop_cache.stop()
+            return
+        self.loop_cache.start(pieces)
+        self.status_bar.showMessage(f"Caching loop range ({frame_count} frames)...", 3000)
+
+    def _on_loop_cache_progress(self, done, total):
+        self.status_bar.showMessage(f"Caching loop range: {done} / {total} frames", 1000)
+
+    def _on_loop_cache_ready(self, frame_count):
+        self.status_bar.showMessage(f"Loop range cached in RAM ({frame_count} frames).", 3000)
+
+    # --- PROXY ---
+
+    def set_use_proxies(self, enabled):
+        # Pindah proxy <-> original di frame yang sama
+        self.media_player.set_prefer_proxy(enabled)
+        self.media_player_2.set_prefer_proxy(enabled)
+        self._segment_media_keys.clear()
+        # Kunci cache berubah (proxy <-> original): pin loop range ikut pindah
+        self._revalidate_loop_range(file_changed=False)
+        if self.compare_mode:
+            self.update_composite_view()
+        source = "proxy" if self.media_player.is_showing_proxy() else "original"
+        self.status_bar.showMessage(f"Viewing {source} media.", 3000)
+        self.update_playlist_item_indicator()
+
+    def generate_proxies_for_selection(self):
+        paths = set()
+        for item in self.playlist_widget.selectedItems():
+            paths.update(self._collect_media_paths_recursive(item))
+        if not paths:
+            current_path = self.media_player.get_current_file_path()
+            if current_path:
+                paths.add(current_path)
+        self.generate_proxies(paths)
+
+    def generate_proxies(self, paths):
+        image_extensions = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.exr', '.dpx']
+        queued = 0
+        for path in sorted(paths):
+            # Gambar tunggal tidak perlu proxy
+            if '%' not in path and any(path.lower().endswith(ext) for ext in image_extensions):
+                continue
+            if self.proxy_manager.request_proxy(path):
+                queued += 1
+        self.status_bar.showMessage(f"Generating {queued} proxy file(s)..." if queued
+                                    else "No new proxies to generate.", 3000)
+
+    def _tree_items_for_path(self, path):
+        items = []
+        iterator = QTreeWidgetItemIterator(self.playlist_widget)
+        while iterator.value():
+            item = iterator.value()
+            if item.data(0, Qt.UserRole) == path:
+                items.append(item)
+            iterator += 1
+        return items
+
+    def _set_proxy_state(self, source_path, state):
+        for item in self._tree_items_for_path(source_path):
+            item.setData(0, PROXY_STATE_ROLE, state)
+
+    def handle_proxy_ready(self, source_path, proxy_path):
+        self._set_proxy_state(source_path, 1.0)
+        self._segment_media_keys.pop(source_path, None)
+        self._cache_status_key = None
+        # Ganti ke proxy secara transparan bila file ini sedang dibuka
+        for player in (self.media_player, self.media_player_2):
+            if player.get_current_file_path() == source_path:
+                player.refresh_playback_source()
+        self._revalidate_loop_range(file_changed=False)
+        if self.compare_mode:
+            self.update_composite_view()
+        self.status_bar.showMessage(f"Proxy ready: {os.path.basename(source_path)}", 3000)
+
+    def handle_proxy_failed(self, source_path, message):
+        self._set_proxy_state(source_path, None)
+        self.status_bar.showMessage(f"Proxy failed for {os.path.basename(source_path)}: {message}", 5000)
+
+    def handle_proxy_cancelled(self, source_path):
+        self._set_proxy_state(source_path, None)
+
+    def closeEvent(self, event):
+        self.loop_cache.shutdown()
+        self.media_player.shutdown_index_loaders()
+        self.media_player_2.shutdown_index_loaders()
+        self.proxy_manager.shutdown()
+        self.media_probe.shutdown()
+        super().closeEvent(event)
+
     def set_mark_tour_speed(self, speed_ms):
         self.mark_tour_speed_ms = speed_ms
         speed_s = speed_ms / 1000.0
@@ -2508,6 +3171,7 @@ class MainWindow(QMainWindow):
         self.current_segment_folder_item = folder_item 
         self.segment_map.clear()
         self.current_segment_total_frames = 0
+        self._cancel_segment_probe()
         
         video_items = []
         self._collect_videos_recursive(folder_item, video_items)
@@ -2520,18 +3184,11 @@ class MainWindow(QMainWindow):
             self.update_playlist_item_indicator() 
             return
 
-        # 3. Bangun peta segmen
-        for item in video_items:
-            path = item.data(0, Qt.UserRole)
-            duration, frame_count = self.get_media_info(path)
-            if frame_count > 0:
-                self.segment_map.append({
-                    'item': item, 
-                    'path': path, 
-                    'start_frame': self.current_segment_total_frames, 
-                    'duration': frame_count
-                })
-                self.current_segment_total_frames += frame_count
+        # 3. Bangun peta segmen. Hanya segmen pertama yang wajib diprobe sekarang;
+        #    sisanya diprobe di background dan disambung berurutan (lihat _extend_segment_map)
+        self._warm_media_info([item.data(0, Qt.UserRole) for item in video_items])
+        self.segment_pending_items = [(item, item.data(0, Qt.UserRole)) for item in video_items]
+        self._extend_segment_map(probe_first=True)
         
         if not self.segment_map:
              self.status_bar.showMessage(f"Could not read media in '{folder_item.text(0)}'.", 3000)
@@ -2547,11 +3204,12 @@ class MainWindow(QMainWindow):
 
         # --- PERBAIKAN: Atur timeline SEBELUM memuat video pertama ---
         # 5. Dapatkan batas segmen
-        segment_boundaries = [s['start_frame'] for s in self.segment_map]
+        segment_boundaries = self.segment_map.start_frames()
         
-        # 6. Atur durasi total DAN batas segmen di timeline SEKARANG
+        # 6. Atur durasi total DAN batas segmen di timeline SEKARANG (folder baru: tanpa zoom)
+        self.timeline.reset_zoom()
         self.timeline.set_duration(self.current_segment_total_frames) 
-        self.timeline.set_segments(segment_boundaries, self.current_segment_total_frames)
+        self.timeline.set_segments(segment_boundaries, self.current_segment_total_frames, self.segment_map.names())
         # --- AKHIR PERBAIKAN ---
 
         # 7. Muat file pertama (load_single_file versi baru TIDAK akan memuat marka/durasi timeline)
@@ -2564,17 +3222,78 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage(f"Loaded folder '{folder_item.text(0)}' ({len(self.segment_map)} items)", 3000)
         self.set_playback_mode(PlaybackMode.PLAY_NEXT)
         self.update_playlist_item_indicator()
+
+        # 9. Probe sisa segmen di background
+        paths_to_probe = [path for _, path in self.segment_pending_items if self._is_probe_needed(path)]
+        if paths_to_probe:
+            self.media_probe.probe('segments', paths_to_probe)
+            self.status_bar.showMessage(
+                f"Loaded folder '{folder_item.text(0)}' ({len(self.segment_map)} items, probing {len(paths_to_probe)} more...)", 5000)
+        elif self._extend_segment_map():
+            self._apply_segment_map_growth()
+
+    def _extend_segment_map(self, probe_first=False):
+        """
+        Sambungkan item tertunda ke akhir peta segmen selama infonya sudah
+        diketahui. Berhenti di item pertama yang masih diprobe, karena
+        start_frame bergantung pada semua segmen sebelumnya. Dengan
+        probe_first, item diprobe langsung sampai ada satu segmen.
+        Mengembalikan True jika ada segmen yang ditambahkan.
+        """
+        added = False
+        while self.segment_pending_items:
+            item, path = self.segment_pending_items[0]
+            if path in self.segment_probe_failures:
+                frame_count = 0
+            elif not self._is_probe_needed(path) or (probe_first and not self.segment_map):
+                duration, frame_count = self.get_media_info(path)
+            else:
+                break
+            self.segment_pending_items.pop(0)
+            if frame_count > 0:
+                self.segment_map.append(item, path, frame_count)
+                self.current_segment_total_frames = self.segment_map.total_frames
+                added = True
+        return added
+
+    def _apply_segment_map_growth(self, reordered=False):
+        """Perbarui timeline & label setelah peta segmen berubah (segmen baru atau urutan baru)."""
+        self._cache_status_key = None # Offset segmen berubah
+        segment_boundaries = self.segment_map.start_frames()
+        self.timeline.set_duration(self.current_segment_total_frames)
+        self.timeline.set_segments(segment_boundaries, self.current_segment_total_frames, self.segment_map.names())
+        if reordered:
+            # Offset segmen berubah: marka global dibangun ulang
+            self._segment_media_keys.clear()
+            self._rebuild_global_marks_from_segments()
+        else:
+            self._sync_global_marks_with_segments()
+        # Klip yang dicakup loop range bisa berubah: pin loop cache dihitung ulang
+        self._update_loop_cache()
+        if self.media_player.current_frame_index >= 0:
+            self.update_frame_counter(self.media_player.current_frame_index, self.media_player.total_frames)
+        duration_str = self.format_duration(self.current_segment_total_frames / self.media_player.fps if self.media_player.fps > 0 else 0)
+        self.total_duration_label.setText(f"Folder Total: {duration_str} ({self.current_segment_total_frames})")
+
+    def _cancel_segment_probe(self):
+        self.media_probe.cancel('segments')
+        self.segment_pending_items = []
+        self.segment_probe_failures = set()
             
     def load_single_file(self, file_path, clear_segments=True):
         if self.compare_timer.isActive():
             self.compare_timer.stop()
+            self.compare_playback.stop()
             self.is_compare_playing = False
             
         # 1. SIMPAN DATA LAMA (dari file sebelumnya)
         self._save_current_media_data()
+        previous_path = self.media_player.get_current_file_path()
+        left_segments = clear_segments and bool(self.segment_map)
             
         # 2. HAPUS SEGMENT JIKA DIMINTA
         if clear_segments:
+            self._cancel_segment_probe()
             self.segment_map.clear()
             self.current_segment_total_frames = 0
             self.timeline.set_segments([], 0)
@@ -2606,14 +3325,36 @@ class MainWindow(QMainWindow):
             if not self.segment_map: # Hanya update jika tidak dalam mode segmen
                 self.update_total_duration()
                 
+        self._revalidate_loop_range(file_changed=file_path != previous_path or left_segments)
         self.update_playlist_item_indicator()
+
+    def _revalidate_loop_range(self, file_changed):
+        """
+        Dipanggil setelah media atau sumber playback (proxy/original) berganti.
+        Di luar mode segmen loop range milik file lama, jadi mode loop range
+        dimatikan (pin loop cache ikut dilepas). Selain itu range diterapkan
+        ulang ke player (load_media mereset loop range-nya) dan pin loop cache
+        dihitung ulang untuk kunci cache yang baru.
+        """
+        if self.playback_mode != PlaybackMode.LOOP_MARKED_RANGE:
+            return
+        if file_changed and not self.segment_map:
+            self.set_playback_mode(PlaybackMode.LOOP)
+            self.status_bar.showMessage("Marked range loop disabled: media changed.", 3000)
+            return
+        # Mode segmen: loop ditangani update_frame_counter (frame global), player tanpa loop range
+        if not self.segment_map:
+            self.media_player.set_loop_range(self.loop_in_point, self.loop_out_point)
+            if self.compare_mode:
+                self.media_player_2.set_loop_range(self.loop_in_point, self.loop_out_point)
+        self._update_loop_cache()
             
     def _get_or_create_media_data(self, file_path):
         """Mendapat atau membuat blok data untuk file path tertentu."""
         if file_path not in self.media_data_cache:
             self.media_data_cache[file_path] = {
-                "marks": [],
-                "annotation_marks": set(),
+                "marks": MarkIndex(),
+                "annotation_marks": MarkIndex(),
                 "annotations": {}
             }
         return self.media_data_cache[file_path]
@@ -2633,31 +3374,43 @@ class MainWindow(QMainWindow):
             self.timeline.set_annotation_marks(self.annotation_marks)
             return
 
-        all_global_marks = []
-        all_global_annotation_marks = set()
-
-        for segment in self.segment_map:
-            path = segment['path']
-            start_frame = segment['start_frame']
-            # Dapatkan data dari cache (jangan buat jika tidak ada,
-            # meskipun _get_or_create seharusnya aman)
-            data = self.media_data_cache.get(path, {"marks": [], "annotation_marks": set()})
-
-            # Konversi marka lokal di cache ke global
-            for local_mark in data["marks"]:
-                all_global_marks.append(start_frame + local_mark)
-            for local_ann_mark in data["annotation_marks"]:
-                all_global_annotation_marks.add(start_frame + local_ann_mark)
+        # Konversi marka lokal di cache tiap segmen ke global
+        self.segment_marks.rebuild()
 
         # Perbarui state aktif dengan marka gabungan
-        # Gunakan set() untuk menghapus duplikat potensial
-        self.marks = sorted(list(set(all_global_marks)))
-        self.annotation_marks = all_global_annotation_marks
+        self.marks = self.segment_marks.marks
+        self.annotation_marks = self.segment_marks.annotation_marks
 
         # Perbarui UI timeline
         self.timeline.set_marks(self.marks)
         self.timeline.set_annotation_marks(self.annotation_marks)
 
+    def _sync_global_marks_with_segments(self):
+        """Tambahkan marka dari segmen yang baru disambung ke peta (tanpa membangun ulang)."""
+        if (self.marks is not self.segment_marks.marks
+                or self.annotation_marks is not self.segment_marks.annotation_marks):
+            self._rebuild_global_marks_from_segments()
+            return
+        self.segment_marks.sync()
+        self.timeline.set_marks(self.marks)
+        self.timeline.set_annotation_marks(self.annotation_marks)
+
+    def _apply_segment_mark_change(self, kind, path, local_frame, marked):
+        """
+        Terapkan satu perubahan marka lokal ("marks" / "annotation_marks")
+        ke marka global mode segmen, tanpa membaca ulang semua segmen.
+        """
+        if (self.marks is not self.segment_marks.marks
+                or self.annotation_marks is not self.segment_marks.annotation_marks):
+            # State aktif bukan milik view segmen (mis. baru dibersihkan): bangun ulang
+            self._rebuild_global_marks_from_segments()
+            return
+        self.segment_marks.set_local(kind, path, local_frame, marked)
+        if kind == "marks":
+            self.timeline.set_marks(self.marks)
+        else:
+            self.timeline.set_annotation_marks(self.annotation_marks)
+
     def _save_current_media_data(self):
         """Menyimpan marka/anotasi aktif ke cache."""
         current_path = self.media_player.get_current_file_path()
@@ -2668,8 +3421,8 @@ class MainWindow(QMainWindow):
             # --- PERBAIKAN: Hanya simpan marka jika TIDAK di mode segmen ---
             if not self.segment_map:
                 # Mode Single atau Compare: Simpan state aktif saat ini ke cache
-                data["marks"] = list(self.marks) # Simpan salinan
-                data["annotation_marks"] = set(self.annotation_marks) # Simpan salinan
+                data["marks"] = self.marks.copy() # Simpan salinan
+                data["annotation_marks"] = self.annotation_marks.copy() # Simpan salinan
             # --- AKHIR PERBAIKAN ---
                 
             # Selalu simpan anotasi (gambar) karena itu lokal untuk player
@@ -2704,7 +3457,8 @@ class MainWindow(QMainWindow):
             self.marks = data["marks"]
             self.annotation_marks = data["annotation_marks"]
 
-            # Set SEMUA properti timeline
+            # Set SEMUA properti timeline (media baru: tanpa zoom)
+            self.timeline.reset_zoom()
             self.timeline.set_duration(new_duration) 
             self.timeline.set_fps(new_fps) 
             self.timeline.set_marks(self.marks)
@@ -2725,13 +3479,12 @@ class MainWindow(QMainWindow):
         data2 = self._get_or_create_media_data(file2) if file2 else None
         
         # Gabungkan marka untuk timeline
-        marks1 = set(data1["marks"]) if data1 else set()
-        marks2 = set(data2["marks"]) if data2 else set()
-        self.marks = sorted(list(marks1 | marks2))
-        
-        ann_marks1 = data1["annotation_marks"] if data1 else set()
-        ann_marks2 = data2["annotation_marks"] if data2 else set()
-        self.annotation_marks = ann_marks1 | ann_marks2
+        self.marks = MarkIndex()
+        self.annotation_marks = MarkIndex()
+        for data in (data1, data2):
+            if data:
+                self.marks.update(data["marks"])
+                self.annotation_marks.update(data["annotation_marks"])
         
         # Terapkan ke UI
         self.timeline.set_marks(self.marks)
@@ -2766,6 +3519,7 @@ class MainWindow(QMainWindow):
         dur2_str = self.format_duration(dur2)
         self.total_duration_label.setText(f"A: {dur1_str} ({frames1}) | B: {dur2_str} ({frames2})")
         QTimer.singleShot(50, self.update_composite_view)
+        self._revalidate_loop_range(file_changed=True)
         self.update_playlist_item_indicator()
         
     def toggle_compare_mode(self, enabled):
@@ -2779,6 +3533,8 @@ class MainWindow(QMainWindow):
             if self.compare_timer.isActive():
                 self.compare_timer.stop()
                 self.is_compare_playing = False
+            self.compare_playback.stop()
+            self.compare_compositor.clear()
             
             # --- PERBAIKAN: Simpan data (kosong) dari compare mode ---
             # dan bersihkan player B
@@ -2828,41 +3584,9 @@ class MainWindow(QMainWindow):
         h_a, w_a = (frame_a_orig.shape[0], frame_a_orig.shape[1]) if frame_a_orig is not None else (480, 640)
         h_b, w_b = (frame_b_orig.shape[0], frame_b_orig.shape[1]) if frame_b_orig is not None else (480, 640)
 
-        # --- FUNGSI HELPER UNTUK MENGGAMBAR ANOTASI ---
-        def apply_annotation(source_frame, annotation_image, frame_h, frame_w):
-            if source_frame is None or annotation_image is None:
-                return source_frame
-            
-            h_ann, w_ann = annotation_image.height(), annotation_image.width()
-            if h_ann <= 0 or w_ann <= 0:
-                return source_frame
-            
-            ptr = annotation_image.bits()
-            ptr.setsize(h_ann * w_ann * 4)
-            arr = np.frombuffer(ptr, np.uint8).reshape((h_ann, w_ann, 4)) # BGRA
-            
-            bgr_ann = arr[:, :, :3]
-            alpha_ann = arr[:, :, 3] / 255.0
-            
-            if (frame_h, frame_w) != (h_ann, w_ann):
-                bgr_ann = cv2.resize(bgr_ann, (frame_w, frame_h), interpolation=cv2.INTER_NEAREST)
-                alpha_ann = cv2.resize(alpha_ann, (frame_w, frame_h), interpolation=cv2.INTER_NEAREST)
-
-            alpha_ann = alpha_ann.astype(np.float32) 
-            alpha_ann = cv2.cvtColor(alpha_ann, cv2.COLOR_GRAY2BGR) 
-            
-            # Terapkan ke frame
-            return (source_frame * (1 - alpha_ann) + bgr_ann * alpha_ann).astype(np.uint8)
-        # --- AKHIR FUNGSI HELPER ---
-
-        # Terapkan Anotasi A (Player 1)
-        annotation_image_a = self.media_player.annotations.get(self.media_player.current_frame_index)
-        frame_a_orig = apply_annotation(frame_a_orig, annotation_image_a, h_a, w_a)
-
-        # --- PERBAIKAN: Terapkan Anotasi B (Player 2) ---
-        annotation_image_b = self.media_player_2.annotations.get(self.media_player_2.current_frame_index)
-        frame_b_orig = apply_annotation(frame_b_orig, annotation_image_b, h_b, w_b)
-        # --- AKHIR PERBAIKAN ---
+        # Anotasi A (Player 1) dan B (Player 2) di-blend oleh compositor setelah diskalakan
+        annotation_a = self.media_player.annotations.get(self.media_player.current_frame_index) if frame_a_orig is not None else None
+        annotation_b = self.media_player_2.annotations.get(self.media_player_2.current_frame_index) if frame_b_orig is not None else None
 
         # Buat Placeholder JIKA DIPERLUKAN
         frame_a = frame_a_orig if frame_a_orig is not None else self.create_placeholder_frame("View A", w_a, h_a)
@@ -2876,14 +3600,9 @@ class MainWindow(QMainWindow):
                 self.media_player.display_frame(self.create_placeholder_frame("No Media", 640, 480))
             return
         
-        new_w_a = int(frame_a.shape[1] * (target_h / frame_a.shape[0])) if frame_a.shape[0] > 0 else 0
-        new_w_b = int(frame_b.shape[1] * (target_h / frame_b.shape[0])) if frame_b.shape[0] > 0 else 0
-        
-        frame_a_res = cv2.resize(frame_a, (new_w_a, target_h), interpolation=cv2.INTER_AREA) if new_w_a > 0 else np.zeros((target_h, 1, 3), dtype=np.uint8)
-        frame_b_res = cv2.resize(frame_b, (new_w_b, target_h), interpolation=cv2.INTER_AREA) if new_w_b > 0 else np.zeros((target_h, 1, 3), dtype=np.uint8)
-        
-        self.media_player.set_compare_split(frame_a_res.shape[1], frame_b_res.shape[1])
-        composite = cv2.hconcat([frame_a_res, frame_b_res])
+        # Penskalaan dan penggabungan ke buffer yang dipakai ulang (tanpa alokasi per tick)
+        composite, new_w_a, new_w_b = self.compare_compositor.compose(frame_a, annotation_a, frame_b, annotation_b)
+        self.media_player.set_compare_split(new_w_a, new_w_b)
         self.media_player.display_frame(composite)
         
     def update_playlist_item_indicator(self):
@@ -2911,6 +3630,9 @@ class MainWindow(QMainWindow):
                 is_a = (item_path == path_a)
                 is_b = (self.compare_mode and item_path == path_b)
                 
+                if is_a and self.media_player.is_showing_proxy() and item.data(0, PROXY_STATE_ROLE) is None:
+                    item.setData(0, PROXY_STATE_ROLE, 1.0)
+
                 if is_a and is_b: indicator = " (A/B)"
                 elif is_a: indicator = " (A)"
                 elif is_b: indicator = " (B)"
@@ -2954,6 +3676,7 @@ class MainWindow(QMainWindow):
     def go_to_last_frame(self):
         if self.is_compare_playing:
             self.compare_timer.stop()
+            self.compare_playback.stop()
             self.is_compare_playing = False
             self.controls.set_play_state(False)
         elif self.media_player.is_playing:
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Sorted mark indexes.
+
+Marks (and the green annotation marks) used to be plain lists and sets:
+toggling a mark did a linear membership test and a full sort, jumping to
+the next mark sorted the union of both kinds again, and in segment mode
+every toggle rebuilt the global marks by walking every segment. With
+automated QC dropping tens of thousands of marks on a long timeline, every
+key press became slow.
+
+MarkIndex keeps the frames of one kind in a sorted list, so membership,
+insert, remove and next/previous lookups are bisect searches. Every clip
+has its own index of local frames in the media data cache. SegmentMarkView
+holds the global indexes of a segment timeline and applies a change in one
+clip as a shifted insert or remove instead of a rebuild; segments appended
+by the background probe are merged in without touching the others.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from segment_map import SegmentMap
+
+
+class MarkIndex:
+    """A sorted set of frame numbers."""
+
+    __slots__ = ('_frames',)
+
+    def __init__(self, frames: Iterable[int] = ()) -> None:
+        if isinstance(frames, MarkIndex):
+            self._frames: List[int] = list(frames._frames)
+        else:
+            self._frames = sorted(set(frames))
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __bool__(self) -> bool:
+        return bool(self._frames)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._frames)
+
+    def __reversed__(self) -> Iterator[int]:
+        return reversed(self._frames)
+
+    def __getitem__(self, position: int) -> int:
+        return self._frames[position]
+
+    def __contains__(self, frame: int) -> bool:
+        position = bisect_left(self._frames, frame)
+        return position < len(self._frames) and self._frames[position] == frame
+
+    def __repr__(self) -> str:
+        return f"MarkIndex({self._frames!r})"
+
+    # --- Editing ---
+
+    def add(self, frame: int) -> bool:
+        """Insert frame; returns False if it was already marked."""
+        position = bisect_left(self._frames, frame)
+        if position < len(self._frames) and self._frames[position] == frame:
+            return False
+        self._frames.insert(position, frame)
+        return True
+
+    def discard(self, frame: int) -> bool:
+        """Remove frame if marked; returns whether it was."""
+        position = bisect_left(self._frames, frame)
+        if position < len(self._frames) and self._frames[position] == frame:
+            del self._frames[position]
+            return True
+        return False
+
+    def remove(self, frame: int) -> None:
+        if not self.discard(frame):
+            raise KeyError(frame)
+
+    def toggle(self, frame: int) -> bool:
+        """Add frame if unmarked, remove it otherwise. Returns True if it is now marked."""
+        if self.discard(frame):
+            return False
+        self.add(frame)
+        return True
+
+    def update(self, frames: Iterable[int]) -> None:
+        """Add many frames at once (appending frames past the last mark is linear)."""
+        new_frames = sorted(set(frames))
+        if not new_frames:
+            return
+        if not self._frames or new_frames[0] > self._frames[-1]:
+            self._frames.extend(new_frames)
+        else:
+            self._frames = sorted(set(self._frames).union(new_frames))
+
+    def clear(self) -> None:
+        self._frames.clear()
+
+    def copy(self) -> 'MarkIndex':
+        return MarkIndex(self)
+
+    # --- Lookups ---
+
+    def index(self, frame: int) -> int:
+        """Position of frame among the marks (ValueError if unmarked)."""
+        position = bisect_left(self._frames, frame)
+        if position < len(self._frames) and self._frames[position] == frame:
+            return position
+        raise ValueError(f"{frame} is not marked")
+
+    def rank(self, frame: float) -> int:
+        """Number of marks before frame."""
+        return bisect_left(self._frames, frame)
+
+    def next_after(self, frame: int) -> Optional[int]:
+        """First mark after frame, or None."""
+        position = bisect_right(self._frames, frame)
+        return self._frames[position] if position < len(self._frames) else None
+
+    def previous_before(self, frame: int) -> Optional[int]:
+        """Last mark before frame, or None."""
+        position = bisect_left(self._frames, frame)
+        return self._frames[position - 1] if position > 0 else None
+
+    def last_at_or_before(self, frame: int) -> Optional[int]:
+        """Last mark at or before frame, or None."""
+        position = bisect_right(self._frames, frame)
+        return self._frames[position - 1] if position > 0 else None
+
+    def between(self, first: int, last: int) -> List[int]:
+        """Marks from first to last (inclusive), e.g. the visible part of a timeline."""
+        return self._frames[bisect_left(self._frames, first):bisect_right(self._frames, last)]
+
+
+def next_mark(indexes: Iterable[MarkIndex], frame: int) -> Optional[int]:
+    """First mark of any index after frame, wrapping around to the first mark."""
+    indexes = [index for index in indexes if index]
+    following = [mark for mark in (index.next_after(frame) for index in indexes) if mark is not None]
+    if following:
+        return min(following)
+    return min((index[0] for index in indexes), default=None)
+
+
+def previous_mark(indexes: Iterable[MarkIndex], frame: int) -> Optional[int]:
+    """Last mark of any index before frame, wrapping around to the last mark."""
+    indexes = [index for index in indexes if index]
+    preceding = [mark for mark in (index.previous_before(frame) for index in indexes) if mark is not None]
+    if preceding:
+        return max(preceding)
+    return max((index[-1] for index in indexes), default=None)
+
+
+class SegmentMarkView:
+    """
+    Global marks of a segment timeline: the local marks of every clip in
+    segment_map shifted by the clip's start frame. local_data(path) returns
+    the clip's media data ({'marks': MarkIndex, 'annotation_marks':
+    MarkIndex, ...}) or None.
+    """
+
+    KINDS = ('marks', 'annotation_marks')
+
+    def __init__(self, segment_map: SegmentMap, local_data: Callable[[str], Optional[dict]]) -> None:
+        self.segment_map = segment_map
+        self.local_data = local_data
+        self.marks = MarkIndex()
+        self.annotation_marks = MarkIndex()
+        self._synced_segments = 0
+
+    def rebuild(self) -> None:
+        """Build both indexes from scratch (after the segments were reordered or replaced)."""
+        self.marks.clear()
+        self.annotation_marks.clear()
+        self._synced_segments = 0
+        self.sync()
+
+    def sync(self) -> None:
+        """Merge in the marks of segments appended since the last rebuild or sync."""
+        if self._synced_segments > len(self.segment_map):
+            # The map was cleared and refilled in the meantime
+            self.rebuild()
+            return
+        added = {kind: [] for kind in self.KINDS}
+        for index in range(self._synced_segments, len(self.segment_map)):
+            segment = self.segment_map[index]
+            data = self.local_data(segment['path'])
+            if data is None:
+                continue
+            start_frame = segment['start_frame']
+            for kind in self.KINDS:
+                added[kind].extend(start_frame + local_frame for local_frame in data[kind])
+        self._synced_segments = len(self.segment_map)
+        for kind in self.KINDS:
+            getattr(self, kind).update(added[kind])
+
+    def set_local(self, kind: str, path: str, local_frame: int, marked: bool) -> None:
+        """Apply one added (marked) or removed local mark of path to every segment playing it."""
+        index = getattr(self, kind)
+        for start_frame in self.segment_map.starts_for_path(path):
+            if marked:
+                index.add(start_frame + local_frame)
+            else:
+                index.discard(start_frame + local_frame)
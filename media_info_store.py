@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Persistent media metadata store.
+
+Probing a clip (fps, frame count, resolution, codec, sequence frame range)
+means opening a full capture, which adds up quickly for playlists with a
+few hundred entries. Results are kept in a SQLite database in the
+application cache directory. A row stays valid while the file's size and
+mtime are unchanged (for image sequences: the directory's), so edited
+media is probed again automatically.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import cv2
+
+from sequence_capture import ImageSequenceCapture, create_media_capture
+from src.utils.helpers import getCacheDir
+
+DB_FILE_NAME = 'media_info.sqlite3'
+# 2: sequence frame counts include holes (first..last)
+SCHEMA_VERSION = 2
+# SQLite limits the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+INFO_FIELDS = ('fps', 'frame_count', 'width', 'height', 'codec', 'first_frame', 'last_frame')
+
+
+def _stat_key(path: str):
+    stat_path = (os.path.dirname(path) or '.') if '%' in path else path
+    try:
+        stat = os.stat(stat_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def probe_media_info(file_path: str) -> Optional[dict]:
+    """
+    Open file_path and read its metadata. Returns a dict with INFO_FIELDS
+    (frame_count 0 if nothing could be read), or None if it cannot be opened.
+    """
+    capture = create_media_capture(file_path)
+    if capture is None:
+        return None
+    try:
+        if not capture.isOpened():
+            return None
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        first_frame = last_frame = None
+
+        if isinstance(capture, ImageSequenceCapture):
+            codec = os.path.splitext(file_path)[1].lstrip('.').upper()
+            first_frame = capture.first_frame_number
+            last_frame = capture.last_frame_number
+        else:
+            fourcc = int(capture.get(cv2.CAP_PROP_FOURCC) or 0)
+            codec = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ')
+
+        if frame_count <= 0 or not width:
+            # Streams without a frame count, and sequences (no size property):
+            # read one frame
+            ret, frame = capture.read()
+            if ret:
+                height, width = frame.shape[:2]
+                if frame_count <= 0:
+                    frame_count = 1
+        return {
+            'fps': float(fps),
+            'frame_count': frame_count,
+            'width': width,
+            'height': height,
+            'codec': codec,
+            'first_frame': first_frame,
+            'last_frame': last_frame,
+        }
+    finally:
+        capture.release()
+
+
+class MediaInfoStore:
+    """
+    SQLite-backed metadata cache keyed by path, validated by size + mtime.
+
+    Safe to share between threads; all access goes through one connection
+    guarded by a lock.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path = db_path or os.path.join(getCacheDir(), DB_FILE_NAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.execute('DROP TABLE IF EXISTS media_info')
+                self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS media_info ('
+                ' path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,'
+                ' fps REAL, frame_count INTEGER, width INTEGER, height INTEGER, codec TEXT,'
+                ' first_frame INTEGER, last_frame INTEGER, updated REAL)')
+            self._conn.commit()
+
+    def get(self, path: str) -> Optional[dict]:
+        """Return the stored info for path, or None if missing or stale."""
+        return self.get_many([path]).get(path)
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, dict]:
+        """Look up many paths at once; stale or unknown paths are left out."""
+        stat_keys = {}
+        for path in paths:
+            if path and path not in stat_keys:
+                key = _stat_key(path)
+                if key is not None:
+                    stat_keys[path] = key
+        found = {}
+        keys = list(stat_keys)
+        columns = ', '.join(INFO_FIELDS)
+        with self._lock:
+            for start in range(0, len(keys), _BATCH_SIZE):
+                batch = keys[start:start + _BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT path, size, mtime_ns, {columns} FROM media_info'
+                    f' WHERE path IN ({placeholders})', batch).fetchall()
+                for row in rows:
+                    path, size, mtime_ns = row[:3]
+                    if stat_keys[path] == (size, mtime_ns):
+                        found[path] = dict(zip(INFO_FIELDS, row[3:]))
+        return found
+
+    def put(self, path: str, info: dict) -> None:
+        self.put_many({path: info})
+
+    def put_many(self, infos: Dict[str, dict]) -> None:
+        rows = []
+        now = time.time()
+        for path, info in infos.items():
+            key = _stat_key(path)
+            if key is None or not info:
+                continue
+            rows.append((path, key[0], key[1]) + tuple(info.get(field) for field in INFO_FIELDS) + (now,))
+        if not rows:
+            return
+        placeholders = ','.join('?' * len(rows[0]))
+        with self._lock:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO media_info (path, size, mtime_ns, {", ".join(INFO_FIELDS)}, updated)'
+                f' VALUES ({placeholders})', rows)
+            self._conn.commit()
+
+    def remove(self, paths: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany('DELETE FROM media_info WHERE path = ?', [(p,) for p in paths])
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
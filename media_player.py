@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
+import math
 import os
 import time
 import cv2
 import numpy as np
 from PyQt5.QtWidgets import QLabel, QVBoxLayout, QWidget, QSizePolicy
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QMimeData, QUrl, QPoint, QSize
-from PyQt5.QtGui import QPixmap, QImage, QDragEnterEvent, QDropEvent, QPainter, QPen, QColor
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QThread, QMimeData, QUrl, QPoint, QSize, QRect, QRectF
+from PyQt5.QtGui import QImage, QDragEnterEvent, QDropEvent, QPainter, QColor
+from sequence_capture import create_media_capture
+from decode_worker import (FrameDecodeWorker, END_OF_STREAM, MAX_REVERSE_CHUNK_FRAMES,
+                           chunk_decode_start, decode_chunk)
+from src.media.frame_manager import FrameManager
+from keyframe_index import IndexedVideoCapture
+from annotation_store import FrameAnnotation
+from media_preloader import MediaPreloader, KeyframeIndexLoader
 
 # --- Impor VLC ---
 try:
@@ -18,6 +26,70 @@ except ImportError:
     vlc = None
 # --- Akhir Impor ---
 
+# Jumlah frame yang didecode di depan playhead oleh thread decoder
+DEFAULT_READ_AHEAD_FRAMES = 8
+# Thread pool untuk membaca file image sequence secara paralel
+SEQUENCE_PREFETCH_WORKERS = min(8, os.cpu_count() or 2)
+SEQUENCE_PREFETCH_WINDOW = 16
+# Anggaran memori default untuk cache frame RAM (byte)
+DEFAULT_FRAME_CACHE_BYTES = 2 * 1024 ** 3
+# Frame di sekitar playhead yang tidak boleh dibuang dari cache
+PLAYHEAD_PIN_RADIUS = 12
+# Scrub timeline: frame ditampilkan 1/SCRUB_REDUCTION resolusi, di-cache terpisah
+SCRUB_REDUCTION = 4
+SCRUB_CACHE_BYTES = 256 * 1024 ** 2
+# Warna latar area video (sama dengan stylesheet label)
+VIEW_BACKGROUND_COLOR = QColor("#1a1a1a")
+# Mulai skala ini (piksel layar per piksel sumber) zoom memakai nearest-neighbour
+NEAREST_NEIGHBOR_SCALE = 4.0
+
+
+def resize_for_display(frame, size, dst):
+    """
+    Downscale frame ke size (w, h) ke dalam dst. INTER_AREA dengan faktor
+    non-integer sangat lambat (~25 ms untuk komposit 3840x1080), jadi frame
+    dikecilkan dulu dengan faktor integer (jalur cepat INTER_AREA) lalu sisa
+    skala (< 2x) dengan INTER_LINEAR.
+    """
+    h, w = frame.shape[:2]
+    target_w, target_h = size
+    factor = min(w // target_w, h // target_h)
+    if factor < 2:
+        cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+        return
+    reduced_w, reduced_h = w // factor, h // factor
+    reduced = cv2.resize(frame[:reduced_h * factor, :reduced_w * factor], (reduced_w, reduced_h),
+                         interpolation=cv2.INTER_AREA)
+    if (reduced_w, reduced_h) == (target_w, target_h):
+        dst[:] = reduced
+    else:
+        cv2.resize(reduced, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+
+
+def open_playback_capture(file_path, build_index=False):
+    """
+    Membuka capture untuk playback. Sequence ('%') memakai ImageSequenceCapture
+    agar penomoran frame VFX (mis. 1001) tetap terbaca. Video memakai
+    IndexedVideoCapture (index keyframe, seek akurat per frame) bila PyAV
+    tersedia dan index-nya sudah ada, jika tidak jatuh ke cv2 FFMPEG.
+    Membangun index membaca seluruh file, jadi defaultnya tidak dilakukan di
+    sini (lihat MediaPlayer._request_keyframe_index).
+    """
+    if not file_path:
+        return None
+    if '%' in file_path:
+        return create_media_capture(file_path,
+                                    prefetch_workers=SEQUENCE_PREFETCH_WORKERS,
+                                    prefetch_window=SEQUENCE_PREFETCH_WINDOW)
+    cap = IndexedVideoCapture.open(file_path, build_index=build_index)
+    if cap is not None:
+        return cap
+    cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG)
+    if cap.isOpened():
+        return cap
+    cap.release()
+    return None
+
 
 class DrawingLabel(QLabel):
     """
@@ -34,6 +106,16 @@ class DrawingLabel(QLabel):
         # Enable drag-drop pada label
         self.setAcceptDrops(True)
 
+    def paintEvent(self, event):
+        # Teks status (mis. "Load media file...") tetap digambar QLabel
+        if self.media_player.displayed_frame_source is None or self.text():
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), VIEW_BACKGROUND_COLOR)
+        self.media_player.paint_frame(painter, event.rect())
+        painter.end()
+
     def _map_widget_to_frame_coords(self, widget_pos):
         """
         Memetakan koordinat QPoint dari widget label ke koordinat (x, y) 
@@ -67,8 +149,7 @@ class DrawingLabel(QLabel):
                 if frame_pos:
                     self.drawing = True
                     self.last_point_frame = frame_pos
-                    self.media_player.get_current_annotation_image()
-                    self.media_player.draw_on_annotation(frame_pos, frame_pos) 
+                    self.media_player.begin_stroke(frame_pos)
                     event.accept()
                     return 
             elif not self.media_player.drawing_enabled and self.media_player.zoom_factor > 1.001:
@@ -122,8 +203,7 @@ class DrawingLabel(QLabel):
             final_pan_y = max(min_pan_y, min(new_pan_offset.y(), max_pan_y))
             self.media_player.pan_offset = QPoint(final_pan_x, final_pan_y)
             self.last_pan_pos = event.pos()
-            if self.media_player.displayed_frame_source is not None:
-                self.media_player.display_frame(self.media_player.displayed_frame_source)
+            self.media_player.refresh_view()
             event.accept()
             return
         elif self.drawing and self.media_player.drawing_enabled and (event.buttons() & Qt.LeftButton):
@@ -186,8 +266,7 @@ class DrawingLabel(QLabel):
             final_pan_x = max(min_pan_x, min(int(new_pan_x), max_pan_x))
             final_pan_y = max(min_pan_y, min(int(new_pan_y), max_pan_y))
             self.media_player.pan_offset = QPoint(final_pan_x, final_pan_y)
-        if self.media_player.displayed_frame_source is not None:
-            self.media_player.display_frame(self.media_player.displayed_frame_source)
+        self.media_player.refresh_view()
         event.accept()
 
     # --- DRAG-DROP HANDLERS UNTUK DRAWING LABEL ---
@@ -224,10 +303,12 @@ class MediaPlayer(QWidget):
     playStateChanged = pyqtSignal(bool)
     fpsChanged = pyqtSignal(float)
     playbackFinished = pyqtSignal(bool)
+    reverseFinished = pyqtSignal()
     fileDropped = pyqtSignal(str, str)
     annotationAdded = pyqtSignal(int)
     
-    def __init__(self, enable_audio=True):
+    def __init__(self, enable_audio=True, read_ahead_frames=DEFAULT_READ_AHEAD_FRAMES, frame_cache=None,
+                 proxy_resolver=None):
         super().__init__()
         self.setAcceptDrops(True)
         self.setup_ui()
@@ -253,6 +334,33 @@ class MediaPlayer(QWidget):
         self.enable_audio = enable_audio
         self.playback_start_time = None
         self.compare_split_ratio = None
+
+        # --- Decoder latar belakang ---
+        # Timer hanya menampilkan frame yang sudah didecode oleh worker.
+        self.read_ahead_frames = read_ahead_frames
+        self._decode_worker = None
+        self._playback_base_seq = 0
+        self._playback_priming = False
+        # Arah playback: 1 = maju, -1 = mundur (shuttle J)
+        self.play_direction = 1
+        # Posisi baca berikutnya dari self.video_capture (untuk hindari seek)
+        self._capture_next_index = -1
+
+        # --- Cache frame RAM ---
+        # Kunci: (path media, indeks frame). Bisa dibagi dengan player lain.
+        if frame_cache is None:
+            frame_cache = FrameManager(max_cache_size=None, max_cache_bytes=DEFAULT_FRAME_CACHE_BYTES)
+        self.frame_cache = frame_cache
+        self._pin_name = f"playhead:{id(self)}"
+        # Thumbnail resolusi rendah untuk scrub timeline
+        self.scrub_cache = FrameManager(max_cache_size=None, max_cache_bytes=SCRUB_CACHE_BYTES)
+
+        # --- Proxy ---
+        # proxy_resolver(path) -> path proxy atau None. current_media_path tetap path
+        # sumber; playback_path adalah file yang benar-benar didecode (proxy/sumber).
+        self.proxy_resolver = proxy_resolver
+        self.prefer_proxy = True
+        self.playback_path = None
         
         # --- Inisialisasi VLC ---
         self.vlc_instance = None
@@ -282,6 +390,37 @@ class MediaPlayer(QWidget):
         self.frame_dims = None
         self.zoom_factor = 1.0
         self.pan_offset = QPoint(0, 0)
+        # --- Jalur tampilan ---
+        # QImage BGR888 yang membungkus displayed_frame_source langsung (tanpa copy),
+        # plus hasil downscale sekali ke ukuran layar di buffer yang dipakai ulang.
+        self._source_image = None
+        self._scaled_buffer = None
+        self._scaled_image = None
+        self._scaled_key = None
+        # Buffer potongan viewport saat zoom (ukurannya ~ ukuran widget)
+        self._roi_buffer = None
+        # Coretan yang sedang digambar: layer transparen seukuran label. Tiap
+        # segmen baru hanya menggambar & me-repaint kotak pembatasnya; anotasi
+        # baru dikomposit ulang sekali saat coretan selesai (finalize_drawing).
+        self._stroke_annotation = None
+        self._stroke_layer = None
+
+        # --- Klip berikutnya (playback tanpa jeda antar segmen) ---
+        # Capture, frame pertama & media audio disiapkan MediaPreloader; worker
+        # decoder untuk frame 1 dst. sudah berjalan sebelum cut.
+        self._prepared_path = None
+        self._prepared_media = None
+        self._prepared_worker = None
+        self._preloader = None
+        # Preloader yang masih berjalan (termasuk yang sudah dibatalkan)
+        self._preloaders = set()
+
+        # --- Index keyframe di background ---
+        # Pembukaan pertama sebuah video diputar lewat cv2; setelah index selesai
+        # dibangun KeyframeIndexLoader, capture diganti IndexedVideoCapture.
+        self._index_loaders = set()
+        self._indexing_paths = set()
+        self._unindexable_paths = set()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -355,7 +494,8 @@ class MediaPlayer(QWidget):
             self.audio_player.set_time(target_ms)
             
             # 2. Atur status play/pause BANYA PADA AUDIO
-            if self.is_playing:
+            # (VLC tidak bisa memutar mundur; audio diam saat reverse)
+            if self.is_playing and self.play_direction > 0:
                 self.audio_player.play()
             else:
                 self.audio_player.pause()
@@ -386,11 +526,362 @@ class MediaPlayer(QWidget):
             print(f"Error saat audio scrub: {e}")
 
     def _reset_playback_clock(self):
-        if self.is_playing and self.fps > 0:
-            self.playback_start_time = time.monotonic() - (self.current_frame_index / self.fps)
-        elif not self.is_playing:
+        if self.is_playing and self.video_timer.isActive():
+            # Jangkarkan jam ke frame saat ini dan arahkan decoder ke frame berikutnya.
+            # Jangkar mundur setengah frame: tick timer jatuh di tengah periode frame,
+            # bukan tepat di batasnya, jadi jitter timer tidak membuat frame terlewat
+            # (jam dijangkarkan ulang di tiap cut segmen).
+            self._restart_decode_worker()
+            fps = self.fps if self.fps > 0 else 24
+            self.playback_start_time = time.monotonic() - 0.5 / fps
+            self._playback_priming = True
+        else:
             self.playback_start_time = None
 
+    def _restart_decode_worker(self, start_index=None):
+        if not self.is_video or not self.playback_path:
+            return
+        if self._decode_worker is None:
+            self._decode_worker = FrameDecodeWorker(self.playback_path, open_playback_capture,
+                                                    buffer_size=self.read_ahead_frames,
+                                                    frame_cache=self.frame_cache)
+            self._decode_worker.start()
+        if start_index is None:
+            start_index = self.current_frame_index + self.play_direction
+        self._playback_base_seq = self._decode_worker.restart(
+            start_index,
+            (self.loop_in_point, self.loop_out_point) if self.loop_out_point is not None else None,
+            self.total_frames,
+            self.play_direction)
+
+    # --- Playback tersinkron (compare): jam dipegang pemanggil, bukan video_timer ---
+
+    def restart_synced_decode(self, start_index):
+        """
+        Arahkan worker decoder (maju) ke start_index tanpa menjalankan video_timer.
+        Mengembalikan nomor urut frame start_index, atau None bila tidak ada video.
+        """
+        if not self.is_video or not self.playback_path:
+            return None
+        self.play_direction = 1
+        self._restart_decode_worker(start_index)
+        return self._playback_base_seq
+
+    def synced_ready_seq(self, seq_limit):
+        """Nomor urut frame terbaru yang siap (<= seq_limit) tanpa mengambilnya."""
+        if self._decode_worker is None:
+            return None
+        return self._decode_worker.ready_seq_up_to(seq_limit)
+
+    def take_synced_frame(self, seq_limit):
+        """
+        Ambil frame terbaru dengan nomor urut <= seq_limit dari worker dan jadikan
+        frame aktif (tanpa menampilkan). Mengembalikan (seq, index, frame), None
+        bila belum ada yang siap, atau END_OF_STREAM.
+        """
+        if self._decode_worker is None:
+            return None
+        item = self._decode_worker.take_entry_up_to(seq_limit)
+        if item is None or item is END_OF_STREAM:
+            return item
+        seq, frame_index, frame = item
+        self.current_frame = frame
+        self.current_frame_index = frame_index
+        self.has_finished = False
+        self._pin_playhead()
+        return item
+
+    # --- Klip berikutnya: disiapkan di background, ditukar saat cut ---
+
+    def prepare_next_media(self, file_path):
+        """
+        Mulai menyiapkan file_path di background (capture, frame pertama,
+        audio, beberapa frame awal) agar switch_to_prepared_media() nanti
+        tidak perlu membuka apa pun. Aman dipanggil berulang untuk path yang sama.
+        """
+        if not file_path or file_path == self._prepared_path:
+            return
+        self.discard_prepared_media()
+        playback_path = self._resolve_playback_path(file_path)
+        self._prepared_path = file_path
+        self._preloader = MediaPreloader(file_path, playback_path, open_playback_capture,
+                                         frame_cache=self.frame_cache,
+                                         audio_factory=self._create_audio_media if self.audio_player else None)
+        self._preloader.prepared.connect(self._on_media_prepared)
+        self._preloader.finished.connect(self._on_preloader_finished)
+        self._preloaders.add(self._preloader)
+        # Prioritas idle: persiapan hanya memakai CPU yang tidak dipakai playback saat ini
+        self._preloader.start(QThread.IdlePriority)
+        # Frame 1 dst. langsung didecode ke buffer worker yang nanti dipakai playback
+        self._prepared_worker = FrameDecodeWorker(playback_path, open_playback_capture,
+                                                  buffer_size=self.read_ahead_frames,
+                                                  frame_cache=self.frame_cache)
+        self._prepared_worker.start(QThread.IdlePriority)
+        self._prepared_worker.restart(1)
+
+    def is_media_prepared(self, file_path):
+        return self._prepared_media is not None and self._prepared_media.file_path == file_path
+
+    def discard_prepared_media(self):
+        if self._prepared_worker is not None:
+            self._prepared_worker.shutdown()
+            self._prepared_worker = None
+        if self._prepared_media is not None:
+            self._prepared_media.release()
+            self._prepared_media = None
+        # Hasil preloader yang masih berjalan dilepas saat tiba (_on_media_prepared)
+        self._preloader = None
+        self._prepared_path = None
+
+    def _on_media_prepared(self, prepared):
+        if self.sender() is not self._preloader:
+            if prepared is not None:
+                prepared.release()
+            return
+        self._preloader = None
+        if prepared is None:
+            # Tidak bisa dibuka sebagai video: cut nanti memakai load_media biasa
+            # (_prepared_path tetap diisi agar tidak dicoba ulang tiap frame)
+            if self._prepared_worker is not None:
+                self._prepared_worker.shutdown()
+                self._prepared_worker = None
+            return
+        self._prepared_media = prepared
+
+    def _on_preloader_finished(self):
+        self._preloaders.discard(self.sender())
+
+    def _create_audio_media(self, file_path):
+        """Dipanggil di thread preloader: buat & parse media VLC untuk file_path."""
+        if '%' in file_path:
+            return None
+        try:
+            media = self.vlc_instance.media_new(file_path)
+            media.parse()
+            return media
+        except Exception as e:
+            print(f"Error VLC saat menyiapkan audio: {e}")
+            return None
+
+    def switch_to_prepared_media(self, file_path):
+        """
+        Ganti media ke file_path yang sudah disiapkan oleh prepare_next_media(),
+        tanpa membuka ulang capture atau parse audio di thread GUI. Mengembalikan
+        False (tanpa mengubah apa pun) bila file_path belum siap; pemanggil lalu
+        memakai load_media() biasa. Playback tidak dimulai otomatis.
+        """
+        if not self.is_media_prepared(file_path):
+            return False
+        prepared = self._prepared_media
+        worker = self._prepared_worker
+        self._prepared_media = None
+        self._prepared_worker = None
+        self._prepared_path = None
+
+        self.video_timer.stop()
+        self.is_playing = False
+        self.play_direction = 1
+        self.playback_start_time = None
+        self._shutdown_decode_worker()
+        if self.video_capture:
+            self.video_capture.release()
+        self.frame_cache.clearPinnedRange(self._pin_name)
+
+        self.video_capture = prepared.capture
+        prepared.capture = None
+        worker.setPriority(QThread.NormalPriority)
+        self._decode_worker = worker
+        self.is_video = True
+        self.current_media_path = prepared.file_path
+        self.playback_path = prepared.playback_path
+        self.total_frames = prepared.total_frames
+        self.fps = prepared.fps
+        self.current_frame = prepared.first_frame
+        self.current_frame_index = 0
+        self._capture_next_index = 1
+        self.has_finished = False
+        self.loop_in_point = None
+        self.loop_out_point = None
+        self.compare_split_ratio = None
+        self.annotations.clear()
+        self._stroke_annotation = None
+        self._stroke_layer = None
+        if self.frame_dims is not None and self.frame_dims[:2] != prepared.first_frame.shape[:2]:
+            # Zoom/pan dipertahankan antar cut selama resolusinya sama
+            self.zoom_factor = 1.0
+            self.pan_offset = QPoint(0, 0)
+
+        self._pin_playhead()
+        self.display_frame(prepared.first_frame)
+        self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
+        self.fpsChanged.emit(self.fps)
+        self.frameReady.emit()
+
+        if self.audio_player:
+            self.audio_player.stop()
+            self.audio_player.set_media(prepared.audio_media)
+            if prepared.audio_media is not None:
+                self.audio_player.audio_set_volume(self._volume)
+                prepared.audio_media.release()
+            prepared.audio_media = None
+        self._request_keyframe_index()
+        return True
+
+    def _request_keyframe_index(self):
+        """
+        Bangun index keyframe playback_path di background bila capture saat
+        ini masih cv2 (index belum ada). Setelah selesai capture diganti
+        IndexedVideoCapture di frame yang sama (_on_keyframe_indexed).
+        """
+        path = self.playback_path
+        if (not self.is_video or not path or '%' in path or
+                isinstance(self.video_capture, IndexedVideoCapture) or
+                path in self._indexing_paths or path in self._unindexable_paths):
+            return
+        self._indexing_paths.add(path)
+        loader = KeyframeIndexLoader(path)
+        loader.indexed.connect(self._on_keyframe_indexed)
+        loader.finished.connect(self._on_index_loader_finished)
+        self._index_loaders.add(loader)
+        # Prioritas idle seperti preloader: playback lewat cv2 tidak boleh tersendat
+        loader.start(QThread.IdlePriority)
+
+    def _on_keyframe_indexed(self, path, ok):
+        self._indexing_paths.discard(path)
+        if not ok:
+            # Tidak bisa diindex (mis. PyAV tidak ada): tetap cv2, jangan coba lagi
+            self._unindexable_paths.add(path)
+            return
+        if (path != self.playback_path or not self.is_video or
+                isinstance(self.video_capture, IndexedVideoCapture)):
+            return
+        cap = open_playback_capture(path)
+        if not isinstance(cap, IndexedVideoCapture):
+            if cap is not None:
+                cap.release()
+            return
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        if total and total != self.total_frames:
+            # Jumlah frame dari index akurat; perkiraan cv2 diganti
+            self.total_frames = total
+            self.current_frame_index = min(self.current_frame_index, total - 1)
+            self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
+        self._swap_playback_capture(path, cap)
+
+    def _on_index_loader_finished(self):
+        loader = self.sender()
+        self._index_loaders.discard(loader)
+        if loader is not None:
+            loader.deleteLater()
+
+    def shutdown_index_loaders(self):
+        """Batalkan & tunggu pembangunan index keyframe yang masih berjalan (aplikasi ditutup)."""
+        for loader in list(self._index_loaders):
+            loader.cancel()
+            loader.wait()
+        self._index_loaders.clear()
+        self._indexing_paths.clear()
+
+    def _shutdown_decode_worker(self):
+        if self._decode_worker is not None:
+            self._decode_worker.shutdown()
+            self._decode_worker = None
+
+    def _read_frame(self, frame_index):
+        """
+        Mengambil frame tertentu: dari cache RAM bila ada, jika tidak didecode
+        dari capture GUI (seek hanya bila tidak berurutan) lalu disimpan ke cache.
+        """
+        if not self.video_capture:
+            return False, None
+        cache_key = (self.playback_path, frame_index)
+        frame = self.frame_cache.getFrame(cache_key)
+        if frame is not None:
+            return True, frame
+        if frame_index == self.current_frame_index - 1:
+            return self._read_frame_backward(frame_index)
+        if frame_index != self._capture_next_index:
+            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = self.video_capture.read()
+        self._capture_next_index = frame_index + 1 if ret else -1
+        if ret:
+            self.frame_cache.addFrame(cache_key, frame)
+        return ret, frame
+
+    def _read_frame_backward(self, frame_index):
+        """
+        Step mundur: decode seluruh GOP (keyframe s/d frame_index) ke cache,
+        sehingga step mundur berikutnya cukup cache hit.
+        """
+        decode_start = chunk_decode_start(self.video_capture, frame_index)
+        keep_start = max(decode_start, frame_index - MAX_REVERSE_CHUNK_FRAMES + 1)
+        frames, self._capture_next_index = decode_chunk(
+            self.video_capture, self._capture_next_index, decode_start, keep_start, frame_index,
+            self.frame_cache, self.playback_path)
+        if not frames:
+            return False, None
+        return True, frames[-1][1]
+
+    def _pin_playhead(self):
+        """Lindungi frame di sekitar playhead dari eviction cache."""
+        if self.playback_path and self.current_frame_index >= 0:
+            self.frame_cache.setPinnedRange(self._pin_name, self.playback_path,
+                                            self.current_frame_index - PLAYHEAD_PIN_RADIUS,
+                                            self.current_frame_index + PLAYHEAD_PIN_RADIUS)
+
+    def show_scrub_frame(self, frame_index):
+        """
+        Menampilkan frame resolusi rendah saat scrub timeline. Frame full-res yang
+        sudah ada di cache dipakai langsung; selain itu thumbnail dari keyframe
+        terdekat (video) atau decode tereduksi (sequence). current_frame tidak
+        diubah sampai seek full-res berikutnya. Mengembalikan False bila gagal.
+        """
+        if not self.is_video or not self.video_capture: return False
+        if not 0 <= frame_index < self.total_frames: return False
+        frame = self.frame_cache.getFrame((self.playback_path, frame_index))
+        if frame is None:
+            frame = self._scrub_thumbnail(frame_index)
+        if frame is None:
+            return False
+        self.current_frame_index = frame_index
+        self.display_frame(frame)
+        self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
+        return True
+
+    def _scrub_thumbnail(self, frame_index):
+        capture = self.video_capture
+        keyframe_for = getattr(capture, 'keyframe_for', None)
+        source_index = keyframe_for(frame_index) if keyframe_for is not None else frame_index
+        key = (self.playback_path, source_index)
+        thumb = self.scrub_cache.getFrame(key)
+        if thumb is not None:
+            return thumb
+
+        # Sequence: libjpeg/libpng bisa decode langsung di 1/4 resolusi
+        frame_path = getattr(capture, 'frame_path', None)
+        if frame_path is not None and frame_path(source_index):
+            thumb = cv2.imread(frame_path(source_index), cv2.IMREAD_REDUCED_COLOR_4)
+
+        if thumb is None:
+            frame = self.frame_cache.getFrame(key)
+            if frame is None:
+                if source_index != self._capture_next_index:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, source_index)
+                ret, frame = capture.read()
+                self._capture_next_index = source_index + 1 if ret else -1
+                if not ret:
+                    return None
+                self.frame_cache.addFrame(key, frame)
+            h, w = frame.shape[:2]
+            thumb = cv2.resize(frame, (max(1, w // SCRUB_REDUCTION), max(1, h // SCRUB_REDUCTION)),
+                               interpolation=cv2.INTER_AREA)
+        self.scrub_cache.addFrame(key, thumb)
+        return thumb
+
+    def set_frame_cache_budget(self, max_bytes):
+        """Mengatur anggaran memori cache frame (byte)."""
+        self.frame_cache.setMaxCacheBytes(max_bytes)
+
     def set_volume(self, value):
         self._volume = max(0, min(100, int(value)))
         if self.audio_player:
@@ -410,8 +901,12 @@ class MediaPlayer(QWidget):
         self.compare_split_ratio = (width_a / total) if total > 0 else None
         
     def set_loop_range(self, in_point, out_point):
+        changed = (in_point, out_point) != (self.loop_in_point, self.loop_out_point)
         self.loop_in_point = in_point
         self.loop_out_point = out_point
+        if changed:
+            # Frame di buffer mungkin sudah melewati titik loop yang baru
+            self._reset_playback_clock()
         
     def load_media(self, file_path):
         self.clear_media()
@@ -432,8 +927,13 @@ class MediaPlayer(QWidget):
             
         self.current_media_path = None
         try:
-            cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG)
-            if cap.isOpened():
+            # Proxy dipakai otomatis bila sudah ada (dan tidak sedang melihat original)
+            playback_path = self._resolve_playback_path(file_path)
+            cap = open_playback_capture(playback_path)
+            if cap is None and playback_path != file_path:
+                playback_path = file_path
+                cap = open_playback_capture(file_path)
+            if cap is not None:
                 ret, frame = cap.read()
                 if ret:
                     self.video_capture = cap
@@ -443,7 +943,11 @@ class MediaPlayer(QWidget):
                     self.fps = cap.get(cv2.CAP_PROP_FPS) or 24 
                     if self.fps == 0: self.fps = 24
                     self.current_media_path = file_path 
-                    self.current_frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                    self.playback_path = playback_path
+                    self.current_frame_index = 0
+                    self._capture_next_index = 1
+                    self.frame_cache.addFrame((playback_path, 0), frame)
+                    self._pin_playhead()
                     self.display_frame(frame)
                     self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
                     self.fpsChanged.emit(self.fps)
@@ -451,17 +955,17 @@ class MediaPlayer(QWidget):
                     self.has_finished = False 
                     self.playback_start_time = None
                     self._prepare_audio(file_path if '%' not in file_path else None) 
+                    self._request_keyframe_index()
                     return True
                 else:
                     cap.release()
-            else:
-                cap.release()
             
             frame = cv2.imread(file_path)
             if frame is not None:
                 self.is_video = False
                 self.current_frame = frame
                 self.current_media_path = file_path
+                self.playback_path = file_path
                 self.total_frames = 1
                 self.current_frame_index = 0
                 self.display_frame(frame)
@@ -483,50 +987,177 @@ class MediaPlayer(QWidget):
         return False
         
     def display_frame(self, frame):
+        """
+        Menampilkan frame BGR. Array dibungkus QImage Format_BGR888 tanpa copy
+        dan tanpa konversi warna; referensinya disimpan di displayed_frame_source
+        selama ditampilkan, jadi frame tidak boleh diubah in-place setelahnya.
+        Penggambaran terjadi di DrawingLabel.paintEvent.
+        """
         if frame is None:
+            self.displayed_frame_source = None
+            self._source_image = None
+            self._scaled_image = None
+            self._scaled_key = None
             self.pixmap_size = None
             self.pixmap_offset = QPoint(0, 0)
             self.frame_dims = None
+            self.video_label.update()
             return
-        self.displayed_frame_source = frame.copy() 
-        rgb_frame = cv2.cvtColor(self.displayed_frame_source, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        self.frame_dims = (h, w, ch)
+        if frame is not self.displayed_frame_source:
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            elif not frame.flags['C_CONTIGUOUS']:
+                frame = np.ascontiguousarray(frame)
+            h, w, ch = frame.shape
+            self.displayed_frame_source = frame
+            self.frame_dims = (h, w, ch)
+            self._source_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+            self._scaled_image = None
+            self._scaled_key = None
+        if self.video_label.text():
+            self.video_label.setText("")
+        self.refresh_view()
+
+    def refresh_view(self):
+        """
+        Hitung ulang posisi/ukuran frame di layar (zoom, pan, resize, anotasi)
+        dan jadwalkan repaint. Frame tidak dikonversi ulang.
+        """
+        if self.frame_dims is None:
+            return
+        h, w, ch = self.frame_dims
         widget_size = self.size()
         if widget_size.width() <= 0 or widget_size.height() <= 0: widget_size = self.video_label.size()
         if widget_size.width() <= 0 or widget_size.height() <= 0: widget_size = self.video_label.sizeHint()
         if widget_size.width() <= 0 or widget_size.height() <= 0: return
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
         scale_w = widget_size.width() / w if w > 0 else 0
         scale_h = widget_size.height() / h if h > 0 else 0
         base_scale = min(scale_w, scale_h) if min(scale_w, scale_h) > 0 else 1.0
         total_scale = base_scale * self.zoom_factor
         scaled_w = int(w * total_scale)
         scaled_h = int(h * total_scale)
-        canvas_pixmap = QPixmap(widget_size)
-        canvas_pixmap.fill(QColor("#1a1a1a"))
         draw_x = (widget_size.width() - scaled_w) // 2 + self.pan_offset.x()
         draw_y = (widget_size.height() - scaled_h) // 2 + self.pan_offset.y()
-        painter = QPainter(canvas_pixmap)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        if scaled_w > 0 and scaled_h > 0:
-            painter.drawPixmap(draw_x, draw_y, scaled_w, scaled_h, pixmap)
-        annotation_image = self.annotations.get(self.current_frame_index)
-        if annotation_image and scaled_w > 0 and scaled_h > 0:
-            annotation_pixmap = QPixmap.fromImage(annotation_image)
-            painter.drawPixmap(draw_x, draw_y, scaled_w, scaled_h, annotation_pixmap)
-        painter.end()
         self.pixmap_size = QSize(scaled_w, scaled_h)
         self.pixmap_offset = QPoint(draw_x, draw_y)
-        self.video_label.setPixmap(canvas_pixmap)
-        
+        if self._stroke_annotation is not None:
+            self._rebuild_stroke_layer()
+        self.video_label.update()
+
+    def _get_scaled_image(self, scaled_w, scaled_h):
+        """
+        Frame yang sudah di-downscale (resize_for_display) ke ukuran layar. Dihitung
+        sekali per frame/ukuran ke buffer yang dipakai ulang, sehingga repaint
+        berikutnya (overlay anotasi, expose) cukup blit 1:1.
+        """
+        key = (scaled_w, scaled_h)
+        if self._scaled_key == key and self._scaled_image is not None:
+            return self._scaled_image
+        frame = self.displayed_frame_source
+        shape = (scaled_h, scaled_w, frame.shape[2])
+        if self._scaled_buffer is None or self._scaled_buffer.shape != shape:
+            self._scaled_buffer = np.empty(shape, dtype=np.uint8)
+        resize_for_display(frame, (scaled_w, scaled_h), self._scaled_buffer)
+        self._scaled_image = QImage(self._scaled_buffer.data, scaled_w, scaled_h,
+                                    self._scaled_buffer.strides[0], QImage.Format_BGR888)
+        self._scaled_key = key
+        return self._scaled_image
+
+    def paint_frame(self, painter, dirty_rect=None):
+        """
+        Menggambar frame (dan anotasinya) ke video_label sesuai geometri terakhir.
+        dirty_rect membatasi area yang perlu digambar ulang (koordinat widget).
+        """
+        if self._source_image is None or self.pixmap_size is None:
+            return
+        scaled_w, scaled_h = self.pixmap_size.width(), self.pixmap_size.height()
+        if scaled_w <= 0 or scaled_h <= 0:
+            return
+        h, w, ch = self.frame_dims
+        target = QRect(self.pixmap_offset, self.pixmap_size)
+        view_rect = self.video_label.rect()
+        if not view_rect.contains(target):
+            # Frame lebih besar dari layar (zoom): hanya area yang terlihat diskalakan
+            visible = view_rect.intersected(target)
+            if dirty_rect is not None:
+                visible = visible.intersected(dirty_rect)
+            if not visible.isEmpty():
+                self._paint_frame_region(painter, visible)
+        else:
+            if (scaled_w, scaled_h) == (w, h):
+                painter.drawImage(self.pixmap_offset, self._source_image)
+            elif scaled_w <= w and scaled_h <= h:
+                painter.drawImage(self.pixmap_offset, self._get_scaled_image(scaled_w, scaled_h))
+            else:
+                painter.setRenderHint(QPainter.SmoothPixmapTransform)
+                painter.drawImage(target, self._source_image)
+            self._paint_annotation(painter, smooth=True)
+        if self._stroke_layer is not None:
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            painter.drawImage(0, 0, self._stroke_layer)
+
+    def _paint_frame_region(self, painter, visible):
+        """
+        Menggambar bagian frame yang jatuh di dalam visible (koordinat widget).
+        Region dipetakan ke koordinat sumber dan hanya potongan itu yang
+        diskalakan, sehingga biaya pan/zoom sebanding dengan ukuran widget,
+        bukan dengan ukuran frame setelah zoom. Batas piksel mengikuti
+        _map_widget_to_frame_coords (piksel sumber k mulai di ceil(k * skala)).
+        """
+        h, w, ch = self.frame_dims
+        scale_x = self.pixmap_size.width() / w
+        scale_y = self.pixmap_size.height() / h
+        origin_x, origin_y = self.pixmap_offset.x(), self.pixmap_offset.y()
+        x0 = max(0, int((visible.left() - origin_x) / scale_x))
+        y0 = max(0, int((visible.top() - origin_y) / scale_y))
+        x1 = min(w, int(math.ceil((visible.right() + 1 - origin_x) / scale_x)))
+        y1 = min(h, int(math.ceil((visible.bottom() + 1 - origin_y) / scale_y)))
+        if x1 <= x0 or y1 <= y0:
+            return
+        dest_x0 = origin_x + int(math.ceil(x0 * scale_x))
+        dest_y0 = origin_y + int(math.ceil(y0 * scale_y))
+        dest_w = origin_x + int(math.ceil(x1 * scale_x)) - dest_x0
+        dest_h = origin_y + int(math.ceil(y1 * scale_y)) - dest_y0
+        if dest_w <= 0 or dest_h <= 0:
+            return
+
+        nearest = min(scale_x, scale_y) >= NEAREST_NEIGHBOR_SCALE
+        shape = (dest_h, dest_w, ch)
+        if self._roi_buffer is None or self._roi_buffer.shape != shape:
+            self._roi_buffer = np.empty(shape, dtype=np.uint8)
+        crop = self.displayed_frame_source[y0:y1, x0:x1]
+        if nearest:
+            cv2.resize(crop, (dest_w, dest_h), dst=self._roi_buffer, interpolation=cv2.INTER_NEAREST)
+        elif scale_x < 1.0 or scale_y < 1.0:
+            resize_for_display(crop, (dest_w, dest_h), self._roi_buffer)
+        else:
+            cv2.resize(crop, (dest_w, dest_h), dst=self._roi_buffer, interpolation=cv2.INTER_LINEAR)
+        region_image = QImage(self._roi_buffer.data, dest_w, dest_h,
+                              self._roi_buffer.strides[0], QImage.Format_BGR888)
+        painter.drawImage(QPoint(dest_x0, dest_y0), region_image)
+        self._paint_annotation(painter, smooth=not nearest)
+
+    def _paint_annotation(self, painter, smooth):
+        """Menggambar overlay anotasi frame aktif (hanya area coretannya) di atas frame."""
+        annotation = self.annotations.get(self.current_frame_index)
+        if annotation is None or not annotation.width or not annotation.height:
+            return
+        overlay = annotation.overlay()
+        if overlay is None:
+            return
+        scale_x = self.pixmap_size.width() / annotation.width
+        scale_y = self.pixmap_size.height() / annotation.height
+        rect = overlay.rect
+        target = QRectF(self.pixmap_offset.x() + rect.x() * scale_x,
+                        self.pixmap_offset.y() + rect.y() * scale_y,
+                        rect.width() * scale_x, rect.height() * scale_y)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, smooth)
+        painter.drawImage(target, overlay.image)
+
     def reset_zoom_pan(self):
         self.zoom_factor = 1.0
         self.pan_offset = QPoint(0, 0)
-        if self.displayed_frame_source is not None:
-            self.display_frame(self.displayed_frame_source)
+        self.refresh_view()
 
     def zoom_at_center(self, factor):
         if not self.has_media() or self.frame_dims is None:
@@ -559,13 +1190,11 @@ class MediaPlayer(QWidget):
             final_pan_x = max(min_pan_x, min(int(new_pan_x), max_pan_x))
             final_pan_y = max(min_pan_y, min(int(new_pan_y), max_pan_y))
             self.pan_offset = QPoint(final_pan_x, final_pan_y)
-        if self.displayed_frame_source is not None:
-            self.display_frame(self.displayed_frame_source)    
+        self.refresh_view()
         
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        if self.displayed_frame_source is not None:
-            self.display_frame(self.displayed_frame_source)
+        self.refresh_view()
             
     def toggle_play(self):
         if not self.is_video or not self.video_capture: return
@@ -576,45 +1205,71 @@ class MediaPlayer(QWidget):
 
         if self.is_playing:
             # --- Berhenti ---
-            self.video_timer.stop()
-            self.is_playing = False
-            self.playback_start_time = None
-            if self.audio_player:
-                self.audio_player.pause()
+            self.pause()
         else:
             # --- Mulai ---
-            if self.fps > 0:
-                interval = int(1000 / self.fps)
-            else:
-                interval = 41
-            self.video_timer.start(interval)
-            self.is_playing = True
-            if self.fps > 0:
-                self.playback_start_time = time.monotonic() - (self.current_frame_index / self.fps if self.current_frame_index >= 0 else 0)
-            else:
-                self.playback_start_time = time.monotonic()
-                
-            if self.audio_player:
-                # Sinkronkan dulu, baru play
-                self._sync_audio_to_current_frame(force=True)
-                # self.audio_player.play() <-- dipanggil di dalam sync
+            self.play_direction = 1
+            self._start_playback()
+            self.playStateChanged.emit(self.is_playing)
 
+    def play_reverse(self):
+        """
+        Memutar mundur (shuttle J). Jika sedang maju, arah langsung dibalik
+        tanpa berhenti. Audio dijeda selama reverse.
+        """
+        if not self.is_video or not self.video_capture: return
+        if self.is_playing and self.play_direction < 0: return
+        self.play_direction = -1
+        self.has_finished = False
+        if self.is_playing:
+            self._reset_playback_clock()
+            self._sync_audio_to_current_frame(force=True)
+            return
+        self._start_playback()
         self.playStateChanged.emit(self.is_playing)
+
+    def pause(self):
+        """Menjeda playback (shuttle K) di frame saat ini."""
+        if not self.is_playing:
+            return
+        self.video_timer.stop()
+        self.is_playing = False
+        self.playback_start_time = None
+        self.play_direction = 1
+        if self.audio_player:
+            self.audio_player.pause()
+        self.playStateChanged.emit(False)
+
+    def _start_playback(self):
+        if self.fps > 0:
+            interval = int(1000 / self.fps)
+        else:
+            interval = 41
+        self.is_playing = True
+        self.video_timer.start(interval)
+        # Decoder mulai mengisi buffer dari frame berikutnya (sesuai arah)
+        self._reset_playback_clock()
+
+        if self.audio_player:
+            # Sinkronkan dulu, baru play
+            self._sync_audio_to_current_frame(force=True)
+            # self.audio_player.play() <-- dipanggil di dalam sync
         
     def stop(self):
         if self.video_timer.isActive(): self.video_timer.stop()
         self.is_playing = False
+        self.play_direction = 1
         self.playback_start_time = None
         
         if self.audio_player:
             self.audio_player.stop()
             
         if self.is_video and self.video_capture:
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret, frame = self.video_capture.read()
+            ret, frame = self._read_frame(0)
             if ret:
                 self.current_frame = frame
-                self.current_frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                self.current_frame_index = 0
+                self._pin_playhead()
                 self.display_frame(frame)
                 self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
                 self._sync_audio_to_current_frame(force=True) # Sync ke frame 0
@@ -626,13 +1281,13 @@ class MediaPlayer(QWidget):
         if not self.is_video or not self.video_capture: return
         new_index = self.current_frame_index - 1
         if new_index >= 0:
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, new_index)
-            ret, frame = self.video_capture.read()
+            ret, frame = self._read_frame(new_index)
             if ret:
                 # Perbarui state internal
                 self.current_frame = frame
-                self.current_frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                self.current_frame_index = new_index
                 self.has_finished = False
+                self._pin_playhead()
                 
                 if not _update_media_internals_only:
                     self.display_frame(frame)
@@ -648,12 +1303,14 @@ class MediaPlayer(QWidget):
     def next_frame(self, _update_media_internals_only=False):
         if not self.is_video or not self.video_capture: return
         if self.current_frame_index < self.total_frames - 1:
-            ret, frame = self.video_capture.read()
+            new_index = self.current_frame_index + 1
+            ret, frame = self._read_frame(new_index)
             if ret:
                 # Perbarui state internal
                 self.current_frame = frame
-                self.current_frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                self.current_frame_index = new_index
                 self.has_finished = False
+                self._pin_playhead()
                 
                 if not _update_media_internals_only:
                     self.display_frame(frame)
@@ -670,11 +1327,11 @@ class MediaPlayer(QWidget):
         if not self.is_video or not self.video_capture: return
         frame_index = int(position)
         if 0 <= frame_index < self.total_frames:
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-            ret, frame = self.video_capture.read()
+            ret, frame = self._read_frame(frame_index)
             if ret:
                 self.current_frame = frame
-                self.current_frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                self.current_frame_index = frame_index
+                self._pin_playhead()
                 self.display_frame(frame)
                 self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
                 if _sync_audio:
@@ -699,27 +1356,35 @@ class MediaPlayer(QWidget):
                     self.playbackFinished.emit(True) # Kirim sinyal (Benar)
                 return
 
-        if self.loop_out_point is not None and self.current_frame_index >= self.loop_out_point:
-            loop_start_frame = self.loop_in_point if self.loop_in_point is not None else 0
-            self.seek_to_position(loop_start_frame)
-            return
-
         if self.total_frames <= 0:
             self.stop()
             return
 
-        target_index = self.current_frame_index + 1
-        if self.fps > 0:
-            now = time.monotonic()
-            if self.playback_start_time is None:
-                self.playback_start_time = now - (self.current_frame_index / self.fps if self.current_frame_index >= 0 else 0)
-            elapsed = now - self.playback_start_time
-            expected_index = int(elapsed * self.fps)
-            if expected_index <= self.current_frame_index:
-                expected_index = self.current_frame_index + 1
-            target_index = min(expected_index, self.total_frames - 1)
-
-        if target_index >= self.total_frames:
+        if self._decode_worker is None or self.playback_start_time is None:
+            self._reset_playback_clock()
+
+        # Nomor urut frame yang seharusnya tampil menurut jam playback.
+        # Frame urutan ke-0 (= current_frame_index + 1) jatuh tempo satu interval setelah jangkar.
+        elapsed = time.monotonic() - self.playback_start_time
+        fps = self.fps if self.fps > 0 else 24
+        due_seq = self._playback_base_seq + int(elapsed * fps) - 1
+
+        item = self._decode_worker.take_up_to(due_seq)
+        if item is None:
+            # Decoder belum menyusul; tampilkan frame saat ini saja dan tunggu tick berikutnya.
+            # Selama frame pertama setelah start/seek belum siap, geser jam agar tidak ada frame terbuang.
+            if self._playback_priming and due_seq >= self._playback_base_seq:
+                self.playback_start_time = time.monotonic() - 0.5 / fps
+            return
+
+        if item is END_OF_STREAM and self.play_direction < 0:
+            # Reverse sampai frame pertama: berhenti di sana (mode segmen
+            # menyeberang ke klip sebelumnya lewat reverseFinished)
+            self.pause()
+            self.reverseFinished.emit()
+            return
+
+        if item is END_OF_STREAM:
             # --- PERBAIKAN: Gunakan 'has_finished' sebagai 'lock' ---
             if not self.has_finished:
                 self.video_timer.stop()
@@ -733,33 +1398,23 @@ class MediaPlayer(QWidget):
                 self.playbackFinished.emit(False) # Kirim sinyal (karena video selesai)
             # --- AKHIR PERBAIKAN ---
             return
-            
-        if target_index > self.current_frame_index + 1:
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, target_index)
-            
-        ret, frame = self.video_capture.read()
-        if ret:
-            self.current_frame = frame
-            self.current_frame_index = int(self.video_capture.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-            self.display_frame(frame)
-            self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
-            # (Sync force=False sengaja dihapus untuk cegah 'kretek-kretek')
-            self._reset_playback_clock()
-        else:
-            # --- PERBAIKAN: Gunakan 'has_finished' sebagai 'lock' ---
-            if not self.has_finished:
-                self.video_timer.stop()
-                self.is_playing = False
-                self.has_finished = True # Set 'lock'
-                self.playback_start_time = None
-                if self.audio_player:
-                    self.audio_player.pause()
-                self.playStateChanged.emit(False)
-                # TAMBAHKAN SINYAL INI KEMBALI
-                self.playbackFinished.emit(False) # Kirim sinyal (karena OpenCV gagal read)
-            # --- AKHIR PERBAIKAN ---
+
+        frame_index, frame = item
+        self._playback_priming = False
+        wrapped = (frame_index - self.current_frame_index) * self.play_direction < 0
+        self.current_frame = frame
+        self.current_frame_index = frame_index
+        self._pin_playhead()
+        self.display_frame(frame)
+        self.frameIndexChanged.emit(self.current_frame_index, self.total_frames)
+        if wrapped:
+            # Decoder sudah melompat ke titik awal loop; ikutkan audio
+            self._sync_audio_to_current_frame(force=True)
+        # (Sync force=False sengaja dihapus untuk cegah 'kretek-kretek')
             
     def closeEvent(self, event):
+        self.discard_prepared_media()
+        self._shutdown_decode_worker()
         if self.video_capture: self.video_capture.release()
         if self.audio_player:
             self.audio_player.stop()
@@ -771,22 +1426,91 @@ class MediaPlayer(QWidget):
     def has_media(self): return self.current_media_path is not None
     def get_current_file_path(self): return self.current_media_path
 
+    def is_showing_proxy(self):
+        return self.playback_path is not None and self.playback_path != self.current_media_path
+
+    def playback_path_for(self, file_path):
+        """File yang akan didecode untuk file_path (proxy/sumber), juga kunci cache frame-nya."""
+        if file_path == self.current_media_path and self.playback_path:
+            return self.playback_path
+        return self._resolve_playback_path(file_path)
+
+    def _resolve_playback_path(self, file_path):
+        if self.prefer_proxy and self.proxy_resolver is not None:
+            proxy_path = self.proxy_resolver(file_path)
+            if proxy_path:
+                return proxy_path
+        return file_path
+
+    def set_prefer_proxy(self, enabled):
+        """Pilih proxy atau original; media yang sedang dibuka berpindah di frame yang sama."""
+        self.prefer_proxy = bool(enabled)
+        self.refresh_playback_source()
+
+    def refresh_playback_source(self):
+        """
+        Buka ulang sumber playback bila pilihan proxy/original berubah (mis. proxy
+        baru selesai dibuat), tanpa memindah frame, audio, atau status play.
+        """
+        if not self.is_video or not self.current_media_path:
+            return False
+        playback_path = self._resolve_playback_path(self.current_media_path)
+        if playback_path == self.playback_path:
+            return False
+        cap = open_playback_capture(playback_path)
+        if cap is None:
+            return False
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        if total != self.total_frames:
+            # Proxy yang tidak sama panjang tidak bisa dipakai frame-per-frame
+            print(f"Proxy frame count mismatch ({total} != {self.total_frames}): {playback_path}")
+            cap.release()
+            return False
+        self._swap_playback_capture(playback_path, cap)
+        self._request_keyframe_index()
+        return True
+
+    def _swap_playback_capture(self, playback_path, cap):
+        """Ganti capture (dan worker decoder) ke cap tanpa memindah frame atau status play."""
+        was_playing = self.is_playing
+        if was_playing:
+            self.video_timer.stop()
+        self._shutdown_decode_worker()
+        self.video_capture.release()
+        self.video_capture = cap
+        self.playback_path = playback_path
+        self._capture_next_index = 0
+        self.frame_cache.clearPinnedRange(self._pin_name)
+
+        frame_index = max(0, self.current_frame_index)
+        ret, frame = self._read_frame(frame_index)
+        if ret:
+            self.current_frame = frame
+            self._pin_playhead()
+            self.display_frame(frame)
+        if was_playing:
+            self._start_playback()
+
     def clear_media(self):
         self.stop()
+        self.discard_prepared_media()
+        self._shutdown_decode_worker()
         if self.video_capture:
             self.video_capture.release()
             self.video_capture = None
+        self._capture_next_index = -1
+        self.frame_cache.clearPinnedRange(self._pin_name)
         
         self._prepare_audio(None) 
             
         self.current_media_path = None
+        self.playback_path = None
         self.current_frame = None
-        self.displayed_frame_source = None
+        self.display_frame(None)
         self.total_frames = 0
         self.current_frame_index = -1
         self.is_video = False
         self.video_label.setText("Load media file to start...")
-        self.video_label.setPixmap(QPixmap())
         self.frameIndexChanged.emit(-1, 0)
         self.fpsChanged.emit(0.0)
         self.has_finished = False
@@ -795,6 +1519,8 @@ class MediaPlayer(QWidget):
         self.playback_start_time = None
         self.compare_split_ratio = None
         self.annotations.clear()
+        self._stroke_annotation = None
+        self._stroke_layer = None
         self.pixmap_offset = QPoint(0, 0)
         self.pixmap_size = None
         self.frame_dims = None
@@ -835,11 +1561,9 @@ class MediaPlayer(QWidget):
             if split_ratio <= 0.0 or split_ratio >= 1.0:
                 split_ratio = 0.5
             split_x = self.width() * split_ratio
-            pixmap = self.video_label.pixmap()
-            if pixmap:
-                pm_width = pixmap.width()
-                label_width = self.video_label.width()
-                offset_x = (label_width - pm_width) / 2
+            if self.pixmap_size is not None and self.pixmap_size.width() > 0:
+                pm_width = self.pixmap_size.width()
+                offset_x = self.pixmap_offset.x()
                 relative_x = pos.x() - offset_x
                 if 0 <= relative_x <= pm_width:
                     split_x = offset_x + pm_width * split_ratio
@@ -849,29 +1573,88 @@ class MediaPlayer(QWidget):
             self.fileDropped.emit(file_path, target_view)
             event.acceptProposedAction()
     
-    def get_current_annotation_image(self):
+    def get_current_annotation(self):
+        """
+        Anotasi (coretan vektor) frame aktif; dibuat bila belum ada. Ukurannya
+        mengikuti frame yang sedang ditampilkan.
+        """
         if self.current_frame_index < 0 or not self.frame_dims:
             return None
-        image = self.annotations.get(self.current_frame_index)
-        if image is None:
+        annotation = self.annotations.get(self.current_frame_index)
+        if annotation is None:
             h, w, ch = self.frame_dims
-            image = QImage(w, h, QImage.Format_ARGB32)
-            image.fill(Qt.transparent)
-            self.annotations[self.current_frame_index] = image
-        return image
+            annotation = FrameAnnotation(w, h)
+            self.annotations[self.current_frame_index] = annotation
+        return annotation
+
+    def begin_stroke(self, point_frame):
+        annotation = self.get_current_annotation()
+        if annotation is None:
+            return
+        point = (point_frame.x(), point_frame.y())
+        changed_rect = annotation.begin_stroke(self.draw_pen_color, self.draw_pen_width, point)
+        self._stroke_annotation = annotation
+        self._stroke_layer = None
+        if not annotation.active_stroke.erase:
+            # Penghapus langsung mengubah overlay anotasi; pena digambar di layer sendiri
+            self._stroke_layer = QImage(self.video_label.size(), QImage.Format_ARGB32_Premultiplied)
+            self._stroke_layer.fill(Qt.transparent)
+            self._paint_stroke_points([point])
+        self._update_frame_rect(changed_rect)
 
     def draw_on_annotation(self, from_point_frame, to_point_frame):
-        image = self.get_current_annotation_image()
-        if image:
-            painter = QPainter(image)
-            pen = QPen(self.draw_pen_color, self.draw_pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-            painter.setPen(pen)
-            if self.draw_pen_color.alpha() == 0:
-                painter.setCompositionMode(QPainter.CompositionMode_Clear)
-            painter.drawLine(from_point_frame, to_point_frame)
-            painter.end()
-            self.display_frame(self.displayed_frame_source)
+        annotation = self._stroke_annotation
+        if annotation is None:
+            return
+        changed_rect = annotation.extend_stroke((to_point_frame.x(), to_point_frame.y()))
+        if changed_rect is None:
+            return
+        if self._stroke_layer is not None:
+            self._paint_stroke_points(annotation.active_stroke.points[-2:])
+        self._update_frame_rect(changed_rect)
+
+    def _stroke_to_widget_scale(self):
+        annotation = self._stroke_annotation
+        return (self.pixmap_size.width() / annotation.width,
+                self.pixmap_size.height() / annotation.height)
+
+    def _paint_stroke_points(self, points):
+        """Menggambar segmen coretan aktif ke layer coretan (koordinat widget)."""
+        if self.pixmap_size is None or self.pixmap_size.isEmpty():
+            return
+        scale_x, scale_y = self._stroke_to_widget_scale()
+        painter = QPainter(self._stroke_layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(self.pixmap_offset.x(), self.pixmap_offset.y())
+        painter.scale(scale_x, scale_y)
+        self._stroke_annotation.active_stroke.paint_points(painter, points)
+        painter.end()
+
+    def _rebuild_stroke_layer(self):
+        # Geometri berubah di tengah coretan (zoom/resize): gambar ulang seluruh coretan aktif
+        annotation = self._stroke_annotation
+        if self._stroke_layer is None or annotation.active_stroke is None:
+            return
+        self._stroke_layer = QImage(self.video_label.size(), QImage.Format_ARGB32_Premultiplied)
+        self._stroke_layer.fill(Qt.transparent)
+        self._paint_stroke_points(annotation.active_stroke.points)
+
+    def _update_frame_rect(self, frame_rect):
+        """Repaint hanya area frame_rect (koordinat frame anotasi) di label."""
+        if frame_rect is None or self.pixmap_size is None or self.pixmap_size.isEmpty():
+            return
+        scale_x, scale_y = self._stroke_to_widget_scale()
+        widget_rect = QRectF(self.pixmap_offset.x() + frame_rect.x() * scale_x,
+                             self.pixmap_offset.y() + frame_rect.y() * scale_y,
+                             frame_rect.width() * scale_x, frame_rect.height() * scale_y)
+        self.video_label.update(widget_rect.toAlignedRect().adjusted(-1, -1, 1, 1))
 
     def finalize_drawing(self):
+        if self._stroke_annotation is not None:
+            # Komposit sekali: coretan masuk ke anotasi, overlay dirender ulang
+            self._stroke_annotation.end_stroke()
+            self._stroke_annotation = None
+            self._stroke_layer = None
+            self.video_label.update()
         if self.current_frame_index >= 0:
             self.annotationAdded.emit(self.current_frame_index)
\ No newline at end of file
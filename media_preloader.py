@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Background preparation of the next clip for gapless playback.
+
+Switching media with load_media() opens a new capture, decodes its first
+frame and parses the file in VLC on the GUI thread, after the previous clip
+has already ended, so every cut of a timeline folder hitches. MediaPreloader
+does that work in its own thread while the current clip is still playing:
+it opens the capture the player will keep, reads the first frame and the
+stream properties, and parses the audio media. The player starts a decode
+worker for the following frames at the same time, so when the cut comes it
+only has to swap objects (see MediaPlayer.switch_to_prepared_media).
+
+KeyframeIndexLoader builds the keyframe index of a video the same way,
+off the GUI thread: the first open of a file plays through cv2 until the
+index is ready, then the player switches to an IndexedVideoCapture.
+"""
+
+from typing import Callable, Optional
+
+import cv2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from keyframe_index import load_keyframe_index
+
+
+class PreparedMedia:
+    """A clip opened ahead of time: capture, first frame, properties and audio media."""
+
+    def __init__(self, file_path: str, playback_path: str, capture, first_frame,
+                 total_frames: int, fps: float, audio_media=None) -> None:
+        self.file_path = file_path
+        self.playback_path = playback_path
+        self.capture = capture
+        self.first_frame = first_frame
+        self.total_frames = total_frames
+        self.fps = fps
+        self.audio_media = audio_media
+
+    def release(self) -> None:
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        if self.audio_media is not None:
+            self.audio_media.release()
+            self.audio_media = None
+
+
+class MediaPreloader(QThread):
+    """
+    Opens one clip off the GUI thread. prepared is emitted (queued to the
+    receiver's thread) with a PreparedMedia, or None if the clip cannot be
+    opened as video; the receiver owns the result and must release() it
+    if it is not used.
+    """
+
+    prepared = pyqtSignal(object)
+
+    def __init__(self, file_path: str, playback_path: str, capture_factory: Callable,
+                 frame_cache=None, audio_factory: Optional[Callable] = None, parent=None) -> None:
+        super().__init__(parent)
+        self.file_path = file_path
+        self.playback_path = playback_path
+        self.capture_factory = capture_factory
+        self.frame_cache = frame_cache
+        self.audio_factory = audio_factory
+
+    def run(self) -> None:
+        capture = self.capture_factory(self.playback_path)
+        if capture is None:
+            self.prepared.emit(None)
+            return
+        ret, frame = capture.read()
+        if not ret:
+            capture.release()
+            self.prepared.emit(None)
+            return
+        if self.frame_cache is not None:
+            self.frame_cache.addFrame((self.playback_path, 0), frame)
+        total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        fps = capture.get(cv2.CAP_PROP_FPS) or 24
+        audio_media = self.audio_factory(self.file_path) if self.audio_factory is not None else None
+        self.prepared.emit(PreparedMedia(self.file_path, self.playback_path, capture, frame,
+                                         total_frames, fps, audio_media))
+
+
+class KeyframeIndexLoader(QThread):
+    """
+    Builds (and persists) the keyframe index of one video. indexed is
+    emitted with the path and whether an index is now available.
+    """
+
+    indexed = pyqtSignal(str, bool)
+
+    def __init__(self, file_path: str, parent=None) -> None:
+        super().__init__(parent)
+        self.file_path = file_path
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self) -> None:
+        index = load_keyframe_index(self.file_path, is_cancelled=self.is_cancelled)
+        if not self._cancelled:
+            self.indexed.emit(self.file_path, index is not None)
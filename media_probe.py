@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Asynchronous media probing.
+
+Totalling the duration of a folder, or building the segment map of a
+timeline folder, needs the metadata of every clip in it. Probing opens a
+capture per clip, so doing it on the GUI thread freezes the window for
+seconds on large folders. MediaProbePool runs the probes in a bounded
+thread pool and delivers results on the GUI thread one by one, in
+submission order as far as the workers allow, so callers can fill in
+totals progressively.
+
+Requests are grouped in named channels ('tree', 'segments', ...). A new
+request on a channel supersedes the previous one: queued probes of the old
+request are cancelled and results still in flight are dropped. extend()
+adds paths to the running request instead.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from media_info_store import probe_media_info
+
+# Probing is mostly I/O (container headers, directory listings), so a
+# couple of workers pay off even on small machines.
+DEFAULT_PROBE_WORKERS = max(2, min(4, os.cpu_count() or 1))
+
+
+def load_media_info(file_path: str, info_store=None) -> Optional[dict]:
+    """
+    Return the metadata of file_path from info_store, probing (and storing)
+    it when the store has no valid row. Returns None if it cannot be opened.
+    """
+    info = info_store.get(file_path) if info_store is not None else None
+    if info is None:
+        info = probe_media_info(file_path)
+        if info and info['frame_count'] > 0 and info_store is not None:
+            info_store.put(file_path, info)
+    return info
+
+
+class MediaProbePool(QObject):
+    """
+    Thread pool that probes media metadata off the GUI thread.
+
+    infoReady is emitted for every probed path of the current request of a
+    channel, requestFinished once all of them have been delivered.
+    """
+
+    infoReady = pyqtSignal(str, int, str, object)   # channel, request id, path, info dict or None
+    requestFinished = pyqtSignal(str, int)          # channel, request id
+
+    # Worker -> GUI thread (queued connection)
+    _probed = pyqtSignal(str, int, str, object)
+
+    def __init__(self, info_store=None, max_workers: Optional[int] = None, parent=None) -> None:
+        super().__init__(parent)
+        self.info_store = info_store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or DEFAULT_PROBE_WORKERS,
+                                            thread_name_prefix='media-probe')
+        self._next_request_id = 0
+        self._current: Dict[str, int] = {}     # channel -> current request id
+        self._remaining: Dict[str, int] = {}   # channel -> results still to deliver
+        self._futures: Dict[str, List] = {}
+        self._probed.connect(self._deliver)
+
+    def probe(self, channel: str, paths: Iterable[str]) -> int:
+        """
+        Queue paths for probing on channel, superseding its previous request.
+        Returns the request id carried by the results.
+        """
+        self.cancel(channel)
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        unique_paths = list(dict.fromkeys(p for p in paths if p))
+        self._current[channel] = request_id
+        self._remaining[channel] = len(unique_paths)
+        self._futures[channel] = [self._executor.submit(self._run, channel, request_id, path)
+                                  for path in unique_paths]
+        if not unique_paths:
+            self._finish(channel, request_id)
+        return request_id
+
+    def extend(self, channel: str, paths: Iterable[str]) -> int:
+        """
+        Add paths to the current request of channel without superseding it
+        (starts a new request if the channel is idle). Returns the request id.
+        """
+        request_id = self._current.get(channel)
+        if request_id is None:
+            return self.probe(channel, paths)
+        unique_paths = list(dict.fromkeys(p for p in paths if p))
+        self._remaining[channel] += len(unique_paths)
+        self._futures[channel].extend(self._executor.submit(self._run, channel, request_id, path)
+                                      for path in unique_paths)
+        return request_id
+
+    def cancel(self, channel: str) -> None:
+        """Drop the current request of channel; nothing more is delivered for it."""
+        self._current.pop(channel, None)
+        self._remaining.pop(channel, None)
+        for future in self._futures.pop(channel, []):
+            future.cancel()
+
+    def is_current(self, channel: str, request_id: int) -> bool:
+        return self._current.get(channel) == request_id
+
+    def pending_count(self, channel: str) -> int:
+        return self._remaining.get(channel, 0)
+
+    def shutdown(self) -> None:
+        for channel in list(self._current):
+            self.cancel(channel)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, channel: str, request_id: int, path: str) -> None:
+        if self._current.get(channel) != request_id:
+            return
+        try:
+            info = load_media_info(path, self.info_store)
+        except Exception as e:
+            print(f"Could not probe {path}: {e}")
+            info = None
+        self._probed.emit(channel, request_id, path, info)
+
+    def _deliver(self, channel: str, request_id: int, path: str, info) -> None:
+        if not self.is_current(channel, request_id):
+            return
+        self._remaining[channel] -= 1
+        self.infoReady.emit(channel, request_id, path, info)
+        # The slot may have started a new request or cancelled this one
+        if self.is_current(channel, request_id) and self._remaining[channel] <= 0:
+            self._finish(channel, request_id)
+
+    def _finish(self, channel: str, request_id: int) -> None:
+        self._current.pop(channel, None)
+        self._remaining.pop(channel, None)
+        self._futures.pop(channel, None)
+        self.requestFinished.emit(channel, request_id)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Background proxy generation for heavy media.
+
+Sources that cannot play in real time (ProRes 4444, 4K H.265, EXR
+sequences) are transcoded in a process pool to reduced-resolution,
+intra-only MJPEG proxies stored in the application cache directory. Every
+proxy frame is a keyframe, so seeking and reverse play never decode more
+than one frame. Proxies are keyed by source path + size + mtime, so an
+edited source simply stops matching its old proxy.
+
+ProxyManager lives in the GUI thread. It reports per-source progress and
+completion through Qt signals, polling the shared progress dict on a
+timer, and every job can be cancelled.
+"""
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from typing import Optional
+
+import cv2
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+try:
+    import av
+except ImportError:  # Without PyAV proxies cannot be written
+    av = None
+
+from sequence_capture import create_media_capture
+from src.utils.helpers import getCacheDir, ensureDirectoryExists
+
+PROXY_DIR_NAME = 'proxies'
+PROXY_EXTENSION = '.mov'
+# Proxy frames are scaled down to at most this height (never up)
+DEFAULT_PROXY_HEIGHT = 720
+# MJPEG bit budget; generous enough that proxies look clean on review monitors
+PROXY_BITS_PER_PIXEL = 1.5
+PROGRESS_POLL_MS = 250
+# Progress/cancel are exchanged with the worker every this many frames
+PROGRESS_STEP_FRAMES = 8
+
+
+def _source_signature(source_path: str) -> Optional[str]:
+    if '%' in source_path:
+        # Image sequence: the directory mtime changes when frames are added or removed
+        stat_path = os.path.dirname(source_path) or '.'
+    else:
+        stat_path = source_path
+    try:
+        stat = os.stat(stat_path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def proxy_path_for(source_path: str) -> Optional[str]:
+    """Return where the proxy of source_path lives (whether or not it exists yet)."""
+    signature = _source_signature(source_path)
+    if signature is None:
+        return None
+    return os.path.join(getCacheDir(), PROXY_DIR_NAME, signature + PROXY_EXTENSION)
+
+
+def find_proxy(source_path: Optional[str]) -> Optional[str]:
+    """Return the path of a finished proxy for source_path, or None."""
+    if not source_path:
+        return None
+    proxy_path = proxy_path_for(source_path)
+    if proxy_path and os.path.isfile(proxy_path):
+        return proxy_path
+    return None
+
+
+def transcode_proxy(source_path: str, output_path: str, max_height: int,
+                    progress, cancel_event, job_key: str) -> Optional[str]:
+    """
+    Transcode source_path to an MJPEG proxy at output_path. Runs in a worker
+    process; progress is a managed dict updated under job_key and
+    cancel_event a managed Event. Returns output_path, or None if cancelled.
+    """
+    if av is None:
+        raise RuntimeError("PyAV is not installed")
+    capture = create_media_capture(source_path)
+    if capture is None:
+        raise RuntimeError(f"Cannot open {source_path}")
+
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+    fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+    ensureDirectoryExists(os.path.dirname(output_path))
+    part_path = output_path + '.part'
+    container = None
+    done = 0
+    try:
+        container = av.open(part_path, 'w', format='mov')
+        stream = None
+        size = None
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            if stream is None:
+                h, w = frame.shape[:2]
+                scale = min(1.0, max_height / float(h)) if h > 0 else 1.0
+                # yuvj420p needs even dimensions
+                size = (max(2, int(w * scale) // 2 * 2), max(2, int(h * scale) // 2 * 2))
+                stream = container.add_stream('mjpeg', rate=Fraction(fps).limit_denominator(1001))
+                stream.width, stream.height = size
+                stream.pix_fmt = 'yuvj420p'
+                stream.bit_rate = int(size[0] * size[1] * fps * PROXY_BITS_PER_PIXEL)
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            video_frame = av.VideoFrame.from_ndarray(frame, format='bgr24')
+            for packet in stream.encode(video_frame):
+                container.mux(packet)
+            done += 1
+            if done % PROGRESS_STEP_FRAMES == 0:
+                if cancel_event.is_set():
+                    return None
+                if total > 0:
+                    progress[job_key] = min(done / total, 0.99)
+
+        if stream is None:
+            raise RuntimeError(f"No frames could be read from {source_path}")
+        for packet in stream.encode():
+            container.mux(packet)
+        container.close()
+        container = None
+        os.replace(part_path, output_path)
+        progress[job_key] = 1.0
+        return output_path
+    finally:
+        capture.release()
+        if container is not None:
+            container.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+class ProxyManager(QObject):
+    """
+    Queue of proxy transcodes running in a process pool.
+
+    The pool and the multiprocessing manager that carries progress and
+    cancel flags are created on the first request.
+    """
+
+    progressChanged = pyqtSignal(str, float)   # source path, 0.0 - 1.0
+    proxyReady = pyqtSignal(str, str)          # source path, proxy path
+    proxyFailed = pyqtSignal(str, str)         # source path, error message
+    proxyCancelled = pyqtSignal(str)           # source path
+
+    def __init__(self, max_workers: Optional[int] = None, max_height: int = DEFAULT_PROXY_HEIGHT,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.max_height = max_height
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._jobs = {}  # source path -> (future, cancel_event)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(PROGRESS_POLL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+
+    @staticmethod
+    def find_proxy(source_path: Optional[str]) -> Optional[str]:
+        return find_proxy(source_path)
+
+    def is_available(self) -> bool:
+        return av is not None
+
+    def is_pending(self, source_path: str) -> bool:
+        return source_path in self._jobs
+
+    def pending_sources(self):
+        return list(self._jobs)
+
+    def request_proxy(self, source_path: str) -> bool:
+        """Queue a proxy for source_path. Returns False if nothing was queued."""
+        if not self.is_available() or not source_path or source_path in self._jobs:
+            return False
+        output_path = proxy_path_for(source_path)
+        if output_path is None or os.path.isfile(output_path):
+            return False
+        self._ensure_pool()
+        cancel_event = self._manager.Event()
+        self._progress[source_path] = 0.0
+        future = self._executor.submit(transcode_proxy, source_path, output_path, self.max_height,
+                                       self._progress, cancel_event, source_path)
+        self._jobs[source_path] = (future, cancel_event)
+        if not self._poll_timer.isActive():
+            self._poll_timer.start()
+        self.progressChanged.emit(source_path, 0.0)
+        return True
+
+    def cancel(self, source_path: str) -> None:
+        job = self._jobs.get(source_path)
+        if job is None:
+            return
+        future, cancel_event = job
+        cancel_event.set()
+        future.cancel()
+
+    def cancel_all(self) -> None:
+        for source_path in list(self._jobs):
+            self.cancel(source_path)
+
+    def shutdown(self) -> None:
+        """Cancel all jobs and stop the worker processes."""
+        self._poll_timer.stop()
+        self.cancel_all()
+        self._jobs.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+            self._progress = None
+
+    def _ensure_pool(self) -> None:
+        if self._executor is not None:
+            return
+        # Spawn: forking a process that runs Qt and decoder threads is unsafe
+        context = multiprocessing.get_context('spawn')
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _poll(self) -> None:
+        for source_path, (future, cancel_event) in list(self._jobs.items()):
+            if not future.done():
+                self.progressChanged.emit(source_path, float(self._progress.get(source_path, 0.0)))
+                continue
+            del self._jobs[source_path]
+            self._progress.pop(source_path, None)
+            if future.cancelled():
+                self.proxyCancelled.emit(source_path)
+                continue
+            error = future.exception()
+            if error is not None:
+                self.proxyFailed.emit(source_path, str(error))
+            elif future.result() is None:
+                self.proxyCancelled.emit(source_path)
+            else:
+                self.proxyReady.emit(source_path, future.result())
+        if not self._jobs:
+            self._poll_timer.stop()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Segment map of a timeline folder.
+
+In segment mode the clips of a timeline folder play as one virtual clip.
+Mapping a global frame to its clip (and back) happens on every frame
+update, mark toggle and seek, and used to scan a list of dicts linearly.
+SegmentMap keeps the start frames in a parallel sorted list, so the clip
+under a global frame is found with bisect, and a dict from path to
+segment index, so a clip's offset is a single lookup. Per-frame cost is
+therefore the same for a 2,000-shot timeline as for a 10-shot one.
+
+Segments are still exposed as dicts ('item', 'path', 'name', 'start_frame',
+'duration') for callers that iterate over the map. reorder() applies a new
+clip order in place, recomputing offsets only from the first moved
+segment on, without probing any clip again.
+"""
+
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class SegmentMap:
+    """Clips of a timeline folder laid out back to back on one global frame axis."""
+
+    def __init__(self) -> None:
+        self._segments: List[dict] = []
+        self._starts: List[int] = []
+        # path -> index of its first segment (a clip may appear more than once)
+        self._index_by_path: Dict[str, int] = {}
+        self._path_counts: Dict[str, int] = {}
+        self.total_frames = 0
+
+    # --- List-like access ---
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def __bool__(self) -> bool:
+        return bool(self._segments)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._segments)
+
+    def __reversed__(self) -> Iterator[dict]:
+        return reversed(self._segments)
+
+    def __getitem__(self, index: int) -> dict:
+        return self._segments[index]
+
+    # --- Building ---
+
+    def clear(self) -> None:
+        self._segments.clear()
+        self._starts.clear()
+        self._index_by_path.clear()
+        self._path_counts.clear()
+        self.total_frames = 0
+
+    def append(self, item, path: str, duration: int) -> dict:
+        """Add a clip of duration frames after the last segment."""
+        segment = {'item': item, 'path': path, 'name': os.path.basename(path),
+                   'start_frame': self.total_frames, 'duration': duration}
+        self._index_by_path.setdefault(path, len(self._segments))
+        self._path_counts[path] = self._path_counts.get(path, 0) + 1
+        self._segments.append(segment)
+        self._starts.append(self.total_frames)
+        self.total_frames += duration
+        return segment
+
+    def reorder(self, entries: Iterable[Tuple[object, str]]) -> bool:
+        """
+        Apply a new order given as (item, path) pairs. Durations are kept,
+        and offsets are recomputed from the first segment whose path moved.
+        Returns False (map unchanged) if entries are not a permutation of
+        the current clips.
+        """
+        entries = list(entries)
+        if len(entries) != len(self._segments):
+            return False
+        by_path: Dict[str, List[dict]] = {}
+        for segment in self._segments:
+            by_path.setdefault(segment['path'], []).append(segment)
+        reordered = []
+        for item, path in entries:
+            candidates = by_path.get(path)
+            if not candidates:
+                return False
+            segment = candidates.pop(0)
+            segment['item'] = item
+            reordered.append(segment)
+
+        first_moved = next((i for i, (old, new) in enumerate(zip(self._segments, reordered))
+                            if old is not new), len(reordered))
+        if first_moved == len(reordered):
+            return True
+        for segment in self._segments[first_moved:]:
+            if self._index_by_path.get(segment['path'], -1) >= first_moved:
+                del self._index_by_path[segment['path']]
+        self._segments = reordered
+        start = self._starts[first_moved]
+        del self._starts[first_moved:]
+        for index in range(first_moved, len(reordered)):
+            segment = reordered[index]
+            segment['start_frame'] = start
+            self._starts.append(start)
+            self._index_by_path.setdefault(segment['path'], index)
+            start += segment['duration']
+        return True
+
+    # --- Lookups ---
+
+    def start_frames(self) -> List[int]:
+        """Start frame of every segment (a copy, e.g. for the timeline)."""
+        return list(self._starts)
+
+    def names(self) -> List[str]:
+        """File name of every segment, in timeline order."""
+        return [segment['name'] for segment in self._segments]
+
+    def index_at(self, global_frame: int) -> int:
+        """Index of the segment containing global_frame, or -1 if outside the map."""
+        if global_frame < 0 or global_frame >= self.total_frames:
+            return -1
+        return bisect_right(self._starts, global_frame) - 1
+
+    def segment_at(self, global_frame: int) -> Optional[dict]:
+        index = self.index_at(global_frame)
+        return self._segments[index] if index >= 0 else None
+
+    def index_of(self, path: str) -> int:
+        """Index of the first segment playing path, or -1."""
+        return self._index_by_path.get(path, -1)
+
+    def segment_for_path(self, path: str) -> Optional[dict]:
+        index = self.index_of(path)
+        return self._segments[index] if index >= 0 else None
+
+    def starts_for_path(self, path: str) -> List[int]:
+        """Start frame of every segment playing path (usually one)."""
+        index = self.index_of(path)
+        if index < 0:
+            return []
+        if self._path_counts.get(path, 0) == 1:
+            return [self._starts[index]]
+        return [self._starts[i] for i in range(index, len(self._segments))
+                if self._segments[i]['path'] == path]
+
+    def to_local(self, global_frame: int) -> Tuple[Optional[dict], int]:
+        """Return (segment, local frame) for global_frame, or (None, -1)."""
+        segment = self.segment_at(global_frame)
+        if segment is None:
+            return None, -1
+        return segment, global_frame - segment['start_frame']
+
+    def next_start_after(self, global_frame: int) -> int:
+        """Start frame of the first segment starting after global_frame, or -1."""
+        index = bisect_right(self._starts, global_frame)
+        return self._starts[index] if index < len(self._starts) else -1
+
+    def previous_start_before(self, global_frame: int) -> int:
+        """Start frame of the last segment starting before global_frame, or -1."""
+        index = bisect_right(self._starts, global_frame - 1) - 1
+        return self._starts[index] if index >= 0 else -1
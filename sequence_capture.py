@@ -5,13 +5,31 @@ Utility helpers for working with image sequence captures.
 Provides a thin wrapper that mimics the subset of OpenCV's VideoCapture API
 needed by the player so that frame numbers that don't start at zero (common in
 VFX pipelines) can still be read without relying on ffmpeg's numbering rules.
+Optionally keeps a window of frames ahead of the read position decoding on a
+thread pool (cv2.imread releases the GIL, so this scales across cores).
+
+Frames are numbered first..last of the files on disk. Missing numbers stay
+in the numbering as holes, rendered as a hold of the previous frame or as a
+slate, so frame indices always map to the same frame numbers.
 """
 
 import os
 import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import cv2
+import numpy as np
+
+from sequence_index import get_directory_index
+
+# Default number of frames kept in flight ahead of the read position.
+DEFAULT_PREFETCH_WINDOW = 8
+
+# How a missing frame in the numbering is shown.
+HOLE_HOLD = 'hold'    # repeat the previous frame on disk
+HOLE_SLATE = 'slate'  # dark frame labelled with the missing frame number
 
 
 class ImageSequenceCapture:
@@ -22,17 +40,39 @@ class ImageSequenceCapture:
     application relies on (read, set/get for CAP_PROP_POS_FRAMES and
     CAP_PROP_FRAME_COUNT, release, isOpened). Frames are read on demand to avoid
     loading the entire sequence into memory.
+
+    With prefetch_workers > 0, reading keeps up to prefetch_window frames in
+    flight on a thread pool in the current playback direction. The direction
+    follows the read positions (reverse play reads index, then sets index - 1),
+    and a set(CAP_PROP_POS_FRAMES) outside the prefetched frames cancels the
+    pending work.
+
+    The directory listing comes from the shared, mtime-validated cache in
+    sequence_index, so reopening a sequence costs one stat of its directory.
     """
 
-    def __init__(self, pattern: str, default_fps: float = 24.0) -> None:
+    def __init__(self, pattern: str, default_fps: float = 24.0,
+                 prefetch_workers: int = 0, prefetch_window: int = DEFAULT_PREFETCH_WINDOW,
+                 hole_mode: str = HOLE_HOLD) -> None:
         self.pattern = pattern
         self.default_fps = float(default_fps)
-        self._frame_paths = []
-        self._frame_numbers = []
+        self.hole_mode = hole_mode
+        self._sequence = None
+        self._frame_numbers = []  # numbers present on disk, sorted
+        self._frame_count = 0
+        self._last_frame = None   # (frame number, frame) of the last frame read from disk
         self._current_index = 0
         self.first_frame_number: Optional[int] = None
         self.last_frame_number: Optional[int] = None
         self._is_valid = False
+        self.prefetch_workers = max(0, int(prefetch_workers))
+        self.prefetch_window = max(1, int(prefetch_window))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = {}  # frame index -> Future
+        self._direction = 1
+        self._last_read_index: Optional[int] = None
+        self._prefetch_hits = 0
+        self._prefetch_misses = 0
         self._prepare_frames()
 
     def _prepare_frames(self) -> None:
@@ -43,54 +83,145 @@ class ImageSequenceCapture:
             return
 
         base_name, digits_str, extension = match.groups()
-        digits = int(digits_str)
-        regex = re.compile(
-            rf'^{re.escape(base_name)}(\d{{{digits}}}){re.escape(extension)}$'
-        )
-
-        try:
-            entries = os.listdir(directory)
-        except OSError:
+        index = get_directory_index(directory)
+        sequence = index.sequence((base_name, int(digits_str), extension), min_frames=1) if index else None
+        if sequence is None:
             return
 
-        collected = []
-        for entry in entries:
-            match_entry = regex.match(entry)
-            if not match_entry:
-                continue
-            frame_number = int(match_entry.group(1))
-            frame_path = os.path.join(directory, entry)
-            if os.path.isfile(frame_path):
-                collected.append((frame_number, frame_path))
-
-        if not collected:
-            return
-
-        collected.sort(key=lambda item: item[0])
-        self._frame_numbers = [frame for frame, _ in collected]
-        self._frame_paths = [path for _, path in collected]
-        self.first_frame_number = self._frame_numbers[0]
-        self.last_frame_number = self._frame_numbers[-1]
+        self._sequence = sequence
+        self._frame_numbers = sequence.frames
+        self.first_frame_number = sequence.first
+        self.last_frame_number = sequence.last
+        self._frame_count = sequence.last - sequence.first + 1
         self._is_valid = True
 
     def isOpened(self) -> bool:
-        return self._is_valid and bool(self._frame_paths)
+        return self._is_valid and self._frame_count > 0
+
+    @property
+    def missing_count(self) -> int:
+        """Number of holes between the first and last frame."""
+        return self._frame_count - len(self._frame_numbers)
+
+    def is_missing(self, index: int) -> bool:
+        """True if index is inside the sequence but its file does not exist."""
+        if not 0 <= index < self._frame_count:
+            return False
+        number = self.first_frame_number + index
+        pos = bisect_left(self._frame_numbers, number)
+        return pos >= len(self._frame_numbers) or self._frame_numbers[pos] != number
+
+    def frame_path(self, index: int) -> Optional[str]:
+        """Return the file path of the frame at index, or None if out of range or missing."""
+        if not 0 <= index < self._frame_count or self.is_missing(index):
+            return None
+        return self._sequence.path_for(self.first_frame_number + index)
 
     def read(self):
         if not self.isOpened():
             return False, None
 
-        if self._current_index >= len(self._frame_paths):
+        if self._current_index >= self._frame_count:
             return False, None
 
-        frame_path = self._frame_paths[self._current_index]
-        frame = cv2.imread(frame_path, cv2.IMREAD_COLOR)
+        index = self._current_index
+        if self.prefetch_workers:
+            frame = self._take_prefetched(index)
+        else:
+            frame = self._load_frame(index)
         if frame is None:
             return False, None
 
+        if not self.is_missing(index):
+            self._last_frame = (self.first_frame_number + index, frame)
         self._current_index += 1
         return True, frame
 
+    def _load_frame(self, index: int):
+        path = self.frame_path(index)
+        if path is None:
+            return self._hole_frame(index)
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+
+    def _hole_frame(self, index: int):
+        number = self.first_frame_number + index
+        # The first frame always exists, so there is a previous frame on disk
+        held_number = self._frame_numbers[bisect_right(self._frame_numbers, number) - 1]
+        if self._last_frame is not None and self._last_frame[0] == held_number:
+            held = self._last_frame[1]
+        else:
+            held = cv2.imread(self._sequence.path_for(held_number), cv2.IMREAD_COLOR)
+        if held is None:
+            return None
+        if self.hole_mode != HOLE_SLATE:
+            return held.copy()
+
+        slate = np.full_like(held, 32)
+        h, w = slate.shape[:2]
+        scale = max(0.5, w / 1280.0)
+        text = f"MISSING FRAME {number}"
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+        cv2.putText(slate, text, ((w - text_w) // 2, (h + text_h) // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 220), max(1, int(2 * scale)), cv2.LINE_AA)
+        return slate
+
+    def _take_prefetched(self, index: int):
+        # Only adjacent reads change direction; a jump keeps the current one.
+        if self._last_read_index is not None and abs(index - self._last_read_index) == 1:
+            self._direction = index - self._last_read_index
+        self._last_read_index = index
+
+        future = self._pending.pop(index, None)
+        frame = None
+        if future is not None and not future.cancelled():
+            frame = future.result()
+            self._prefetch_hits += 1
+        else:
+            self._prefetch_misses += 1
+        if frame is None:
+            frame = self._load_frame(index)
+
+        self._schedule_prefetch(index)
+        return frame
+
+    def _schedule_prefetch(self, index: int) -> None:
+        step = self._direction
+        last = self._frame_count - 1
+        wanted = [i for i in range(index + step, index + step * (self.prefetch_window + 1), step)
+                  if 0 <= i <= last]
+        wanted_set = set(wanted)
+        for stale in [i for i in self._pending if i not in wanted_set]:
+            self._pending.pop(stale).cancel()
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.prefetch_workers,
+                                                thread_name_prefix="seq-prefetch")
+        for i in wanted:
+            if i not in self._pending:
+                path = self.frame_path(i)
+                if path is None:
+                    continue  # Holes are built on read from the previous frame
+                self._pending[i] = self._executor.submit(cv2.imread, path, cv2.IMREAD_COLOR)
+
+    def _cancel_prefetch(self) -> None:
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def get_prefetch_stats(self) -> dict:
+        """Return prefetch depth (frames in flight or ready) and hit rate."""
+        lookups = self._prefetch_hits + self._prefetch_misses
+        return {
+            'workers': self.prefetch_workers,
+            'window': self.prefetch_window,
+            'direction': self._direction,
+            'depth': len(self._pending),
+            'ready': sum(1 for future in self._pending.values() if future.done()),
+            'hits': self._prefetch_hits,
+            'misses': self._prefetch_misses,
+            'hit_rate': self._prefetch_hits / lookups if lookups else 0.0,
+        }
+
     def set(self, prop_id, value) -> bool:
         if prop_id == cv2.CAP_PROP_POS_FRAMES:
             try:
@@ -99,15 +230,20 @@ class ImageSequenceCapture:
                 return False
             if new_index < 0:
                 new_index = 0
-            if new_index > len(self._frame_paths):
-                new_index = len(self._frame_paths)
+            if new_index > self._frame_count:
+                new_index = self._frame_count
+            # Stepping within the prefetched frames (including reverse play)
+            # keeps the work in flight; anything else is a jump.
+            if (self._pending and new_index not in self._pending
+                    and new_index != self._last_read_index):
+                self._cancel_prefetch()
             self._current_index = new_index
             return True
         return False
 
     def get(self, prop_id) -> float:
         if prop_id == cv2.CAP_PROP_FRAME_COUNT:
-            return float(len(self._frame_paths))
+            return float(self._frame_count)
         if prop_id == cv2.CAP_PROP_POS_FRAMES:
             return float(self._current_index)
         if prop_id == cv2.CAP_PROP_FPS:
@@ -116,18 +252,31 @@ class ImageSequenceCapture:
 
     def release(self) -> None:
         self._current_index = 0
+        self._last_read_index = None
+        self._last_frame = None
+        self._cancel_prefetch()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
 
-def create_media_capture(file_path: Optional[str], default_sequence_fps: float = 24.0):
+def create_media_capture(file_path: Optional[str], default_sequence_fps: float = 24.0,
+                         prefetch_workers: int = 0,
+                         prefetch_window: int = DEFAULT_PREFETCH_WINDOW,
+                         hole_mode: str = HOLE_HOLD):
     """
     Create either a VideoCapture or an ImageSequenceCapture depending on the
     provided path. Returns None if the media cannot be opened.
+    prefetch_workers/prefetch_window/hole_mode only apply to image sequences.
     """
     if not file_path:
         return None
 
     if '%' in file_path:
-        capture = ImageSequenceCapture(file_path, default_sequence_fps)
+        capture = ImageSequenceCapture(file_path, default_sequence_fps,
+                                       prefetch_workers=prefetch_workers,
+                                       prefetch_window=prefetch_window,
+                                       hole_mode=hole_mode)
         if capture.isOpened():
             return capture
         return None
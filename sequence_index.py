@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Single-pass directory indexing for image sequence detection.
+
+A directory is read once with os.scandir and every numbered image in it is
+grouped by (prefix, padding, extension) in the same pass, so resolving a
+drop of thousands of stills or short sequences costs one listing per
+directory instead of one per input file. Gaps in the numbering do not split
+a sequence: it is reported once, with its missing frames recorded as holes.
+
+Listings are shared through get_directory_index(), which keeps the latest
+index of recently used directories and revalidates it with a single stat of
+the directory (its mtime changes whenever entries are added or removed).
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.exr', '.dpx')
+
+# name, frame number, extension (the number is the last digit run before the extension)
+NUMBERED_FILE_RE = re.compile(r'^(.*?)(\d+)(\.[^.]+)$')
+
+SequenceKey = Tuple[str, int, str]  # prefix, padding, extension
+
+# Directories whose listing is kept by get_directory_index()
+MAX_CACHED_DIRECTORIES = 64
+
+_index_cache: 'OrderedDict[str, Tuple[int, DirectoryIndex]]' = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+class ImageSequence:
+    """Numbered frames in one directory sharing prefix, padding and extension."""
+
+    def __init__(self, directory: str, prefix: str, padding: int, extension: str,
+                 frames: List[int]) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.padding = padding
+        self.extension = extension
+        self.frames = sorted(frames)
+
+    def path_for(self, frame_number: int) -> str:
+        return os.path.join(self.directory, f"{self.prefix}{frame_number:0{self.padding}d}{self.extension}")
+
+    @property
+    def first(self) -> int:
+        return self.frames[0]
+
+    @property
+    def last(self) -> int:
+        return self.frames[-1]
+
+    @property
+    def missing_count(self) -> int:
+        return self.last - self.first + 1 - len(self.frames)
+
+    @property
+    def holes(self) -> List[Tuple[int, int]]:
+        """Missing frame numbers as inclusive (start, end) ranges."""
+        holes = []
+        for previous, current in zip(self.frames, self.frames[1:]):
+            if current - previous > 1:
+                holes.append((previous + 1, current - 1))
+        return holes
+
+    @property
+    def pattern(self) -> str:
+        return os.path.join(self.directory, f"{self.prefix}%0{self.padding}d{self.extension}")
+
+    @property
+    def display_name(self) -> str:
+        name = f"{self.prefix}[{self.first:0{self.padding}d}-{self.last:0{self.padding}d}]{self.extension}"
+        missing = self.missing_count
+        if missing:
+            name += f" ({missing} missing)"
+        return name
+
+
+class DirectoryIndex:
+    """
+    Numbered files of one directory grouped into sequences. The frame list
+    of every group is sorted; treat the index as read-only, it is shared.
+    """
+
+    def __init__(self, directory: str, groups: Dict[SequenceKey, List[int]]) -> None:
+        self.directory = directory
+        self.groups = groups
+
+    @classmethod
+    def scan(cls, directory: str,
+             extensions: Optional[Iterable[str]] = None) -> Optional['DirectoryIndex']:
+        """
+        Read directory once; extensions limits the files considered (None:
+        every numbered file). Returns None if it cannot be listed.
+        """
+        extensions = tuple(ext.lower() for ext in extensions) if extensions is not None else None
+        groups: Dict[SequenceKey, List[int]] = {}
+        try:
+            with os.scandir(directory or '.') as entries:
+                for entry in entries:
+                    name = entry.name
+                    if extensions is not None and not name.lower().endswith(extensions):
+                        continue
+                    match = NUMBERED_FILE_RE.match(name)
+                    # d_type from the listing: no extra stat on most filesystems
+                    if not match or not entry.is_file():
+                        continue
+                    prefix, number, extension = match.groups()
+                    groups.setdefault((prefix, len(number), extension), []).append(int(number))
+        except OSError:
+            return None
+        for frames in groups.values():
+            frames.sort()
+        return cls(directory, groups)
+
+    @staticmethod
+    def key_for(filename: str) -> Optional[SequenceKey]:
+        match = NUMBERED_FILE_RE.match(filename)
+        if not match:
+            return None
+        prefix, number, extension = match.groups()
+        return prefix, len(number), extension
+
+    def sequence(self, key: SequenceKey, min_frames: int = 2) -> Optional[ImageSequence]:
+        """Return the sequence for key, or None if fewer than min_frames share it."""
+        frames = self.groups.get(key)
+        if not frames or len(frames) < min_frames:
+            return None
+        return ImageSequence(self.directory, key[0], key[1], key[2], frames)
+
+    def sequences(self) -> List[ImageSequence]:
+        return [self.sequence(key) for key, frames in sorted(self.groups.items()) if len(frames) > 1]
+
+
+def get_directory_index(directory: str) -> Optional[DirectoryIndex]:
+    """
+    Return the index of every numbered file in directory, reusing the cached
+    listing while the directory's mtime is unchanged. Returns None if the
+    directory cannot be read.
+    """
+    directory = directory or '.'
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+    with _index_cache_lock:
+        cached = _index_cache.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            _index_cache.move_to_end(directory)
+            return cached[1]
+
+    index = DirectoryIndex.scan(directory)
+    if index is None:
+        return None
+    with _index_cache_lock:
+        _index_cache[directory] = (mtime_ns, index)
+        _index_cache.move_to_end(directory)
+        while len(_index_cache) > MAX_CACHED_DIRECTORIES:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def resolve_media_paths(file_paths: Iterable[str],
+                        extensions: Iterable[str] = IMAGE_EXTENSIONS) -> List:
+    """
+    Collapse numbered images into sequences. Returns, in sorted input order,
+    plain paths for videos and single images and (pattern, display_name) for
+    every sequence an input image belongs to (each sequence once). The whole
+    directory of an input image is considered, not just the given files.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    emitted = set()
+    resolved = []
+    for path in sorted(set(file_paths)):
+        if not path.lower().endswith(extensions):
+            resolved.append(path)
+            continue
+        dirname, filename = os.path.split(path)
+        key = DirectoryIndex.key_for(filename)
+        if key is None:
+            resolved.append(path)
+            continue
+        if (dirname, key) in emitted:
+            continue
+        index = get_directory_index(dirname)
+        sequence = index.sequence(key) if index is not None else None
+        if sequence is None:
+            resolved.append(path)
+        else:
+            emitted.add((dirname, key))
+            resolved.append((sequence.pattern, sequence.display_name))
+    return resolved
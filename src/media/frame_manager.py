@@ -3,42 +3,190 @@ Frame Manager.
 Mengelola cache dan navigasi frame untuk playback yang smooth.
 """
 
+import threading
+from bisect import bisect_left, bisect_right
 from collections import OrderedDict
 from PyQt5.QtGui import QImage
 
 
+def estimateFrameBytes(frame):
+    """
+    Estimate memory used by a cached frame.
+    
+    Args:
+        frame: numpy ndarray or QImage frame data
+        
+    Returns:
+        Size in bytes
+    """
+    nbytes = getattr(frame, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    if isinstance(frame, QImage):
+        return int(frame.sizeInBytes())
+    return 0
+
+
+class FrameRanges:
+    """
+    Run-length set of frame indices: sorted, non-overlapping runs
+    (inclusive), updated in place as single indices are added or removed.
+    """
+    
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        
+    def addIndex(self, index):
+        """
+        Add one index, extending or joining neighbouring runs.
+        
+        Returns:
+            True if the index was not present yet
+        """
+        i = bisect_right(self.starts, index) - 1
+        if i >= 0 and self.ends[i] >= index:
+            return False
+        joins_previous = i >= 0 and self.ends[i] == index - 1
+        joins_next = i + 1 < len(self.starts) and self.starts[i + 1] == index + 1
+        if joins_previous and joins_next:
+            self.ends[i] = self.ends[i + 1]
+            del self.starts[i + 1]
+            del self.ends[i + 1]
+        elif joins_previous:
+            self.ends[i] = index
+        elif joins_next:
+            self.starts[i + 1] = index
+        else:
+            self.starts.insert(i + 1, index)
+            self.ends.insert(i + 1, index)
+        return True
+        
+    def removeIndex(self, index):
+        """
+        Remove one index, shrinking or splitting its run.
+        
+        Returns:
+            True if the index was present
+        """
+        i = bisect_right(self.starts, index) - 1
+        if i < 0 or self.ends[i] < index:
+            return False
+        start, end = self.starts[i], self.ends[i]
+        if start == end:
+            del self.starts[i]
+            del self.ends[i]
+        elif index == start:
+            self.starts[i] = index + 1
+        elif index == end:
+            self.ends[i] = index - 1
+        else:
+            self.ends[i] = index - 1
+            self.starts.insert(i + 1, index + 1)
+            self.ends.insert(i + 1, end)
+        return True
+        
+    def getRuns(self, first_index=None, last_index=None):
+        """
+        Get the runs overlapping a range, clipped to it.
+        
+        Args:
+            first_index: First index of interest (None for no limit)
+            last_index: Last index of interest (None for no limit)
+            
+        Returns:
+            List of (start, end) tuples, end inclusive
+        """
+        lo = 0 if first_index is None else bisect_left(self.ends, first_index)
+        hi = len(self.starts) if last_index is None else bisect_right(self.starts, last_index)
+        runs = list(zip(self.starts[lo:hi], self.ends[lo:hi]))
+        if runs and first_index is not None and runs[0][0] < first_index:
+            runs[0] = (first_index, runs[0][1])
+        if runs and last_index is not None and runs[-1][1] > last_index:
+            runs[-1] = (runs[-1][0], last_index)
+        return runs
+        
+    def __len__(self):
+        return len(self.starts)
+
+
+def intersectRuns(runs_a, runs_b):
+    """
+    Intersect two sorted lists of (start, end) runs.
+    
+    Returns:
+        Runs covered by both lists
+    """
+    result = []
+    i = j = 0
+    while i < len(runs_a) and j < len(runs_b):
+        start = max(runs_a[i][0], runs_b[j][0])
+        end = min(runs_a[i][1], runs_b[j][1])
+        if start <= end:
+            result.append((start, end))
+        if runs_a[i][1] < runs_b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
 class FrameManager:
     """Manager untuk caching dan navigasi frame."""
     
-    def __init__(self, max_cache_size=100):
+    def __init__(self, max_cache_size=100, max_cache_bytes=None):
         """
         Initialize frame manager.
         
         Args:
-            max_cache_size: Maximum number of frames to cache
+            max_cache_size: Maximum number of frames to cache (None for no limit)
+            max_cache_bytes: Maximum memory used by cached frames in bytes
+                (None for no limit)
         """
         self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
+        # Evictable frames in LRU order
         self.frame_cache = OrderedDict()
+        # Frames inside a pinned range, kept out of the LRU order
+        self.pinned_frames = {}
+        self.frame_sizes = {}
+        # Bytes of all cached frames, pinned ones included
+        self.cache_bytes = 0
         self.current_sequence = []
+        # Named pinned ranges: name -> (media_key, first_index, last_index)
+        self.pinned_ranges = {}
+        # Resident indices per media as runs (media_key -> FrameRanges);
+        # residency_version changes whenever they do
+        self.cached_ranges = {}
+        self.residency_version = 0
+        # Frames may be added from decoder threads
+        self._lock = threading.RLock()
         
     def addFrame(self, frame_index, frame):
         """
         Add frame to cache.
         
         Args:
-            frame_index: Index of the frame
-            frame: QImage frame data
+            frame_index: Index of the frame, or a (media_key, index) tuple
+            frame: QImage or numpy frame data
         """
-        if frame_index in self.frame_cache:
-            # Move to end (most recently used)
-            self.frame_cache.move_to_end(frame_index)
-        else:
-            # Add new frame
-            self.frame_cache[frame_index] = frame
-            
-            # Remove oldest frame if cache is full
-            if len(self.frame_cache) > self.max_cache_size:
-                self.frame_cache.popitem(last=False)
+        with self._lock:
+            if frame_index in self.frame_cache:
+                # Move to end (most recently used)
+                self.frame_cache.move_to_end(frame_index)
+            elif frame_index not in self.pinned_frames:
+                # Add new frame
+                if self.isPinned(frame_index):
+                    self.pinned_frames[frame_index] = frame
+                else:
+                    self.frame_cache[frame_index] = frame
+                size = estimateFrameBytes(frame)
+                self.frame_sizes[frame_index] = size
+                self.cache_bytes += size
+                self._noteResidency(frame_index, True)
+                
+                # Remove oldest frames if cache is full
+                self._evict()
                 
     def getFrame(self, frame_index):
         """
@@ -48,13 +196,14 @@ class FrameManager:
             frame_index: Index of the frame
             
         Returns:
-            QImage frame or None if not cached
+            Cached frame or None if not cached
         """
-        if frame_index in self.frame_cache:
-            # Move to end (most recently used)
-            self.frame_cache.move_to_end(frame_index)
-            return self.frame_cache[frame_index]
-        return None
+        with self._lock:
+            if frame_index in self.frame_cache:
+                # Move to end (most recently used)
+                self.frame_cache.move_to_end(frame_index)
+                return self.frame_cache[frame_index]
+            return self.pinned_frames.get(frame_index)
         
     def hasFrame(self, frame_index):
         """
@@ -66,7 +215,7 @@ class FrameManager:
         Returns:
             True if frame is cached
         """
-        return frame_index in self.frame_cache
+        return frame_index in self.frame_cache or frame_index in self.pinned_frames
         
     def preloadFrames(self, start_index, count, loader_function):
         """
@@ -90,7 +239,13 @@ class FrameManager:
                     
     def clearCache(self):
         """Clear all cached frames."""
-        self.frame_cache.clear()
+        with self._lock:
+            self.frame_cache.clear()
+            self.pinned_frames.clear()
+            self.frame_sizes.clear()
+            self.cache_bytes = 0
+            self.cached_ranges.clear()
+            self.residency_version += 1
         
     def getCacheInfo(self):
         """
@@ -99,13 +254,39 @@ class FrameManager:
         Returns:
             Dictionary with cache statistics
         """
-        return {
-            'cached_frames': len(self.frame_cache),
-            'max_cache_size': self.max_cache_size,
-            'cache_utilization': len(self.frame_cache) / self.max_cache_size,
-            'cached_indices': list(self.frame_cache.keys())
-        }
+        with self._lock:
+            if self.max_cache_bytes:
+                utilization = self.cache_bytes / self.max_cache_bytes
+            elif self.max_cache_size:
+                utilization = self._frameCount() / self.max_cache_size
+            else:
+                utilization = 0.0
+            return {
+                'cached_frames': self._frameCount(),
+                'pinned_frames': len(self.pinned_frames),
+                'max_cache_size': self.max_cache_size,
+                'cache_bytes': self.cache_bytes,
+                'max_cache_bytes': self.max_cache_bytes,
+                'cache_utilization': utilization,
+                'cached_indices': list(self.frame_cache.keys()) + list(self.pinned_frames.keys())
+            }
         
+    def getCachedRanges(self, media_key, first_index=None, last_index=None):
+        """
+        Get the cached frames of one media as runs.
+        
+        Args:
+            media_key: Media the frames belong to (first element of the cache key)
+            first_index: First index of interest (None for no limit)
+            last_index: Last index of interest (None for no limit)
+            
+        Returns:
+            List of (start, end) tuples, end inclusive
+        """
+        with self._lock:
+            ranges = self.cached_ranges.get(media_key)
+            return ranges.getRuns(first_index, last_index) if ranges is not None else []
+            
     def setMaxCacheSize(self, size):
         """
         Set maximum cache size.
@@ -113,11 +294,118 @@ class FrameManager:
         Args:
             size: New maximum cache size
         """
-        self.max_cache_size = size
+        with self._lock:
+            self.max_cache_size = size
+            
+            # Remove excess frames if new size is smaller
+            self._evict()
+            
+    def setMaxCacheBytes(self, max_bytes):
+        """
+        Set maximum memory budget for cached frames.
         
-        # Remove excess frames if new size is smaller
-        while len(self.frame_cache) > self.max_cache_size:
-            self.frame_cache.popitem(last=False)
+        Args:
+            max_bytes: New budget in bytes (None for no limit)
+        """
+        with self._lock:
+            self.max_cache_bytes = max_bytes
+            self._evict()
+            
+    def setPinnedRange(self, name, media_key, first_index, last_index):
+        """
+        Protect a range of frames of one media from eviction.
+        
+        Args:
+            name: Identifier of the pin (replaces an existing pin with the same name)
+            media_key: Media the frames belong to (first element of the cache key)
+            first_index: First pinned frame index (inclusive)
+            last_index: Last pinned frame index (inclusive)
+        """
+        with self._lock:
+            previous = self.pinned_ranges.get(name)
+            self.pinned_ranges[name] = (media_key, first_index, last_index)
+            for index in range(first_index, last_index + 1):
+                key = (media_key, index)
+                if key in self.frame_cache:
+                    self.pinned_frames[key] = self.frame_cache.pop(key)
+            if previous is not None:
+                self._releasePinned(*previous)
+            self._evict()
+            
+    def clearPinnedRange(self, name):
+        """
+        Remove a pinned range.
+        
+        Args:
+            name: Identifier of the pin
+        """
+        with self._lock:
+            previous = self.pinned_ranges.pop(name, None)
+            if previous is not None:
+                self._releasePinned(*previous)
+            self._evict()
+            
+    def isPinned(self, frame_index):
+        """
+        Check if a cache key falls inside a pinned range.
+        
+        Args:
+            frame_index: Cache key, a (media_key, index) tuple
+            
+        Returns:
+            True if the frame must not be evicted
+        """
+        if not self.pinned_ranges or not isinstance(frame_index, tuple):
+            return False
+        media_key, index = frame_index[0], frame_index[-1]
+        for pin_media, first_index, last_index in self.pinned_ranges.values():
+            if pin_media == media_key and first_index <= index <= last_index:
+                return True
+        return False
+        
+    def _releasePinned(self, media_key, first_index, last_index):
+        # Frames of a removed or moved pin that no other pin covers go back
+        # to the LRU order as most recently used.
+        for index in range(first_index, last_index + 1):
+            key = (media_key, index)
+            if key in self.pinned_frames and not self.isPinned(key):
+                self.frame_cache[key] = self.pinned_frames.pop(key)
+                
+    def _frameCount(self):
+        return len(self.frame_cache) + len(self.pinned_frames)
+        
+    def _isOverBudget(self):
+        if self.max_cache_size is not None and self._frameCount() > self.max_cache_size:
+            return True
+        if self.max_cache_bytes is not None and self.cache_bytes > self.max_cache_bytes:
+            return True
+        return False
+        
+    def _evict(self):
+        # Only the LRU order is evicted; once it is empty the pinned frames
+        # alone may exceed the budget and are left alone.
+        while self.frame_cache and self._isOverBudget():
+            key, _ = self.frame_cache.popitem(last=False)
+            self.cache_bytes -= self.frame_sizes.pop(key, 0)
+            self._noteResidency(key, False)
+            
+    def _noteResidency(self, frame_index, cached):
+        if isinstance(frame_index, tuple):
+            media_key, index = frame_index[0], frame_index[-1]
+        else:
+            media_key, index = None, frame_index
+        if not isinstance(index, int):
+            return
+        ranges = self.cached_ranges.get(media_key)
+        if cached:
+            if ranges is None:
+                ranges = self.cached_ranges[media_key] = FrameRanges()
+            ranges.addIndex(index)
+        elif ranges is not None:
+            ranges.removeIndex(index)
+            if not ranges:
+                del self.cached_ranges[media_key]
+        self.residency_version += 1
             
     def getAdjacentFrames(self, current_index, radius=5):
         """
@@ -1,11 +1,27 @@
+from bisect import bisect_left, bisect_right
+from functools import partial
+
 from PyQt5.QtWidgets import QWidget, QMenu, QAction, QActionGroup
-from PyQt5.QtCore import Qt, QPoint, pyqtSignal
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont
+from PyQt5.QtCore import Qt, QPoint, QLine, QRect, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QFontMetrics, QPixmap
+
+# Zoom: jumlah frame minimum yang terlihat & faktor per notch roda mouse
+MIN_VISIBLE_FRAMES = 20
+ZOOM_STEP = 1.25
+# Jarak minimum (piksel) antar tick frame dan antar label tick
+MIN_TICK_SPACING = 6
+MIN_TICK_LABEL_SPACING = 70
+TICK_STEPS = (1, 2, 5)
+# Bar status cache di tepi bawah timeline
+CACHE_BAR_HEIGHT = 3
 
 class TimelineWidget(QWidget):
     position_changed = pyqtSignal(int)
     display_mode_changed = pyqtSignal(bool)
     markTourSpeedChanged = pyqtSignal(int)
+    # Scrub: tombol kiri ditahan di timeline (position_changed tetap dikirim saat drag)
+    scrubStarted = pyqtSignal()
+    scrubFinished = pyqtSignal(int)
     
     def __init__(self):
         super().__init__()
@@ -22,11 +38,29 @@ class TimelineWidget(QWidget):
         # Menyimpan frame *global* di mana setiap video baru dimulai
         self.segments = [] 
         self.segment_total_frames = 0
+        self.segment_names = []
         # --- AKHIR DATA SEGMEN ---
+
+        # Jendela frame yang terlihat: view_span None = seluruh durasi (tanpa zoom)
+        self.view_start = 0.0
+        self.view_span = None
+        self._pan_origin = None
+
+        # Frame yang ada di cache RAM: run (awal, akhir) global, terurut
+        self.cache_starts = []
+        self.cache_ends = []
+        self._cache_bar = None
         
         self.fps = 0.0
         self.show_timecode = False
         self.current_mark_tour_speed = 1500
+        self.is_scrubbing = False
+        self.last_scrub_position = -1
+        # Layer statis (latar, segmen, marka) digambar sekali ke pixmap;
+        # per frame hanya playhead & labelnya yang digambar di atasnya
+        self._static_layer = None
+        self.label_font = QFont("Segoe UI", 9, QFont.Bold)
+        self.detail_font = QFont("Segoe UI", 7)
         self.setFixedHeight(44)
         self.setStyleSheet("""
             QWidget {
@@ -36,41 +70,128 @@ class TimelineWidget(QWidget):
         """)
         
     def set_duration(self, duration):
-        self.duration = duration
+        if self.duration != duration:
+            self.duration = duration
+            self.invalidate_static_layer()
+            if self.view_span is not None:
+                self._set_view(self.view_start, self.view_span)
         self.update()
         
     def set_position(self, position):
         if self.current_position != position:
+            # Cukup repaint area playhead lama & baru (layer statis dari cache)
+            self.update(self._playhead_rect())
             self.current_position = position
-            self.update()
+            if self.view_span is not None and not self.is_scrubbing:
+                self._follow_position(position)
+            self.update(self._playhead_rect())
 
     def set_marks(self, marks):
         """Mengatur marka putih (dari tombol 'F')."""
         self.marks = marks
+        self.invalidate_static_layer()
         self.update()
 
     def set_annotation_marks(self, marks):
         """Mengatur marka anotasi hijau (dari gambar)."""
         self.annotation_marks = marks
+        self.invalidate_static_layer()
         self.update()
 
+    def invalidate_static_layer(self):
+        """Buang pixmap layer statis; digambar ulang pada paint berikutnya."""
+        self._static_layer = None
+        self._cache_bar = None
+
+    def set_cache_ranges(self, runs):
+        """
+        Mengatur frame yang sudah ada di cache: daftar (awal, akhir) global
+        (inklusif, terurut). Digambar sebagai bar tipis di bawah timeline.
+        """
+        starts = [start for start, _ in runs]
+        ends = [end for _, end in runs]
+        if starts == self.cache_starts and ends == self.cache_ends:
+            return
+        self.cache_starts, self.cache_ends = starts, ends
+        self._cache_bar = None
+        self.update(0, self.height() - CACHE_BAR_HEIGHT, self.width(), CACHE_BAR_HEIGHT)
+
     # --- FUNGSI BARU UNTUK SEGMEN ---
-    def set_segments(self, boundaries, total_frames):
+    def set_segments(self, boundaries, total_frames, names=None):
         """
         Mengatur batas-batas segmen untuk digambar.
-        'boundaries' adalah daftar frame global di mana setiap segmen baru dimulai.
+        'boundaries' adalah daftar frame global (terurut) di mana setiap segmen baru dimulai,
+        'names' nama tiap segmen (ditampilkan saat di-zoom).
         """
         self.segments = boundaries
         self.segment_total_frames = total_frames
+        self.segment_names = names or []
+        self.invalidate_static_layer()
         self.update()
     # --- AKHIR FUNGSI BARU ---
 
     def set_fps(self, fps):
         self.fps = fps
+        if self.view_span is not None:
+            self.invalidate_static_layer() # Label tick bisa berupa timecode
         self.update()
         
+    def resizeEvent(self, event):
+        self.invalidate_static_layer()
+        super().resizeEvent(event)
+
+    # --- ZOOM & SCROLL ---
+    def is_zoomed(self):
+        return self.view_span is not None
+
+    def reset_zoom(self):
+        """Tampilkan seluruh durasi lagi."""
+        self._set_view(0.0, None)
+
+    def zoom_at(self, x, factor):
+        """Zoom (factor > 1 = masuk) dengan frame di bawah kolom x tetap di tempatnya."""
+        start, span = self._view()
+        anchor = start + x / max(1, self.width()) * span
+        new_span = span / factor
+        self._set_view(anchor - x / max(1, self.width()) * new_span, new_span)
+
+    def scroll_by(self, frames):
+        start, span = self._view()
+        self._set_view(start + frames, span)
+
+    def _set_view(self, start, span):
+        total = self._total_pos()
+        if span is None or span >= total:
+            start, span = 0.0, None
+        else:
+            span = max(span, min(MIN_VISIBLE_FRAMES, total))
+            start = min(max(0.0, start), total - span)
+        if (start, span) != (self.view_start, self.view_span):
+            self.view_start, self.view_span = start, span
+            self.invalidate_static_layer()
+            self.update()
+
+    def _view(self):
+        """(frame awal, jumlah frame) jendela yang terlihat."""
+        total = self._total_pos()
+        if self.view_span is None or self.view_span >= total:
+            return 0.0, float(total)
+        return min(max(0.0, self.view_start), total - self.view_span), self.view_span
+
+    def visible_range(self):
+        """(frame pertama, frame terakhir) jendela yang terlihat, inklusif."""
+        start, span = self._view()
+        return int(start), int(start + span)
+
+    def _follow_position(self, position):
+        # Playhead keluar dari jendela (playback/seek): geser satu halaman
+        start, span = self._view()
+        if position < start or position > start + span:
+            self._set_view(position - span * 0.05, span)
+
     def set_timecode_mode(self, enabled):
         self.show_timecode = enabled
+        self.invalidate_static_layer()
         self.update()
 
     def _emit_speed_change(self, speed_ms):
@@ -121,112 +242,337 @@ class TimelineWidget(QWidget):
             speed_menu.addAction(action)
             speed_group.addAction(action)
 
+        context_menu.addSeparator()
+        fit_action = QAction("Zoom to Fit", self)
+        fit_action.setEnabled(self.is_zoomed())
+        fit_action.triggered.connect(self.reset_zoom)
+        context_menu.addAction(fit_action)
+
         context_menu.exec_(self.mapToGlobal(pos))
 
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        # 1. Gambar latar belakang
-        painter.setBrush(QBrush(QColor("#3a3a3a")))
-        painter.setPen(Qt.NoPen)
-        painter.drawRect(self.rect())
         
-        if self.duration > 0:
-            
-            # 'self.duration' sekarang bisa jadi durasi 1 file atau total durasi segmen
-            w = self.width()
-            # Durasi 1 frame tidak boleh dibagi (self.duration - 1 akan menjadi 0)
-            total_pos = (self.duration - 1) if self.duration > 1 else 1 
-
-            # --- LOGIKA GAMBAR SEGMEN BARU ---
-            if self.segments and self.segment_total_frames > 1:
-                # Gambar garis pemisah segmen (abu-abu putus-putus)
-                painter.setPen(QPen(QColor("#999999"), 1, Qt.DashLine))
-                for boundary_frame in self.segments:
-                    # Jangan gambar di frame 0
-                    if boundary_frame == 0:
-                        continue
-                    
-                    seg_x = (boundary_frame / total_pos) * w
-                    painter.drawLine(int(seg_x), 10, int(seg_x), self.height())
-            # --- AKHIR LOGIKA SEGMEN ---
+        # 1. Layer statis (latar, segmen, marka) dari cache
+        if self._static_layer is None:
+            self._static_layer = self._render_static_layer()
+        painter.drawPixmap(0, 0, self._static_layer)
 
-            # --- LOGIKA MENGGAMBAR MARK ---
-            
-            # 2. Gambar marka anotasi (HIJAU)
-            painter.setPen(QPen(QColor("#00ff00"), 2)) # Warna hijau
-            for mark_frame in self.annotation_marks:
-                mark_x = (mark_frame / total_pos) * w
-                painter.drawLine(int(mark_x), 10, int(mark_x), self.height())
-
-            # 3. Gambar marka biasa (PUTIH)
-            painter.setPen(QPen(QColor("#ffffff"), 2))
-            for mark_frame in self.marks:
-                mark_x = (mark_frame / total_pos) * w
-                painter.drawLine(int(mark_x), 10, int(mark_x), self.height())
+        # 2. Bar status cache (berubah lebih sering dari layer statis)
+        if self.cache_starts and self.duration > 0:
+            if self._cache_bar is None:
+                self._cache_bar = self._cache_bar_rects()
+            painter.setPen(Qt.NoPen)
+            for rect, color in self._cache_bar:
+                painter.fillRect(rect, color)
+        
+        if self.duration > 0 and self._is_position_visible(self.current_position):
+            painter.setRenderHint(QPainter.Antialiasing)
 
-            # 4. Gambar playhead dan labelnya
-            marker_x = (self.current_position / total_pos) * w
+            # 3. Gambar playhead dan labelnya
+            marker_x = self._position_to_x(self.current_position)
 
             painter.setPen(QPen(QColor("#ffffff"), 2))
             painter.drawLine(int(marker_x), 10, int(marker_x), self.height())
 
             display_text = self._format_marker_label()
             if display_text:
-                font = QFont("Segoe UI", 9, QFont.Bold)
-                painter.setFont(font)
-                metrics = painter.fontMetrics()
-                text_width = metrics.horizontalAdvance(display_text)
-                text_height = metrics.height()
-                bubble_padding = 8
-                bubble_width = text_width + bubble_padding * 2
-                bubble_height = text_height + 6
-                bubble_x = int(marker_x) - bubble_width // 2
-                bubble_y = 2
-                if bubble_x < 4:
-                    bubble_x = 4
-                if bubble_x + bubble_width > w - 4:
-                    bubble_x = w - bubble_width - 4
+                painter.setFont(self.label_font)
+                bubble_rect = self._label_rect(marker_x, display_text, QFontMetrics(self.label_font))
 
                 painter.setPen(Qt.NoPen)
                 painter.setBrush(QColor(20, 20, 20, 220))
-                painter.drawRoundedRect(bubble_x, bubble_y, bubble_width, bubble_height, 6, 6)
+                painter.drawRoundedRect(bubble_rect, 6, 6)
                 painter.setPen(QColor("#ffffff"))
-                painter.drawText(bubble_x, bubble_y, bubble_width, bubble_height,
-                                 Qt.AlignCenter | Qt.AlignVCenter, display_text)
+                painter.drawText(bubble_rect, Qt.AlignCenter | Qt.AlignVCenter, display_text)
+
+    def _render_static_layer(self):
+        """
+        Gambar latar, segmen, tick dan marka untuk jendela yang terlihat ke
+        sebuah pixmap. Marka dikelompokkan per kolom piksel (dicari dengan
+        bisect), jadi biayanya sebanding dengan lebar widget, bukan dengan
+        panjang timeline atau jumlah marka.
+        """
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(max(1, int(self.width() * ratio)), max(1, int(self.height() * ratio)))
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(QColor("#3a3a3a"))
+        if self.duration <= 0:
+            return layer
+        
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        h = self.height()
+        start, span = self._view()
+
+        # --- LOGIKA GAMBAR SEGMEN ---
+        if self.segments and self.segment_total_frames > 1:
+            # Garis pemisah segmen (abu-abu putus-putus), kecuali di frame 0
+            painter.setPen(QPen(QColor("#999999"), 1, Qt.DashLine))
+            painter.drawLines([QLine(x, 10, x, h) for x, count in self._column_counts(self.segments)
+                               if x > 0 or start > 0])
+            if self.segment_names:
+                self._draw_segment_names(painter, start, span)
+
+        # --- TICK FRAME (hanya saat di-zoom) ---
+        if self.view_span is not None:
+            self._draw_frame_ticks(painter, start, span)
+            # Posisi jendela terhadap seluruh durasi (strip tipis di atas)
+            total = self._total_pos()
+            w = self.width()
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#555555"))
+            painter.drawRect(0, 0, w, 3)
+            painter.setBrush(QColor("#aaaaaa"))
+            painter.drawRect(int(start / total * w), 0, max(2, int(span / total * w)), 3)
+
+        # --- LOGIKA MENGGAMBAR MARK ---
+        # Marka anotasi (HIJAU), lalu marka biasa (PUTIH) di atasnya
+        for marks, color in ((self.annotation_marks, "#00ff00"), (self.marks, "#ffffff")):
+            self._draw_mark_columns(painter, self._column_counts(marks), QColor(color), span)
+        painter.end()
+        return layer
+
+    def _cache_bar_rects(self):
+        """
+        Kotak bar cache untuk jendela yang terlihat: per kolom piksel dicek
+        dengan bisect apakah tercache penuh, sebagian, atau tidak sama sekali,
+        lalu kolom berurutan dengan status sama digabung.
+        """
+        w = max(1, self.width())
+        start, span = self._view()
+        starts, ends = self.cache_starts, self.cache_ends
+        colors = {2: QColor("#3d9be9"), 1: QColor(61, 155, 233, 110)}
+        y = self.height() - CACHE_BAR_HEIGHT
+        rects = []
+        run_start_x, run_state = 0, 0
+        for column in range(w + 1):
+            state = 0
+            if column < w:
+                # Frame f menempati [f, f + 1) pada sumbu kolom
+                a = start + column * span / w
+                b = start + (column + 1) * span / w
+                i = bisect_right(starts, a) - 1
+                if i >= 0 and ends[i] + 1 >= b:
+                    state = 2
+                elif (i >= 0 and ends[i] + 1 > a) or (i + 1 < len(starts) and starts[i + 1] < b):
+                    state = 1
+            if state != run_state:
+                if run_state:
+                    rects.append((QRect(run_start_x, y, column - run_start_x, CACHE_BAR_HEIGHT), colors[run_state]))
+                run_start_x, run_state = column, state
+        return rects
+
+    def _draw_mark_columns(self, painter, columns, color, span):
+        if not columns:
+            return
+        h = self.height()
+        frames_per_column = span / max(1, self.width())
+        if frames_per_column <= 1:
+            painter.setPen(QPen(color, 2))
+            painter.drawLines([QLine(x, 10, x, h) for x, count in columns])
+            return
+        # Zoom jauh: kepadatan marka per kolom ditunjukkan lewat opasitas
+        by_alpha = {}
+        for x, count in columns:
+            density = min(1.0, count / frames_per_column * 2)
+            alpha = 140 + int(115 * density) // 23 * 23
+            by_alpha.setdefault(alpha, []).append(QLine(x, 10, x, h))
+        for alpha, lines in by_alpha.items():
+            color.setAlpha(alpha)
+            painter.setPen(QPen(color, 2))
+            painter.drawLines(lines)
+
+    def _draw_segment_names(self, painter, start, span):
+        """Nama segmen yang cukup lebar di jendela yang terlihat."""
+        first = max(0, bisect_right(self.segments, start) - 1)
+        last = min(len(self.segments), len(self.segment_names), bisect_right(self.segments, start + span))
+        if last - first > self.width() // 40:
+            return  # Terlalu banyak segmen terlihat untuk diberi nama
+        painter.setFont(self.detail_font)
+        painter.setPen(QColor("#bbbbbb"))
+        metrics = painter.fontMetrics()
+        for index in range(first, last):
+            segment_end = self.segments[index + 1] if index + 1 < len(self.segments) else self.segment_total_frames
+            x0 = max(0, int(self._position_to_x(self.segments[index]))) + 4
+            x1 = min(self.width(), int(self._position_to_x(segment_end))) - 4
+            if x1 - x0 < 30:
+                continue
+            name = metrics.elidedText(self.segment_names[index], Qt.ElideRight, x1 - x0)
+            painter.drawText(QRect(x0, 10, x1 - x0, metrics.height()), Qt.AlignLeft | Qt.AlignVCenter, name)
+
+    def _draw_frame_ticks(self, painter, start, span):
+        """Tick per frame (atau per kelipatan yang muat) dengan label nomor frame."""
+        pixels_per_frame = self.width() / span
+        tick_step = self._tick_step(pixels_per_frame, MIN_TICK_SPACING)
+        label_step = self._tick_step(pixels_per_frame, MIN_TICK_LABEL_SPACING)
+        if label_step % tick_step:
+            label_step = tick_step * -(-label_step // tick_step)
+        h = self.height()
+        minor, major, labels = [], [], []
+        # Tick di frame (1-based) kelipatan tick_step
+        frame_number = int(start) // tick_step * tick_step
+        while frame_number - 1 <= start + span:
+            if frame_number >= 1:
+                x = int(self._position_to_x(frame_number - 1))
+                if frame_number % label_step == 0:
+                    major.append(QLine(x, h - 8, x, h))
+                    labels.append((x, frame_number))
+                else:
+                    minor.append(QLine(x, h - 4, x, h))
+            frame_number += tick_step
+        painter.setPen(QPen(QColor("#888888"), 1))
+        painter.drawLines(minor)
+        painter.setPen(QPen(QColor("#bbbbbb"), 1))
+        painter.drawLines(major)
+        painter.setFont(self.detail_font)
+        for x, frame_number in labels:
+            painter.drawText(x + 3, h - 2, self._format_position(frame_number - 1))
+
+    @staticmethod
+    def _tick_step(pixels_per_frame, min_spacing):
+        """Kelipatan 1-2-5 terkecil yang membuat jarak tick minimal min_spacing piksel."""
+        magnitude = 1
+        while True:
+            for base in TICK_STEPS:
+                if base * magnitude * pixels_per_frame >= min_spacing:
+                    return base * magnitude
+            magnitude *= 10
+
+    def _column_counts(self, frames):
+        """
+        [(kolom piksel, jumlah frame)] untuk frame (daftar terurut atau
+        MarkIndex) yang jatuh di jendela yang terlihat.
+        """
+        if not frames:
+            return []
+        w = max(1, self.width())
+        start, span = self._view()
+        rank = getattr(frames, 'rank', None) or partial(bisect_left, frames)
+        first, last = rank(start), rank(start + span + 0.5)
+        if last - first <= w:
+            # Sedikit frame terlihat: petakan satu per satu
+            counts = {}
+            for frame in frames[first:last]:
+                column = min(w - 1, int((frame - start) / span * w))
+                counts[column] = counts.get(column, 0) + 1
+            return list(counts.items())
+        # Banyak frame: hitung per kolom dengan bisect di tepi kolom
+        edges = [rank(start + column * span / w) for column in range(w)] + [last]
+        return [(column, edges[column + 1] - edges[column]) for column in range(w)
+                if edges[column + 1] > edges[column]]
+
+    def _total_pos(self):
+        # Durasi 1 frame tidak boleh dibagi (self.duration - 1 akan menjadi 0)
+        return (self.duration - 1) if self.duration > 1 else 1
+
+    def _position_to_x(self, position):
+        start, span = self._view()
+        return ((position - start) / span) * self.width()
+
+    def _x_to_position(self, x):
+        start, span = self._view()
+        return int(start + (x / self.width()) * span + 0.5)
+
+    def _is_position_visible(self, position):
+        start, span = self._view()
+        return start - 1 <= position <= start + span + 1
+
+    def _label_rect(self, marker_x, display_text, metrics):
+        """Kotak label posisi di atas playhead (dijaga tetap di dalam widget)."""
+        w = self.width()
+        text_width = metrics.horizontalAdvance(display_text)
+        text_height = metrics.height()
+        bubble_padding = 8
+        bubble_width = text_width + bubble_padding * 2
+        bubble_height = text_height + 6
+        bubble_x = int(marker_x) - bubble_width // 2
+        bubble_y = 2
+        if bubble_x < 4:
+            bubble_x = 4
+        if bubble_x + bubble_width > w - 4:
+            bubble_x = w - bubble_width - 4
+        return QRect(bubble_x, bubble_y, bubble_width, bubble_height)
+
+    def _playhead_rect(self):
+        """Area yang digambar untuk playhead & labelnya pada posisi saat ini."""
+        if self.duration <= 0 or not self._is_position_visible(self.current_position):
+            return QRect()
+        marker_x = self._position_to_x(self.current_position)
+        rect = QRect(int(marker_x) - 2, 0, 5, self.height())
+        display_text = self._format_marker_label()
+        if display_text:
+            rect = rect.united(self._label_rect(marker_x, display_text, QFontMetrics(self.label_font)))
+        return rect.adjusted(-1, -1, 1, 1)
 
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
+            self.is_scrubbing = True
+            self.last_scrub_position = -1
+            self.scrubStarted.emit()
             self.seek_to_mouse_position(event.pos())
+        elif event.button() == Qt.MiddleButton and self.view_span is not None:
+            # Drag tombol tengah: geser jendela zoom
+            self._pan_origin = (event.pos().x(), self._view()[0])
             
     def mouseMoveEvent(self, event):
         if event.buttons() & Qt.LeftButton:
             self.seek_to_mouse_position(event.pos())
+        elif event.buttons() & Qt.MiddleButton and self._pan_origin is not None:
+            origin_x, origin_start = self._pan_origin
+            span = self._view()[1]
+            self._set_view(origin_start - (event.pos().x() - origin_x) / self.width() * span, span)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.is_scrubbing:
+            self.is_scrubbing = False
+            self.scrubFinished.emit(self.last_scrub_position)
+        elif event.button() == Qt.MiddleButton:
+            self._pan_origin = None
+
+    def wheelEvent(self, event):
+        """Roda: zoom di sekitar kursor. Shift+roda / roda horizontal: scroll."""
+        if self.duration <= 1:
+            return
+        delta = event.angleDelta()
+        if delta.x() or event.modifiers() & Qt.ShiftModifier:
+            steps = (delta.x() or delta.y()) / 120
+            self.scroll_by(-steps * self._view()[1] * 0.1)
+        elif delta.y():
+            self.zoom_at(event.pos().x(), ZOOM_STEP ** (delta.y() / 120))
+        event.accept()
 
     def seek_to_mouse_position(self, pos):
         if self.duration > 0:
-            x = pos.x()
+            x = max(0, min(pos.x(), self.width()))
             
             if self.duration > 1:
-                total_pos = (self.duration - 1)
-                new_position = int((x / self.width()) * total_pos)
+                # Frame terdekat pada jendela yang terlihat (bisa per frame saat di-zoom)
+                new_position = self._x_to_position(x)
             else:
                 new_position = 0
             
             new_position = max(0, min(new_position, self.duration - 1))
+            if self.is_scrubbing:
+                # Gerakan mouse di dalam kolom frame yang sama tidak perlu seek ulang
+                if new_position == self.last_scrub_position:
+                    return
+                self.last_scrub_position = new_position
             self.position_changed.emit(new_position)
 
     def _format_marker_label(self):
         if self.duration <= 0 or self.current_position < 0:
             return ""
-        frame_current = self.current_position + 1
+        return self._format_position(self.current_position)
+
+    def _format_position(self, position):
+        frame_current = position + 1
         
         if self.show_timecode and self.fps > 0:
-            # Gunakan self.current_position (frame 0-based)
-            total_seconds = self.current_position / self.fps
+            # Gunakan position (frame 0-based)
+            total_seconds = position / self.fps
             minutes = int(total_seconds // 60)
             seconds_float = total_seconds - minutes * 60
             seconds = int(seconds_float)